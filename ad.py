@@ -1,8 +1,8 @@
-from flask_sqlalchemy import SQLAlchemy
+from database import db
 from datetime import datetime
 from enum import Enum
 
-db = SQLAlchemy()
+from fts_search import fts_search
 
 class AdStatus(Enum):
     PENDING = "pending"
@@ -11,6 +11,12 @@ class AdStatus(Enum):
 
 class Ad(db.Model):
     __tablename__ = 'ads'
+    __table_args__ = (
+        # Serves the newest-first keyset pagination of approved ads
+        db.Index('ix_ads_status_created_at_id', 'status', 'created_at', 'id'),
+        # Serves category + price range filters of search_query
+        db.Index('ix_ads_status_category_price', 'status', 'category', 'price'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -27,6 +33,9 @@ class Ad(db.Model):
     rejected_at = db.Column(db.DateTime)
     admin_notes = db.Column(db.Text)
     
+    # Listing endpoints load it with joinedload(Ad.user) to avoid one query per ad
+    user = db.relationship('User', lazy='select')
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -60,14 +69,34 @@ class Ad(db.Model):
     @classmethod
     def search_ads(cls, query=None, category=None, min_price=None, max_price=None, location=None):
         """Search approved ads based on criteria"""
+        query_obj = cls.search_query(query, category, min_price, max_price, location)
+        
+        # Newest first (after bm25 rank when searching text)
+        return query_obj.order_by(cls.created_at.desc()).all()
+    
+    @classmethod
+    def search_query(cls, query=None, category=None, min_price=None, max_price=None, location=None, rank=True):
+        """Build the approved-ads search query without running it, for paging and counting"""
         query_obj = cls.query.filter(cls.status == AdStatus.APPROVED)
         
         if query:
-            # Search in enhanced text
-            query_obj = query_obj.filter(cls.enhanced_text.contains(query))
+            # Full-text search ranked by bm25(), substring match if FTS5 is unavailable
+            fts_query = fts_search(query_obj, cls, query, rank=rank)
+            if fts_query is not None:
+                query_obj = fts_query
+            else:
+                query_obj = query_obj.filter(cls.enhanced_text.contains(query))
         
+        # Categories containing the text (case-insensitive) match, as with
+        # ILIKE, but they are looked up once among the distinct names so
+        # each one is an equality seek on ix_ads_status_category_price
+        # that keeps the price range on the index
         if category:
-            query_obj = query_obj.filter(cls.category.ilike(f'%{category}%'))
+            matching_categories = db.select(cls.category).where(
+                cls.status == AdStatus.APPROVED,
+                cls.category.ilike(f'%{category.strip()}%')
+            ).distinct()
+            query_obj = query_obj.filter(cls.category.in_(matching_categories))
         
         if min_price is not None:
             query_obj = query_obj.filter(cls.price >= min_price)
@@ -78,5 +107,4 @@ class Ad(db.Model):
         if location:
             query_obj = query_obj.filter(cls.location.ilike(f'%{location}%'))
         
-        return query_obj.order_by(cls.created_at.desc()).all()
-
+        return query_obj
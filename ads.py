@@ -3,9 +3,10 @@ from ad import Ad, AdStatus
 from user import User
 from ai_service import AIService
 from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
-
-db = SQLAlchemy()
+from database import db
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from pagination import COUNT_MODES, InvalidCursor, count_rows, keyset_page
 
 ads_bp = Blueprint('ads', __name__)
 ai_service = AIService()
@@ -73,22 +74,34 @@ def search_ads():
         location = request.args.get('location', '').strip()
         limit = request.args.get('limit', 10, type=int)
         offset = request.args.get('offset', 0, type=int)
+        cursor = request.args.get('cursor', '').strip()
+        count_mode = request.args.get('count', 'exact').strip()
         
         # Limit the number of results
-        limit = min(limit, 50)  # Max 50 results per request
+        limit = max(1, min(limit, 50))  # Max 50 results per request
+        
+        if count_mode not in COUNT_MODES:
+            return jsonify({'error': f'Invalid count mode: {count_mode}'}), 400
         
-        # Search ads
-        ads = Ad.search_ads(
+        # Build the search query, paging and counting run in SQL
+        query_obj = Ad.search_query(
             query=query if query else None,
             category=category if category else None,
             min_price=min_price,
             max_price=max_price,
-            location=location if location else None
+            location=location if location else None,
+            rank=False
         )
+        paged_query = query_obj.options(joinedload(Ad.user))
+        
+        total_count, count_is_exact = count_rows(query_obj, count_mode)
         
-        # Apply pagination
-        total_count = len(ads)
-        ads = ads[offset:offset + limit]
+        # Cursor pages seek past the last (created_at, id), offset is kept for old clients
+        next_cursor = None
+        if cursor or not offset:
+            ads, next_cursor = keyset_page(paged_query, Ad, limit, cursor or None)
+        else:
+            ads = paged_query.order_by(Ad.created_at.desc(), Ad.id.desc()).offset(offset).limit(limit).all()
         
         # Convert to dict format
         results = []
@@ -105,8 +118,10 @@ def search_ads():
             'success': True,
             'results': results,
             'total_count': total_count,
+            'total_count_exact': count_is_exact,
             'limit': limit,
             'offset': offset,
+            'next_cursor': next_cursor,
             'search_params': {
                 'query': query,
                 'category': category,
@@ -116,6 +131,8 @@ def search_ads():
             }
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -218,9 +235,9 @@ def get_pending_ads():
         limit = min(limit, 100)  # Max 100 results per request
         
         # Get pending ads
-        query = Ad.query.filter(Ad.status == AdStatus.PENDING).order_by(Ad.created_at.desc())
+        query = Ad.query.filter(Ad.status == AdStatus.PENDING)
         total_count = query.count()
-        ads = query.offset(offset).limit(limit).all()
+        ads = query.options(joinedload(Ad.user)).order_by(Ad.created_at.desc()).offset(offset).limit(limit).all()
         
         # Convert to dict format
         results = []
@@ -249,10 +266,12 @@ def get_pending_ads():
 def get_ads_stats():
     """Get advertisement statistics"""
     try:
-        total_ads = Ad.query.count()
-        pending_ads = Ad.query.filter(Ad.status == AdStatus.PENDING).count()
-        approved_ads = Ad.query.filter(Ad.status == AdStatus.APPROVED).count()
-        rejected_ads = Ad.query.filter(Ad.status == AdStatus.REJECTED).count()
+        # Counts per status in one GROUP BY query
+        status_counts = dict(db.session.query(Ad.status, func.count(Ad.id)).group_by(Ad.status).all())
+        total_ads = sum(status_counts.values())
+        pending_ads = status_counts.get(AdStatus.PENDING, 0)
+        approved_ads = status_counts.get(AdStatus.APPROVED, 0)
+        rejected_ads = status_counts.get(AdStatus.REJECTED, 0)
         
         # Get recent activity (last 7 days)
         from datetime import timedelta
@@ -260,13 +279,12 @@ def get_ads_stats():
         recent_ads = Ad.query.filter(Ad.created_at >= week_ago).count()
         
         # Get category breakdown
-        category_stats = {}
-        ads_with_category = Ad.query.filter(Ad.category.isnot(None)).all()
-        for ad in ads_with_category:
-            category = ad.category
-            if category not in category_stats:
-                category_stats[category] = 0
-            category_stats[category] += 1
+        category_stats = dict(
+            db.session.query(Ad.category, func.count(Ad.id))
+            .filter(Ad.category.isnot(None))
+            .group_by(Ad.category)
+            .all()
+        )
         
         return jsonify({
             'success': True,
@@ -283,6 +301,17 @@ def get_ads_stats():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@ads_bp.route('/enhancement-cache', methods=['GET'])
+def get_enhancement_cache_stats():
+    """Size and hit ratio of the ad enhancement cache"""
+    try:
+        return jsonify({
+            'success': True,
+            'cache': ai_service.cache.stats()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @ads_bp.route('/user/<int:user_id>', methods=['GET'])
 def get_user_ads(user_id):
     """Get all advertisements by a specific user"""
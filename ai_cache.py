@@ -0,0 +1,261 @@
+"""
+Persistent cache of AI responses
+
+Results are stored in a local SQLite file under a content address: the
+SHA-256 of the operation, model, prompt version and normalized input text.
+Resubmitted or templated ads therefore reuse an earlier response instead of
+paying for another model call, across restarts and processes. A small
+in-memory LRU in front of SQLite serves repeated hits without a query.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from arabic_utils import ArabicTextProcessor
+
+DEFAULT_CACHE_PATH = os.getenv('AI_CACHE_PATH', 'instance/ai_cache.db')
+DEFAULT_MAX_BYTES = int(os.getenv('AI_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+
+# Entries kept decoded in memory
+MEMORY_ENTRIES = 512
+
+# Eviction removes least recently used entries down to this share of max_bytes
+EVICTION_TARGET = 0.9
+
+# last_used is written back at most this often per entry, hits stay read-only
+TOUCH_INTERVAL_SECONDS = 60
+
+def make_cache_key(operation: str, model: str, prompt_version: int, text: str) -> str:
+    """
+    Content address of an AI request
+
+    Texts that differ only in whitespace, diacritics or Alef/Yeh/Teh Marbuta
+    spelling share a key.
+
+    Args:
+        operation (str): Name of the AI operation, e.g. 'enhance_ad_text'
+        model (str): Model name
+        prompt_version (int): Version of the prompt template
+        text (str): Input text
+
+    Returns:
+        Hex SHA-256 key
+    """
+    normalized = ArabicTextProcessor.clean_text(text)
+    payload = json.dumps([operation, model, prompt_version, normalized], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class AICache:
+    """
+    SQLite-backed cache of JSON values with a total size limit.
+
+    When the stored values exceed max_bytes, the least recently used
+    entries are deleted. Hit, miss and eviction counters cover the current
+    process.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Open or create the cache file
+
+        Args:
+            path (str): SQLite file, ':memory:' for a process-local cache
+            max_bytes (int): Size limit of the stored values
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._memory: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory and path != ':memory:':
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript("""
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS ai_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_ai_cache_last_used ON ai_cache (last_used);
+        """)
+        self._size = self._connection.execute('SELECT COALESCE(SUM(size), 0) FROM ai_cache').fetchone()[0]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached value
+
+        Args:
+            key (str): Key from make_cache_key
+
+        Returns:
+            Cached value (shared, must not be modified), or None on a miss
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self._touch(key, entry)
+                return entry[0]
+
+            try:
+                row = self._connection.execute('SELECT value FROM ai_cache WHERE key = ?', (key,)).fetchone()
+            except sqlite3.Error as e:
+                print(f"AI cache read error: {e}")
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            value = json.loads(row[0])
+            entry = [value, 0.0]
+            self._remember(key, entry)
+            self.hits += 1
+            self._touch(key, entry)
+            return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """
+        Store a value, evicting old entries past the size limit
+
+        Args:
+            key (str): Key from make_cache_key
+            value (Dict): JSON-serializable value, must not be modified afterwards
+        """
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            try:
+                previous = self._connection.execute('SELECT size FROM ai_cache WHERE key = ?', (key,)).fetchone()
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO ai_cache (key, value, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)',
+                    (key, data, size, now, now)
+                )
+                self._size += size - (previous[0] if previous else 0)
+                if self._size > self.max_bytes:
+                    self._evict()
+                self._connection.commit()
+            except sqlite3.Error as e:
+                print(f"AI cache write error: {e}")
+                return
+            self._remember(key, [value, now])
+
+    def clear(self) -> None:
+        """Delete every entry, counters are kept"""
+        with self._lock:
+            self._connection.execute('DELETE FROM ai_cache')
+            self._connection.commit()
+            self._memory.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters
+
+        Returns:
+            Dict with entry count, stored bytes, limits, hit/miss counters and hit ratio
+        """
+        with self._lock:
+            entries = self._connection.execute('SELECT COUNT(*) FROM ai_cache').fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                'path': self.path,
+                'entries': entries,
+                'size_bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
+
+    def _remember(self, key: str, entry: list) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    def _touch(self, key: str, entry: list) -> None:
+        """Record a hit for LRU eviction, at most once per TOUCH_INTERVAL_SECONDS"""
+        now = time.time()
+        if now - entry[1] < TOUCH_INTERVAL_SECONDS:
+            return
+        entry[1] = now
+        try:
+            self._connection.execute('UPDATE ai_cache SET last_used = ? WHERE key = ?', (now, key))
+            self._connection.commit()
+        except sqlite3.Error as e:
+            print(f"AI cache write error: {e}")
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache is under EVICTION_TARGET * max_bytes"""
+        target = self.max_bytes * EVICTION_TARGET
+        rows = self._connection.execute('SELECT key, size FROM ai_cache ORDER BY last_used, created_at')
+        evicted = []
+        for key, size in rows:
+            if self._size <= target:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._connection.executemany('DELETE FROM ai_cache WHERE key = ?', evicted)
+        for (key,) in evicted:
+            self._memory.pop(key, None)
+        self.evictions += len(evicted)
+
+# Namespace of ad enhancements, other operations get a file of their own
+DEFAULT_NAMESPACE = 'default'
+
+_ai_caches: Dict[str, AICache] = {}
+_ai_cache_lock = threading.Lock()
+
+def namespace_path(namespace: str) -> str:
+    """
+    File of a cache namespace, next to DEFAULT_CACHE_PATH
+
+    Args:
+        namespace (str): Namespace name
+
+    Returns:
+        SQLite file path
+    """
+    if namespace == DEFAULT_NAMESPACE:
+        return DEFAULT_CACHE_PATH
+    root, extension = os.path.splitext(DEFAULT_CACHE_PATH)
+    return f'{root}_{namespace}{extension}'
+
+def get_ai_cache(namespace: str = DEFAULT_NAMESPACE) -> AICache:
+    """
+    Get a process-wide AI response cache
+
+    Each namespace has its own file, size limit and hit counters, so the
+    hit ratio of one kind of call is not mixed with another's.
+
+    Args:
+        namespace (str): Cache namespace, e.g. 'query_rewrites'
+
+    Returns:
+        Shared AICache of the namespace
+    """
+    cache = _ai_caches.get(namespace)
+    if cache is None:
+        with _ai_cache_lock:
+            cache = _ai_caches.get(namespace)
+            if cache is None:
+                cache = AICache(namespace_path(namespace))
+                _ai_caches[namespace] = cache
+    return cache
@@ -1,19 +1,48 @@
 import os
+import json
 import openai
 from typing import Dict, List, Optional
 from arabic_utils import ArabicTextProcessor
+from ai_cache import AICache, get_ai_cache, make_cache_key
+from llm_runtime import get_llm_runtime
+from single_flight import get_single_flight
+
+ENHANCE_MODEL = "gpt-4o-mini"
+
+# Bump when the enhancement prompt changes, older cached results are then ignored
+ENHANCE_PROMPT_VERSION = 1
 
 class AIService:
     """AI service for text enhancement and analysis using OpenAI API"""
     
-    def __init__(self):
-        # OpenAI API is already configured via environment variables
-        self.client = openai.OpenAI()
+    def __init__(self, cache: Optional[AICache] = None):
+        # OpenAI API is already configured via environment variables, requests
+        # run on the shared LLM runtime loop
+        self.client = openai.AsyncOpenAI()
         self.arabic_processor = ArabicTextProcessor()
+        self._cache = cache
+    
+    @property
+    def cache(self) -> AICache:
+        """Response cache, the shared file cache unless one was passed in (opened on first use)"""
+        if self._cache is None:
+            self._cache = get_ai_cache()
+        return self._cache
     
     def enhance_ad_text(self, original_text: str) -> Dict[str, any]:
+        """Enhance Arabic advertisement text using AI (blocks until enhance_ad_text_async finishes)"""
+        return get_llm_runtime().run(self.enhance_ad_text_async(original_text))
+    
+    async def enhance_ad_text_async(self, original_text: str) -> Dict[str, any]:
         """Enhance Arabic advertisement text using AI"""
         try:
+            # Resubmitted and templated ads reuse the stored enhancement and analyses
+            cache_key = make_cache_key('enhance_ad_text', ENHANCE_MODEL, ENHANCE_PROMPT_VERSION, original_text)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                original_analysis = dict(cached['original_analysis'], original_text=original_text)
+                return dict(cached, original_text=original_text, original_analysis=original_analysis, cached=True)
+            
             # Create a prompt for ad enhancement
             prompt = f"""
 أنت خبير في كتابة الإعلانات باللغة العربية. قم بتحسين النص التالي ليصبح إعلاناً جذاباً ومقنعاً:
@@ -31,8 +60,8 @@ class AIService:
 النص المحسن:
 """
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+            response = await self._chat_completion(
+                model=ENHANCE_MODEL,
                 messages=[
                     {"role": "system", "content": "أنت خبير في التسويق والإعلانات باللغة العربية. تخصصك هو تحسين النصوص الإعلانية لتصبح أكثر جاذبية وفعالية."},
                     {"role": "user", "content": prompt}
@@ -47,7 +76,7 @@ class AIService:
             original_analysis = self.arabic_processor.analyze_search_intent(original_text)
             enhanced_analysis = self.arabic_processor.analyze_search_intent(enhanced_text)
             
-            return {
+            result = {
                 'success': True,
                 'original_text': original_text,
                 'enhanced_text': enhanced_text,
@@ -55,6 +84,8 @@ class AIService:
                 'enhanced_analysis': enhanced_analysis,
                 'improvement_score': self._calculate_improvement_score(original_text, enhanced_text)
             }
+            self.cache.put(cache_key, result)
+            return dict(result, cached=False)
             
         except Exception as e:
             return {
@@ -65,6 +96,10 @@ class AIService:
             }
     
     def analyze_buyer_query(self, query: str) -> Dict[str, any]:
+        """Analyze buyer search query and extract structured information (blocks until analyze_buyer_query_async finishes)"""
+        return get_llm_runtime().run(self.analyze_buyer_query_async(query))
+    
+    async def analyze_buyer_query_async(self, query: str) -> Dict[str, any]:
         """Analyze buyer search query and extract structured information"""
         try:
             # First, use our Arabic processor for basic analysis
@@ -91,7 +126,7 @@ class AIService:
 }}
 """
             
-            response = self.client.chat.completions.create(
+            response = await self._chat_completion(
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "أنت خبير في تحليل طلبات البحث باللغة العربية واستخراج المعلومات المهمة منها."},
@@ -161,7 +196,7 @@ class AIService:
 اكتب رداً مناسباً باللغة العربية:
 """
                 
-                response = self.client.chat.completions.create(
+                response = get_llm_runtime().run(self._chat_completion(
                     model="gpt-4o-mini",
                     messages=[
                         {"role": "system", "content": "أنت مساعد ذكي للدردشة باللغة العربية. اكتب ردود مفيدة ومهذبة."},
@@ -169,7 +204,7 @@ class AIService:
                     ],
                     max_tokens=150,
                     temperature=0.7
-                )
+                ))
                 
                 return response.choices[0].message.content.strip()
                 
@@ -182,6 +217,27 @@ class AIService:
             }
             return fallback_responses.get(response_type, fallback_responses["default"])
     
+    async def _chat_completion(self, model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float):
+        """
+        Create a chat completion, sharing the request with identical calls already in flight
+        
+        Returns:
+            OpenAI response (shared between coalesced callers, must not be modified)
+        """
+        key = ('openai', model, json.dumps(messages, ensure_ascii=False), max_tokens, temperature)
+        return await get_single_flight().do_async(
+            key,
+            self._create_completion,
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+    
+    async def _create_completion(self, **kwargs):
+        """Send a chat completion request within the OpenAI concurrency limit"""
+        return await get_llm_runtime().submit('openai', self.client.chat.completions.create(**kwargs))
+    
     def _calculate_improvement_score(self, original: str, enhanced: str) -> float:
         """Calculate improvement score between original and enhanced text"""
         # Simple scoring based on length and structure
@@ -216,7 +272,6 @@ class AIService:
         # Try to parse AI analysis for more details
         if ai_analysis:
             try:
-                import json
                 ai_data = json.loads(ai_analysis)
                 if 'price_range' in ai_data:
                     params['price_min'] = ai_data['price_range'].get('min')
@@ -1,6 +1,9 @@
 import re
+import threading
 import unicodedata
-from typing import List, Dict, Optional
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 
 class ArabicTextProcessor:
     """Utility class for processing Arabic text"""
@@ -14,7 +17,8 @@ class ArabicTextProcessor:
         'كل', 'بعض', 'جميع', 'كان', 'كانت', 'يكون', 'تكون', 'أكون',
         'أن', 'إن', 'كي', 'لكي', 'حتى', 'لو', 'لولا', 'لوما', 'إذا',
         'عند', 'عندما', 'بينما', 'أثناء', 'خلال', 'أمام', 'وراء', 'فوق',
-        'تحت', 'يمين', 'يسار', 'شمال', 'وسط', 'بين', 'ضد', 'نحو'
+        'تحت', 'يمين', 'يسار', 'شمال', 'وسط', 'بين', 'ضد', 'نحو',
+        'الذين', 'أو', 'و', 'سوف', 'قد', 'لقد', 'بعد', 'قبل', 'لدى', 'حول'
     }
     
     # Arabic price patterns
@@ -29,6 +33,21 @@ class ArabicTextProcessor:
         r'(\d+)\s*مليون'
     ]
     
+    # Phrases that mark a buying or selling message
+    BUYING_PHRASES = ['أريد', 'عايز', 'محتاج', 'بدور على', 'أبحث عن']
+    SELLING_PHRASES = ['أبيع', 'للبيع', 'متاح', 'عرض']
+    
+    # Character folds applied by clean_text: diacritics removed, Alef,
+    # Teh Marbuta and Yeh variants mapped to one form
+    CHAR_FOLDS = str.maketrans(
+        {**{chr(code): None for code in range(0x064B, 0x0660)},
+         **{chr(code): None for code in range(0x06D6, 0x06EE)},
+         '\u0670': None,
+         'آ': 'ا', 'أ': 'ا', 'إ': 'ا',
+         'ة': 'ه',
+         'ى': 'ي'}
+    )
+    
     # Common product categories in Arabic
     CATEGORIES = {
         'موبايل': ['موبايل', 'جوال', 'هاتف', 'تليفون', 'سامسونج', 'آيفون', 'هواوي', 'شاومي'],
@@ -40,106 +59,122 @@ class ArabicTextProcessor:
         'خدمات': ['خدمة', 'تنظيف', 'صيانة', 'تدريس', 'ترجمة', 'تصميم', 'برمجة']
     }
     
+    # Product taxonomy used by ProductSearchEngine for boosts and suggestions
+    PRODUCT_CATEGORIES = {
+        'إلكترونيات': ['موبايل', 'هاتف', 'لابتوب', 'كمبيوتر', 'تلفزيون', 'تابلت', 'ساعة ذكية'],
+        'سيارات': ['سيارة', 'عربية', 'أوتوموبيل', 'مركبة', 'شاحنة', 'دراجة نارية'],
+        'عقارات': ['شقة', 'بيت', 'منزل', 'فيلا', 'أرض', 'محل', 'مكتب'],
+        'ملابس': ['قميص', 'بنطلون', 'فستان', 'حذاء', 'جاكيت', 'تيشيرت'],
+        'أثاث': ['كرسي', 'طاولة', 'سرير', 'خزانة', 'أريكة', 'مكتب'],
+        'رياضة': ['دراجة', 'كرة', 'جهاز رياضي', 'ملعب', 'نادي']
+    }
+    
+    # Common brands with their Arabic and Latin spellings
+    BRANDS = {
+        'سامسونج': ['سامسونج', 'samsung'],
+        'آيفون': ['آيفون', 'iphone', 'apple'],
+        'هواوي': ['هواوي', 'huawei'],
+        'شاومي': ['شاومي', 'xiaomi', 'redmi'],
+        'ريلمي': ['ريلمي', 'realme'],
+        'أوبو': ['أوبو', 'oppo'],
+        'تويوتا': ['تويوتا', 'toyota'],
+        'نيسان': ['نيسان', 'nissan'],
+        'هيونداي': ['هيونداي', 'hyundai'],
+        'كيا': ['كيا', 'kia']
+    }
+    
+    # Common Egyptian governorates and cities
+    LOCATIONS = [
+        'القاهرة', 'الجيزة', 'الإسكندرية', 'أسوان', 'أسيوط', 'البحر الأحمر',
+        'البحيرة', 'بني سويف', 'جنوب سيناء', 'الدقهلية', 'دمياط', 'الفيوم',
+        'الغربية', 'الإسماعيلية', 'كفر الشيخ', 'الأقصر', 'مطروح', 'المنيا',
+        'المنوفية', 'الوادي الجديد', 'شمال سيناء', 'بورسعيد', 'القليوبية',
+        'قنا', 'البحر الأحمر', 'الشرقية', 'سوهاج', 'السويس', 'طنطا',
+        'المنصورة', 'الزقازيق', 'شبرا الخيمة', 'بورسعيد', 'السويس',
+        'مدينة نصر', 'مصر الجديدة', 'الزمالك', 'المعادي', 'حلوان'
+    ]
+    
+    # Normalized keyword tables, built on first use
+    _price_table = None
+    _intent_table = None
+    
+    ARABIC_CHAR_PATTERN = re.compile(r'[\u0600-\u06FF\u0750-\u077F]')
+    
     @staticmethod
     def clean_text(text: str) -> str:
         """Clean and normalize Arabic text"""
         if not text:
             return ""
         
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text.strip())
-        
-        # Normalize Arabic characters
-        text = unicodedata.normalize('NFKC', text)
-        
-        # Remove diacritics (tashkeel)
-        text = re.sub(r'[\u064B-\u065F\u0670\u06D6-\u06ED]', '', text)
+        # Normalize Arabic characters (most input is already NFKC)
+        if not unicodedata.is_normalized('NFKC', text):
+            text = unicodedata.normalize('NFKC', text)
         
-        # Normalize Alef variations
-        text = re.sub(r'[آأإ]', 'ا', text)
+        # Remove diacritics and fold Alef/Teh Marbuta/Yeh in one pass
+        text = text.translate(ArabicTextProcessor.CHAR_FOLDS)
         
-        # Normalize Teh Marbuta
-        text = re.sub(r'ة', 'ه', text)
-        
-        # Normalize Yeh variations
-        text = re.sub(r'[يى]', 'ي', text)
-        
-        return text
+        # Remove extra whitespace
+        return ' '.join(text.split())
     
     @staticmethod
     def extract_keywords(text: str) -> List[str]:
         """Extract meaningful keywords from Arabic text"""
-        cleaned_text = ArabicTextProcessor.clean_text(text)
-        
-        # Split into words
-        words = re.findall(r'[\u0600-\u06FF\u0750-\u077F]+', cleaned_text)
-        
-        # Filter out stop words and short words
-        keywords = [
-            word for word in words 
-            if word not in ArabicTextProcessor.STOP_WORDS and len(word) > 2
-        ]
-        
-        return list(set(keywords))  # Remove duplicates
+        # Same terms the search indexes are built from, duplicates removed
+        return list(dict.fromkeys(get_arabic_analyzer().analyze(text)))
     
     @staticmethod
     def extract_price_info(text: str) -> Optional[Dict[str, any]]:
         """Extract price information from Arabic text"""
-        text = ArabicTextProcessor.clean_text(text)
-        
-        for pattern in ArabicTextProcessor.PRICE_PATTERNS:
-            match = re.search(pattern, text)
+        return ArabicTextProcessor._price_info_from_clean(ArabicTextProcessor.clean_text(text))
+    
+    @staticmethod
+    def detect_category(text: str, whole_token: bool = False) -> Optional[str]:
+        """Detect product category from Arabic text (whole_token: ignore keywords inside longer words)"""
+        return ArabicTextProcessor._category_from_clean(ArabicTextProcessor.clean_text(text).lower(), whole_token)
+    
+    @staticmethod
+    def extract_location(text: str) -> Optional[str]:
+        """Extract location information from Arabic text"""
+        return ArabicTextProcessor._location_from_clean(ArabicTextProcessor.clean_text(text))
+    
+    @staticmethod
+    def _price_info_from_clean(text: str) -> Optional[Dict[str, any]]:
+        """extract_price_info on text already passed through clean_text"""
+        for pattern, multiplier in ArabicTextProcessor._price_regexes():
+            match = pattern.search(text)
             if match:
-                price_value = int(match.group(1))
-                price_text = match.group(0)
-                
-                # Convert to standard currency (Egyptian Pounds)
-                if 'ألف' in price_text:
-                    price_value *= 1000
-                elif 'مليون' in price_text:
-                    price_value *= 1000000
-                
                 return {
-                    'value': price_value,
-                    'text': price_text,
+                    'value': int(match.group(1)) * multiplier,
+                    'text': match.group(0),
                     'currency': 'EGP'  # Default to Egyptian Pounds
                 }
         
         return None
     
     @staticmethod
-    def detect_category(text: str) -> Optional[str]:
-        """Detect product category from Arabic text"""
-        text = ArabicTextProcessor.clean_text(text).lower()
-        
-        for category, keywords in ArabicTextProcessor.CATEGORIES.items():
-            for keyword in keywords:
-                if keyword in text:
-                    return category
-        
-        return None
+    def _category_from_clean(text: str, whole_token: bool = False) -> Optional[str]:
+        """detect_category on lower-cased clean_text output"""
+        matcher = get_entity_matcher()
+        return matcher.best(matcher.scan_clean(text), 'category', whole_token)
     
     @staticmethod
-    def extract_location(text: str) -> Optional[str]:
-        """Extract location information from Arabic text"""
-        # Common Egyptian governorates and cities
-        locations = [
-            'القاهرة', 'الجيزة', 'الإسكندرية', 'أسوان', 'أسيوط', 'البحر الأحمر',
-            'البحيرة', 'بني سويف', 'جنوب سيناء', 'الدقهلية', 'دمياط', 'الفيوم',
-            'الغربية', 'الإسماعيلية', 'كفر الشيخ', 'الأقصر', 'مطروح', 'المنيا',
-            'المنوفية', 'الوادي الجديد', 'شمال سيناء', 'بورسعيد', 'القليوبية',
-            'قنا', 'البحر الأحمر', 'الشرقية', 'سوهاج', 'السويس', 'طنطا',
-            'المنصورة', 'الزقازيق', 'شبرا الخيمة', 'بورسعيد', 'السويس',
-            'مدينة نصر', 'مصر الجديدة', 'الزمالك', 'المعادي', 'حلوان'
-        ]
-        
-        text = ArabicTextProcessor.clean_text(text)
-        
-        for location in locations:
-            if location in text:
-                return location
-        
-        return None
+    def _location_from_clean(text: str) -> Optional[str]:
+        """extract_location on clean_text output, ignoring names inside longer words ('السويس' in 'السويسري')"""
+        matcher = get_entity_matcher()
+        return matcher.best(matcher.scan_clean(text.lower()), 'location', whole_token=True)
+    
+    @staticmethod
+    def _price_regexes() -> List[Tuple[re.Pattern, int]]:
+        """PRICE_PATTERNS folded like clean_text output and compiled once"""
+        if ArabicTextProcessor._price_table is None:
+            # Convert to standard currency (Egyptian Pounds)
+            multipliers = {'ألف': 1000, 'مليون': 1000000}
+            table = []
+            for pattern in ArabicTextProcessor.PRICE_PATTERNS:
+                multiplier = next((value for word, value in multipliers.items() if word in pattern), 1)
+                table.append((re.compile(pattern.translate(ArabicTextProcessor.CHAR_FOLDS)), multiplier))
+            ArabicTextProcessor._price_table = table
+        return ArabicTextProcessor._price_table
     
     @staticmethod
     def is_arabic_text(text: str) -> bool:
@@ -147,7 +182,7 @@ class ArabicTextProcessor:
         if not text:
             return False
         
-        arabic_chars = re.findall(r'[\u0600-\u06FF\u0750-\u077F]', text)
+        arabic_chars = ArabicTextProcessor.ARABIC_CHAR_PATTERN.findall(text)
         return len(arabic_chars) > len(text) * 0.3  # At least 30% Arabic characters
     
     @staticmethod
@@ -163,16 +198,26 @@ class ArabicTextProcessor:
     @staticmethod
     def analyze_search_intent(text: str) -> Dict[str, any]:
         """Analyze search intent from Arabic text"""
-        keywords = ArabicTextProcessor.extract_keywords(text)
-        price_info = ArabicTextProcessor.extract_price_info(text)
-        category = ArabicTextProcessor.detect_category(text)
-        location = ArabicTextProcessor.extract_location(text)
+        # Normalize once and share it between the extractors
+        clean = ArabicTextProcessor.clean_text(text)
+        lowered = clean.lower()
+        
+        keywords = list(dict.fromkeys(get_arabic_analyzer().analyze_clean(clean)))
+        price_info = ArabicTextProcessor._price_info_from_clean(clean)
+        
+        # Categories, locations and brands come from one scan of the message
+        matcher = get_entity_matcher()
+        hits = matcher.scan_clean(lowered)
+        category = matcher.best(hits, 'category')
+        location = matcher.best(hits, 'location')
+        brands = matcher.values(hits, 'brand')
         
         # Determine search intent
+        buying_phrases, selling_phrases = ArabicTextProcessor._intent_phrases()
         intent = "general"
-        if any(word in text for word in ['أريد', 'عايز', 'محتاج', 'بدور على', 'أبحث عن']):
+        if any(phrase in clean for phrase in buying_phrases):
             intent = "buying"
-        elif any(word in text for word in ['أبيع', 'للبيع', 'متاح', 'عرض']):
+        elif any(phrase in clean for phrase in selling_phrases):
             intent = "selling"
         
         return {
@@ -180,7 +225,342 @@ class ArabicTextProcessor:
             'price_info': price_info,
             'category': category,
             'location': location,
+            'brands': brands,
             'intent': intent,
             'original_text': text
         }
+    
+    @staticmethod
+    def _intent_phrases() -> Tuple[List[str], List[str]]:
+        """Buying and selling phrases normalized like clean_text output (computed once)"""
+        if ArabicTextProcessor._intent_table is None:
+            ArabicTextProcessor._intent_table = (
+                [ArabicTextProcessor.clean_text(phrase) for phrase in ArabicTextProcessor.BUYING_PHRASES],
+                [ArabicTextProcessor.clean_text(phrase) for phrase in ArabicTextProcessor.SELLING_PHRASES]
+            )
+        return ArabicTextProcessor._intent_table
+
+
+class ArabicAnalyzer:
+    """
+    Text analyzer shared by every search index and query path.
+    
+    Runs ArabicTextProcessor.clean_text normalization, lower-cases Latin
+    brand tokens, maps Arabic-Indic digits to ASCII, drops stop words and
+    applies a light prefix stemmer (conjunction و and the definite article
+    forms ال/وال/بال/كال/فال/لل). Per-token results are kept in an LRU cache.
+    """
+    
+    # Bump when the produced terms change, persisted indexes store it
+    VERSION = 1
+    
+    TOKEN_PATTERN = re.compile(r'[\u0600-\u065F\u066E-\u06FF\u0750-\u077F]+|[a-z0-9]+')
+    DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹', '01234567890123456789')
+    ARTICLE_PREFIXES = ('وال', 'بال', 'كال', 'فال', 'لل', 'ال')
+    TOKEN_CACHE_SIZE = 50000
+    
+    def __init__(self):
+        self.stop_words = {
+            self.normalize(word) for word in ArabicTextProcessor.STOP_WORDS
+        }
+        self.analyze_token = lru_cache(maxsize=self.TOKEN_CACHE_SIZE)(self._analyze_token)
+    
+    def normalize(self, text: str) -> str:
+        """Normalize text before tokenization"""
+        return ArabicTextProcessor.clean_text(text).lower().translate(self.DIGITS)
+    
+    def analyze(self, text: str) -> List[str]:
+        """
+        Turn text into index terms
+        
+        Args:
+            text (str): Raw text
+            
+        Returns:
+            List of terms in text order
+        """
+        if not text:
+            return []
+        return self.analyze_clean(ArabicTextProcessor.clean_text(text))
+    
+    def analyze_clean(self, text: str) -> List[str]:
+        """
+        analyze() on text already passed through ArabicTextProcessor.clean_text
+        
+        Args:
+            text (str): Cleaned text
+            
+        Returns:
+            List of terms in text order
+        """
+        terms = []
+        for token in self.TOKEN_PATTERN.findall(text.lower().translate(self.DIGITS)):
+            term = self.analyze_token(token)
+            if term:
+                terms.append(term)
+        return terms
+    
+    def analyze_ngrams(self, text: str) -> List[str]:
+        """
+        Terms plus adjacent term bigrams, used as the TF-IDF analyzer
+        
+        Args:
+            text (str): Raw text
+            
+        Returns:
+            List of unigram and bigram terms
+        """
+        terms = self.analyze(text)
+        return terms + [f'{first} {second}' for first, second in zip(terms, terms[1:])]
+    
+    def _analyze_token(self, token: str) -> Optional[str]:
+        """Stem a normalized token, None if it should not be indexed"""
+        if token in self.stop_words:
+            return None
+        
+        if token.isascii():
+            return token if len(token) > 1 or token.isdigit() else None
+        
+        stem = token
+        if len(stem) >= 4 and stem.startswith('و'):
+            stem = stem[1:]
+            if stem in self.stop_words:
+                return None
+        for prefix in self.ARTICLE_PREFIXES:
+            if stem.startswith(prefix) and len(stem) - len(prefix) >= 2:
+                stem = stem[len(prefix):]
+                break
+        
+        if len(stem) < 2 or stem in self.stop_words:
+            return None
+        return stem
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+def get_arabic_analyzer() -> ArabicAnalyzer:
+    """Get the process-wide analyzer"""
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = ArabicAnalyzer()
+    return _analyzer
+
+
+class AhoCorasick:
+    """
+    Aho–Corasick automaton matching many patterns in one pass over a text.
+    
+    Each pattern carries a payload, scan() yields (end offset, payload) for
+    every occurrence, overlapping ones included. Patterns are added first,
+    then build() freezes the automaton.
+    """
+    
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[Tuple[int, object]]] = [[]]
+        self._delta: List[Dict[str, int]] = []
+    
+    def add(self, pattern: str, payload) -> None:
+        """
+        Add a pattern
+        
+        Args:
+            pattern (str): Text to match, compared as-is
+            payload: Value reported with each occurrence
+        """
+        if not pattern:
+            return
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            node = next_node
+        self._outputs[node].append((len(pattern), payload))
+    
+    def build(self) -> None:
+        """
+        Compute failure links, merge outputs along them and resolve every
+        transition, so scanning costs one dict lookup per character
+        """
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = list(goto[0].values())
+        for node in queue:
+            delta[node] = {**delta[fail[node]], **goto[node]}
+            for char, child in goto[node].items():
+                fail[child] = delta[fail[node]].get(char, 0)
+                outputs[child] = outputs[child] + outputs[fail[child]]
+                queue.append(child)
+        self._delta = delta
+    
+    def scan(self, text: str) -> List[Tuple[int, int, object]]:
+        """
+        Find every pattern occurrence
+        
+        Args:
+            text (str): Text to scan
+            
+        Returns:
+            List of (start, end, payload) in order of end offset
+        """
+        delta, outputs = self._delta, self._outputs
+        matches = []
+        node = 0
+        for position, char in enumerate(text):
+            node = delta[node].get(char, 0)
+            if outputs[node]:
+                end = position + 1
+                for length, payload in outputs[node]:
+                    matches.append((end - length, end, payload))
+        return matches
+
+
+@dataclass
+class EntityHit:
+    """A category, location, brand or product-category keyword found in text"""
+    kind: str                  # 'category', 'location', 'brand' or 'product_category'
+    value: str                 # Canonical name from the source table
+    keyword: str               # Keyword as written in the source table
+    start: int                 # Offsets in the cleaned, lower-cased text
+    end: int
+    priority: Tuple[int, int]  # (entry index, keyword index) in the source table
+    whole_token: bool = True   # False when the keyword is part of a longer word
+
+
+class EntityMatcher:
+    """
+    One automaton over every keyword table of ArabicTextProcessor.
+    
+    Keywords are stored in clean_text form, lower-cased, and matched as
+    substrings like the keyword loops they replace. Latin keywords (brand
+    names) must stand as whole words. Arabic hits are flagged whole_token
+    when the keyword fills its word, possibly behind a proclitic (و, ب, ال,
+    بال, ...); a keyword inside a longer word ('خدمة' in 'مستخدمة', 'كيا'
+    in 'نوكيا') is only a weak hint. When several entries of a table match,
+    whole-token hits win, then the one listed first, as before.
+    """
+    
+    # Proclitics that may be attached in front of a whole-token keyword
+    TOKEN_PREFIXES = frozenset({'', 'و', 'ب', 'ل', 'ف', 'ك', 'ال', 'وال', 'بال', 'كال', 'فال', 'لل', 'وب', 'ول'})
+    
+    def __init__(self):
+        self.automaton = AhoCorasick()
+        tables = [
+            ('category', ArabicTextProcessor.CATEGORIES),
+            ('location', {location: [location] for location in ArabicTextProcessor.LOCATIONS}),
+            ('brand', ArabicTextProcessor.BRANDS),
+            ('product_category', ArabicTextProcessor.PRODUCT_CATEGORIES)
+        ]
+        for kind, table in tables:
+            for entry_index, (value, keywords) in enumerate(table.items()):
+                for keyword_index, keyword in enumerate(keywords):
+                    pattern = ArabicTextProcessor.clean_text(keyword).lower()
+                    self.automaton.add(pattern, (kind, value, keyword, (entry_index, keyword_index), pattern.isascii()))
+        self.automaton.build()
+    
+    def scan(self, text: str) -> List[EntityHit]:
+        """
+        Find every entity keyword in raw text
+        
+        Args:
+            text (str): Raw message or ad text
+            
+        Returns:
+            List of hits in text order
+        """
+        return self.scan_clean(ArabicTextProcessor.clean_text(text).lower())
+    
+    def scan_clean(self, text: str) -> List[EntityHit]:
+        """scan() on lower-cased clean_text output"""
+        hits = []
+        for start, end, (kind, value, keyword, priority, whole_word) in self.automaton.scan(text):
+            if whole_word and not self._is_word(text, start, end):
+                continue
+            hits.append(EntityHit(kind, value, keyword, start, end, priority,
+                                  whole_word or self._is_token(text, start, end)))
+        return hits
+    
+    def scan_many(self, texts: List[str]) -> List[List[EntityHit]]:
+        """
+        Scan a batch of texts, e.g. when indexing ads in bulk
+        
+        Args:
+            texts (List[str]): Raw texts, non-strings are treated as empty
+            
+        Returns:
+            Hits of each text
+        """
+        return [self.scan(text) if isinstance(text, str) else [] for text in texts]
+    
+    @staticmethod
+    def best(hits: List[EntityHit], kind: str, whole_token: bool = False) -> Optional[str]:
+        """
+        Pick the value listed first in its table among hits of a kind, whole-token hits first
+        
+        Args:
+            hits (List[EntityHit]): Hits from scan()
+            kind (str): Entity kind
+            whole_token (bool): Ignore keywords found inside longer words
+            
+        Returns:
+            Canonical value or None
+        """
+        best_hit = None
+        for hit in hits:
+            if hit.kind != kind or (whole_token and not hit.whole_token):
+                continue
+            if best_hit is None or (not hit.whole_token, hit.priority) < (not best_hit.whole_token, best_hit.priority):
+                best_hit = hit
+        return best_hit.value if best_hit else None
+    
+    @staticmethod
+    def values(hits: List[EntityHit], kind: str) -> List[str]:
+        """
+        Distinct values of a kind, in table order
+        
+        Args:
+            hits (List[EntityHit]): Hits from scan()
+            kind (str): Entity kind
+            
+        Returns:
+            List of canonical values
+        """
+        matched = sorted((hit for hit in hits if hit.kind == kind), key=lambda hit: hit.priority)
+        return list(dict.fromkeys(hit.value for hit in matched))
+    
+    @staticmethod
+    def _is_word(text: str, start: int, end: int) -> bool:
+        """Check that a Latin match is not part of a longer Latin word"""
+        before = text[start - 1] if start > 0 else ' '
+        after = text[end] if end < len(text) else ' '
+        return not (before.isascii() and before.isalnum()) and not (after.isascii() and after.isalnum())
+    
+    @classmethod
+    def _is_token(cls, text: str, start: int, end: int) -> bool:
+        """Check that an Arabic match ends its word and only a proclitic precedes it"""
+        if end < len(text) and text[end].isalnum():
+            return False
+        token_start = start
+        while token_start > 0 and text[token_start - 1].isalnum():
+            token_start -= 1
+        return text[token_start:start] in cls.TOKEN_PREFIXES
+
+_entity_matcher = None
+_entity_matcher_lock = threading.Lock()
 
+def get_entity_matcher() -> EntityMatcher:
+    """Get the process-wide entity matcher"""
+    global _entity_matcher
+    if _entity_matcher is None:
+        with _entity_matcher_lock:
+            if _entity_matcher is None:
+                _entity_matcher = EntityMatcher()
+    return _entity_matcher
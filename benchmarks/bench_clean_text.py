@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: per-message cost of Arabic normalization and intent analysis
+Compares the previous multi-regex clean_text (called once per extractor) with
+the single-pass translate-table version that analyze_search_intent shares
+
+Usage:
+    python benchmarks/bench_clean_text.py [--messages 2000] [--repeat 5]
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+import timeit
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from arabic_utils import ArabicTextProcessor
+
+DATASET_PATH = 'dataset/ads_dataset.csv'
+
+SAMPLE_MESSAGES = [
+    'عايز موبايل سامسونج بـ 5 ألف جنيه في القاهرة',
+    'أبحث عن شقة للإيجار في مدينة نصر',
+    'مَرْحَبًا، عندي عربية تويوتا للبيع بسعر 2 مليون',
+    'محتاج لابتوب مستعمل حالة ممتازة',
+]
+
+def legacy_clean_text(text: str) -> str:
+    """clean_text before the single-pass rewrite"""
+    if not text:
+        return ""
+    text = re.sub(r'\s+', ' ', text.strip())
+    text = unicodedata.normalize('NFKC', text)
+    text = re.sub(r'[\u064B-\u065F\u0670\u06D6-\u06ED]', '', text)
+    text = re.sub(r'[آأإ]', 'ا', text)
+    text = re.sub(r'ة', 'ه', text)
+    text = re.sub(r'[يى]', 'ي', text)
+    return text
+
+def legacy_analyze(text: str) -> tuple:
+    """The four normalizations analyze_search_intent used to run per message"""
+    keywords = ArabicTextProcessor.extract_keywords(text)
+    price_text = legacy_clean_text(text)
+    price = None
+    for pattern in ArabicTextProcessor.PRICE_PATTERNS:
+        match = re.search(pattern, price_text)
+        if match:
+            price = int(match.group(1))
+            break
+    category = ArabicTextProcessor._category_from_clean(legacy_clean_text(text).lower())
+    location = ArabicTextProcessor._location_from_clean(legacy_clean_text(text))
+    return keywords, price, category, location
+
+def load_messages(count: int) -> list:
+    """Ad texts from the dataset, padded with sample buyer messages"""
+    messages = []
+    if os.path.exists(DATASET_PATH):
+        with open(DATASET_PATH, encoding='utf-8-sig') as f:
+            messages = [row.get('text') or '' for row in csv.DictReader(f)]
+    messages += SAMPLE_MESSAGES
+    return (messages * (count // len(messages) + 1))[:count]
+
+def main():
+    """Run the benchmark and print per-message costs"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    messages = load_messages(args.messages)
+    mismatches = sum(
+        1 for text in messages
+        if ' '.join(legacy_clean_text(text).split()) != ArabicTextProcessor.clean_text(text)
+    )
+
+    cases = [
+        ('clean_text', lambda: [legacy_clean_text(text) for text in messages],
+         lambda: [ArabicTextProcessor.clean_text(text) for text in messages]),
+        ('analyze_search_intent', lambda: [legacy_analyze(text) for text in messages],
+         lambda: [ArabicTextProcessor.analyze_search_intent(text) for text in messages]),
+    ]
+
+    print(f"{len(messages)} messages, best of {args.repeat} runs, microseconds per message\n")
+    print(f"{'step':<24} | {'before':>9} | {'after':>9} | {'gain':>6}")
+    print('-' * 58)
+    for name, before, after in cases:
+        before_time = min(timeit.repeat(before, number=1, repeat=args.repeat)) / len(messages)
+        after_time = min(timeit.repeat(after, number=1, repeat=args.repeat)) / len(messages)
+        print(f"{name:<24} | {before_time * 1e6:>9.2f} | {after_time * 1e6:>9.2f} | {before_time / after_time:>5.1f}x")
+
+    print(f"\nclean_text outputs differing from the previous version: {mismatches}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: single-process vs sharded catalog search
+Times uncached text searches over a synthetic catalog made by repeating the
+ads dataset, for one in-process engine and for 1..N shard worker processes.
+A speedup needs one free CPU core per shard.
+
+Usage:
+    python benchmarks/bench_sharded_search.py [--size 200000] [--shards 1 2 4 8] [--ranking keyword]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.product_catalog import ProductCatalog
+from models.product_search_engine import ProductSearchEngine
+from models.query_cache import QueryCache
+from models.sharded_search import ShardedProductSearchEngine
+
+QUERIES = [
+    'موبايل سامسونج جالاكسي',
+    'ايفون 14 برو ماكس',
+    'لابتوب ديل للبيع',
+    'شقة للإيجار في القاهرة',
+    'عربية تويوتا كورولا',
+    'تلاجة شارب مستعملة',
+    'ساعة ابل اقل من 5000',
+    'موبايل شاومي رخيص'
+]
+
+def build_catalog(source_path: str, size: int, path: str) -> None:
+    """Write a catalog of size rows made of dataset rows with shuffled words and unique ids"""
+    source = pd.read_csv(source_path)
+    rng = random.Random(42)
+    rows = []
+    for position in range(size):
+        row = source.iloc[position % len(source)].to_dict()
+        words = str(row.get('text', '')).split()
+        rng.shuffle(words)
+        row['id'] = position + 1
+        row['text'] = ' '.join(words)
+        rows.append(row)
+    pd.DataFrame(rows).to_csv(path, index=False)
+
+def time_queries(engine: ProductSearchEngine, ranking: str, rounds: int) -> float:
+    """Mean seconds per uncached search"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in QUERIES:
+            engine.search_with_facets(query, 10, ranking)
+    return (time.perf_counter() - start) / (rounds * len(QUERIES))
+
+def main():
+    """Run the benchmark and print a results table"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', default=os.path.join(os.path.dirname(__file__), '..', 'dataset', 'ads_dataset.csv'))
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--ranking', default='keyword', choices=['keyword', 'bm25'])
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'catalog.csv')
+        build_catalog(args.dataset, args.size, path)
+
+        # A cache that keeps nothing, every search is computed
+        engine = ProductSearchEngine(ProductCatalog(path), cache=QueryCache(max_entries=0))
+        engine.search_with_facets(QUERIES[0], 10, args.ranking)
+        baseline = time_queries(engine, args.ranking, args.rounds)
+
+        print(f"{args.size:,} ads, {args.ranking} ranking, {os.cpu_count()} CPU cores (mean ms per search)\n")
+        print(f"{'engine':>16} | {'ms':>9} | {'speedup':>7}")
+        print('-' * 40)
+        print(f"{'single process':>16} | {baseline * 1000:>9.2f} | {1.0:>6.1f}x")
+
+        for num_shards in args.shards:
+            sharded = ShardedProductSearchEngine(num_shards, catalog=ProductCatalog(path))
+            sharded.cache = QueryCache(max_entries=0)
+            try:
+                sharded.warm_up()
+                sharded.search_with_facets(QUERIES[0], 10, args.ranking)
+                elapsed = time_queries(sharded, args.ranking, args.rounds)
+            finally:
+                sharded.shutdown()
+            print(f"{f'{num_shards} shards':>16} | {elapsed * 1000:>9.2f} | {baseline / elapsed:>6.1f}x")
+
+        if max(args.shards) > (os.cpu_count() or 1):
+            print(f"\nOnly {os.cpu_count()} CPU cores: shards beyond that share cores and run one after"
+                  " another, so no speedup is expected from them")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark: full sort vs bounded top-k selection
+Compares the selection step used by the search paths at different catalog sizes
+
+Usage:
+    python benchmarks/bench_topk.py [--sizes 10000 100000 1000000] [--k 10]
+"""
+
+import argparse
+import heapq
+import random
+import timeit
+
+import numpy as np
+
+def bench_python_matches(size: int, k: int, repeat: int) -> tuple:
+    """Time list sort vs heapq.nlargest over (doc_id, similarity, match_type) tuples"""
+    rng = random.Random(42)
+    scored = [(doc_id, rng.random(), 'partial') for doc_id in range(size)]
+
+    def full_sort():
+        return sorted(scored, key=lambda x: x[1], reverse=True)[:k]
+
+    def heap_select():
+        return heapq.nlargest(k, scored, key=lambda x: x[1])
+
+    assert full_sort() == heap_select()
+    sort_time = min(timeit.repeat(full_sort, number=1, repeat=repeat))
+    heap_time = min(timeit.repeat(heap_select, number=1, repeat=repeat))
+    return sort_time, heap_time
+
+def bench_numpy_similarities(size: int, k: int, repeat: int) -> tuple:
+    """Time np.argsort vs np.argpartition over a similarity vector"""
+    similarities = np.random.default_rng(42).random(size)
+
+    def full_sort():
+        return np.argsort(similarities)[::-1][:k]
+
+    def partition_select():
+        top = np.argpartition(-similarities, k)[:k]
+        return top[np.argsort(-similarities[top], kind='stable')]
+
+    assert np.array_equal(similarities[full_sort()], similarities[partition_select()])
+    sort_time = min(timeit.repeat(full_sort, number=1, repeat=repeat))
+    partition_time = min(timeit.repeat(partition_select, number=1, repeat=repeat))
+    return sort_time, partition_time
+
+def main():
+    """Run the benchmark and print a results table"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Top-{args.k} selection (best of {args.repeat} runs, milliseconds)\n")
+    print(f"{'ads':>10} | {'sort':>9} | {'heapq':>9} | {'gain':>6} || {'argsort':>9} | {'argpart':>9} | {'gain':>6}")
+    print('-' * 80)
+
+    for size in args.sizes:
+        sort_time, heap_time = bench_python_matches(size, args.k, args.repeat)
+        argsort_time, partition_time = bench_numpy_similarities(size, args.k, args.repeat)
+        print(
+            f"{size:>10,} | {sort_time * 1000:>9.2f} | {heap_time * 1000:>9.2f} | {sort_time / heap_time:>5.1f}x"
+            f" || {argsort_time * 1000:>9.2f} | {partition_time * 1000:>9.2f} | {argsort_time / partition_time:>5.1f}x"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Circuit breakers for LLM providers
+
+After FAILURE_THRESHOLD consecutive failed or slow calls a provider's
+breaker opens and its requests fail immediately with CircuitOpenError
+instead of waiting on an API that is down. After RESET_TIMEOUT_SECONDS one
+probe request is let through (half-open): its success closes the breaker,
+its failure opens it again.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+FAILURE_THRESHOLD = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+RESET_TIMEOUT_SECONDS = float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+
+# Successful calls slower than this count as failures
+SLOW_CALL_SECONDS = float(os.getenv('LLM_SLOW_CALL_SECONDS', '10'))
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+
+# Numeric states for dashboards
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open"""
+
+    def __init__(self, name: str):
+        super().__init__(f'{name} circuit breaker is open')
+        self.name = name
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker, safe to share between threads.
+
+    Callers check allow_request() before a call and report its outcome
+    with record_success(), record_failure() or record_ignored() (the call
+    was cancelled, its outcome says nothing about the provider).
+    """
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD,
+                 reset_timeout: float = RESET_TIMEOUT_SECONDS, slow_call_seconds: float = SLOW_CALL_SECONDS):
+        """
+        Create a closed breaker
+
+        Args:
+            name (str): Provider name
+            failure_threshold (int): Consecutive failures that open the breaker
+            reset_timeout (float): Seconds an open breaker waits before a probe
+            slow_call_seconds (float): Duration above which a successful call counts as failed
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_seconds = slow_call_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.successes = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may be made now
+
+        Returns:
+            True if the call should go ahead, False if it must fail fast
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, elapsed: float = 0.0) -> None:
+        """
+        Report a call that returned
+
+        Args:
+            elapsed (float): Duration of the call in seconds
+        """
+        if elapsed > self.slow_call_seconds:
+            with self._lock:
+                self.slow_calls += 1
+            self.record_failure()
+            return
+        with self._lock:
+            self.successes += 1
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+            self.state = CLOSED
+
+    def record_failure(self) -> None:
+        """Report a call that failed, opening the breaker at the threshold or after a failed probe"""
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.times_opened += 1
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def record_ignored(self) -> None:
+        """Report a call that ended without an outcome (cancelled)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get breaker state and counters
+
+        Returns:
+            Dict with state (name and numeric code), consecutive failures, call counters and open duration
+        """
+        with self._lock:
+            return {
+                'state': self.state,
+                'state_code': STATE_CODES[self.state],
+                'consecutive_failures': self.consecutive_failures,
+                'successes': self.successes,
+                'failures': self.failures,
+                'slow_calls': self.slow_calls,
+                'rejected': self.rejected,
+                'times_opened': self.times_opened,
+                'open_seconds': time.monotonic() - self.opened_at if self.state == OPEN else 0.0
+            }
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    Get the process-wide breaker of a provider
+
+    Args:
+        name (str): Provider name, e.g. 'openai' or 'gemini'
+
+    Returns:
+        Shared CircuitBreaker
+    """
+    breaker: Optional[CircuitBreaker] = _circuit_breakers.get(name)
+    if breaker is None:
+        with _circuit_breakers_lock:
+            breaker = _circuit_breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+def circuit_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    Get the stats of every provider breaker created so far
+
+    Returns:
+        Dict of provider name to CircuitBreaker.stats()
+    """
+    with _circuit_breakers_lock:
+        breakers = dict(_circuit_breakers)
+    return {name: breaker.stats() for name, breaker in sorted(breakers.items())}
@@ -1,10 +1,8 @@
-from flask_sqlalchemy import SQLAlchemy
+from database import db
 from datetime import datetime
 from enum import Enum
 import json
 
-db = SQLAlchemy()
-
 class ConversationState(Enum):
     INITIAL = "initial"
     WAITING_USER_TYPE = "waiting_user_type"
@@ -0,0 +1,23 @@
+from flask_sqlalchemy import SQLAlchemy
+
+# Shared by every model module so relationships (Ad.user) resolve in one
+# registry and apps only need db.init_app(app)
+db = SQLAlchemy()
+
+def ensure_indexes(engine, model):
+    """
+    Create the model's declared indexes missing from an existing table
+
+    create_all() skips tables that already exist, so indexes added to
+    __table_args__ later would only reach fresh databases. Each index is
+    created only if it is not there yet (CREATE INDEX after a check).
+
+    Args:
+        engine: SQLAlchemy engine of the database
+        model: Mapped model whose __table__ indexes to create
+    """
+    for index in model.__table__.indexes:
+        try:
+            index.create(bind=engine, checkfirst=True)
+        except Exception as e:
+            print(f"Error creating index {index.name}: {e}")
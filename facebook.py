@@ -4,6 +4,7 @@ import hmac
 import hashlib
 from typing import Dict, Any, Optional
 from flask import request, jsonify
+from http_client import get_http_session
 
 class FacebookMessenger:
     """Facebook Messenger integration for the chatbot"""
@@ -106,7 +107,7 @@ class FacebookMessenger:
         params = {'access_token': self.page_access_token}
         
         try:
-            response = requests.post(url, json=payload, params=params)
+            response = get_http_session().post(url, json=payload, params=params)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
@@ -160,7 +161,7 @@ class FacebookMessenger:
         }
         
         try:
-            response = requests.get(url, params=params)
+            response = get_http_session().get(url, params=params)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -186,7 +187,7 @@ class FacebookMessenger:
         params = {'access_token': self.page_access_token}
         
         try:
-            response = requests.post(url, json=payload, params=params)
+            response = get_http_session().post(url, json=payload, params=params)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
@@ -211,7 +212,7 @@ class FacebookMessenger:
         params = {'access_token': self.page_access_token}
         
         try:
-            response = requests.post(url, json=payload, params=params)
+            response = get_http_session().post(url, json=payload, params=params)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
@@ -0,0 +1,242 @@
+"""
+SQLite FTS5 full-text search for ads tables
+
+Each ads table gets an FTS5 mirror ("<table>_fts") holding the text after
+ArabicAnalyzer processing (normalization, stop words, light stemming), so
+database search matches the same terms as the in-memory search indexes.
+
+Triggers never call Python: inserts and updates copy the raw text into a
+"<table>_fts_pending" queue, so any writer (the apps, plain sqlite3
+scripts, the sqlite3 shell) can change ads. Queued rows are analyzed in
+Python and moved into the mirror before the next full-text search.
+"""
+
+import sqlite3
+from typing import Optional
+
+from sqlalchemy import column, func, literal_column, table, text
+from sqlalchemy.engine import Engine
+
+from arabic_utils import ArabicAnalyzer, get_arabic_analyzer
+
+FTS_SUFFIX = '_fts'
+PENDING_SUFFIX = '_fts_pending'
+META_TABLE = 'fts_meta'
+
+# (database url, FTS table) pairs known to exist
+_known_fts_tables = set()
+
+def arabic_normalize(value) -> str:
+    """Analyzed terms of a text column joined by spaces, the indexed FTS body"""
+    if not isinstance(value, str) or not value:
+        return ''
+    return ' '.join(get_arabic_analyzer().analyze(value))
+
+def fts_available(connection: sqlite3.Connection) -> bool:
+    """Check whether the SQLite library was built with FTS5"""
+    try:
+        connection.execute('CREATE VIRTUAL TABLE IF NOT EXISTS temp.fts5_probe USING fts5(body)')
+        connection.execute('DROP TABLE temp.fts5_probe')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def ensure_fts_index(engine: Engine, table: str, column: str = 'enhanced_text') -> bool:
+    """
+    Create the FTS5 mirror of an ads table, its triggers, and fill it
+
+    The mirror is rebuilt when it was built with another analyzer version,
+    otherwise rows queued by the triggers are indexed.
+
+    Args:
+        engine (Engine): SQLAlchemy engine of the database
+        table (str): Ads table name
+        column (str): Text column to index
+
+    Returns:
+        True if full-text search is available for the table
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    fts_table = f'{table}{FTS_SUFFIX}'
+    pending_table = f'{table}{PENDING_SUFFIX}'
+    try:
+        raw = engine.raw_connection()
+        try:
+            connection = raw.driver_connection if hasattr(raw, 'driver_connection') else raw.connection
+            if not fts_available(connection):
+                return False
+
+            exists = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()
+            if not exists:
+                return False
+
+            # Drop triggers of older versions, they called a Python SQL function
+            connection.executescript(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table}
+                    USING fts5(body, tokenize = 'unicode61 remove_diacritics 2');
+                CREATE TABLE IF NOT EXISTS {pending_table} (
+                    id INTEGER PRIMARY KEY,
+                    body TEXT
+                );
+                CREATE TABLE IF NOT EXISTS {META_TABLE} (
+                    table_name TEXT PRIMARY KEY,
+                    analyzer_version INTEGER NOT NULL
+                );
+                DROP TRIGGER IF EXISTS {fts_table}_insert;
+                DROP TRIGGER IF EXISTS {fts_table}_update;
+                DROP TRIGGER IF EXISTS {fts_table}_delete;
+                CREATE TRIGGER {fts_table}_insert AFTER INSERT ON {table} BEGIN
+                    INSERT OR REPLACE INTO {pending_table}(id, body) VALUES (new.id, new.{column});
+                END;
+                CREATE TRIGGER {fts_table}_update AFTER UPDATE OF {column} ON {table} BEGIN
+                    INSERT OR REPLACE INTO {pending_table}(id, body) VALUES (new.id, new.{column});
+                END;
+                CREATE TRIGGER {fts_table}_delete AFTER DELETE ON {table} BEGIN
+                    DELETE FROM {fts_table} WHERE rowid = old.id;
+                    DELETE FROM {pending_table} WHERE id = old.id;
+                END;
+            """)
+
+            row = connection.execute(
+                f'SELECT analyzer_version FROM {META_TABLE} WHERE table_name = ?', (table,)
+            ).fetchone()
+            if row is None or row[0] != ArabicAnalyzer.VERSION:
+                connection.execute(f'DELETE FROM {fts_table}')
+                connection.execute(f'DELETE FROM {pending_table}')
+                connection.executemany(
+                    f'INSERT INTO {fts_table}(rowid, body) VALUES (?, ?)',
+                    [(ad_id, arabic_normalize(body))
+                     for ad_id, body in connection.execute(f'SELECT id, {column} FROM {table}')]
+                )
+                connection.execute(
+                    f'INSERT OR REPLACE INTO {META_TABLE}(table_name, analyzer_version) VALUES (?, ?)',
+                    (table, ArabicAnalyzer.VERSION)
+                )
+            else:
+                _index_pending(connection, table)
+            connection.commit()
+            return True
+        finally:
+            raw.close()
+    except Exception as e:
+        print(f"Error creating full-text index for {table}: {e}")
+        return False
+
+def sync_fts_index(model) -> int:
+    """
+    Index the rows the triggers queued since the last search
+
+    Runs in its own transaction, so the caller's session is not committed.
+
+    Args:
+        model: Mapped ads model with an FTS5 mirror
+
+    Returns:
+        Number of rows indexed
+    """
+    table_name = model.__tablename__
+    try:
+        engine = model.query.session.get_bind()
+        with engine.connect() as connection:
+            if connection.execute(text(f'SELECT 1 FROM {table_name}{PENDING_SUFFIX} LIMIT 1')).first() is None:
+                return 0
+        raw = engine.raw_connection()
+        try:
+            connection = raw.driver_connection if hasattr(raw, 'driver_connection') else raw.connection
+            indexed = _index_pending(connection, table_name)
+            connection.commit()
+            return indexed
+        finally:
+            raw.close()
+    except Exception as e:
+        # Search still runs, the queued rows are indexed next time
+        print(f"Error indexing queued rows of {table_name}: {e}")
+        return 0
+
+def _index_pending(connection: sqlite3.Connection, table_name: str) -> int:
+    """Move queued rows into the FTS mirror on a sqlite3 connection, the caller commits"""
+    fts_table = f'{table_name}{FTS_SUFFIX}'
+    pending_table = f'{table_name}{PENDING_SUFFIX}'
+    rows = connection.execute(f'SELECT id, body FROM {pending_table}').fetchall()
+    if not rows:
+        return 0
+    connection.executemany(f'DELETE FROM {fts_table} WHERE rowid = ?', [(ad_id,) for ad_id, _ in rows])
+    connection.executemany(
+        f'INSERT INTO {fts_table}(rowid, body) VALUES (?, ?)',
+        [(ad_id, arabic_normalize(body)) for ad_id, body in rows]
+    )
+    # A row queued again meanwhile keeps its newer text
+    connection.executemany(
+        f'DELETE FROM {pending_table} WHERE id = ? AND body IS ?', rows
+    )
+    return len(rows)
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Turn a buyer query into an FTS5 MATCH expression
+
+    Every analyzed term must appear, terms are quoted so user input cannot
+    inject FTS5 syntax.
+
+    Args:
+        query (str): Raw search text
+
+    Returns:
+        MATCH expression, or None if the query has no searchable terms
+    """
+    terms = list(dict.fromkeys(get_arabic_analyzer().analyze(query)))
+    if not terms:
+        return None
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+def fts_search(query_obj, model, query: str, rank: bool = True):
+    """
+    Restrict an ORM query to ads matching the text, ranked by bm25()
+
+    Args:
+        query_obj: SQLAlchemy query over model
+        model: Mapped ads model with an FTS5 mirror
+        query (str): Raw search text
+        rank (bool): Order by bm25(), False to only filter
+
+    Returns:
+        Filtered and ordered query, or None if full-text search cannot be used
+        (no searchable terms or no FTS5 table)
+    """
+    match = build_match_query(query)
+    if match is None or not has_fts_index(model):
+        return None
+    sync_fts_index(model)
+
+    fts_name = f'{model.__tablename__}{FTS_SUFFIX}'
+    fts_table = table(fts_name, column('rowid'))
+    query_obj = (
+        query_obj
+        .join(fts_table, fts_table.c.rowid == model.id)
+        .filter(literal_column(fts_name).op('MATCH')(match))
+    )
+    if rank:
+        query_obj = query_obj.order_by(func.bm25(literal_column(fts_name)))
+    return query_obj
+
+def has_fts_index(model) -> bool:
+    """Check whether the model's table has an FTS5 mirror in its database"""
+    fts_table = f'{model.__tablename__}{FTS_SUFFIX}'
+    try:
+        session = model.query.session
+        key = (str(session.get_bind().url), fts_table)
+        if key in _known_fts_tables:
+            return True
+        found = session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': fts_table}
+        ).first() is not None
+    except Exception:
+        return False
+    if found:
+        _known_fts_tables.add(key)
+    return found
@@ -0,0 +1,166 @@
+"""
+Shared HTTP client for outbound integrations
+
+Gemini and the messaging platforms (Facebook, Instagram, WhatsApp,
+Telegram) send their requests through pooled sessions instead of bare
+requests.get/post calls, so connections to each API host are kept alive
+and reused across requests instead of paying a new TCP and TLS handshake
+every time. Every request gets a connect and read timeout unless the call
+passes its own, and transient failures are retried with exponential
+backoff. Async LLM calls get the same pooling, timeouts and retries from a
+shared httpx.AsyncClient.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Dict, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Seconds to establish a connection and to wait for response data
+CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '3.05'))
+READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+DEFAULT_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Hosts with a pool, and kept-alive connections per host
+POOL_HOSTS = 16
+POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '32'))
+
+# Retries after the first attempt, waits are backoff * 2 ** (retry - 1) seconds
+MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '3'))
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class TimeoutSession(requests.Session):
+    """requests.Session that applies a default timeout to every request"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().request(method, url, **kwargs)
+
+def create_http_session(retry_post: bool = False, timeout=DEFAULT_TIMEOUT) -> TimeoutSession:
+    """
+    Create a pooled session with timeouts and retries
+
+    Connection failures are retried for every method, since the request
+    never reached the server. Read errors and 429/5xx responses are only
+    retried for idempotent methods, and for POST when retry_post is set:
+    resending a platform message after a timeout could deliver it twice,
+    while a repeated generateContent call is harmless. Retry-After headers
+    are honoured.
+
+    Args:
+        retry_post (bool): Also retry POST requests after read errors and retryable statuses
+        timeout: Default (connect, read) timeout in seconds
+
+    Returns:
+        New TimeoutSession
+    """
+    allowed_methods = set(Retry.DEFAULT_ALLOWED_METHODS)
+    if retry_post:
+        allowed_methods.add('POST')
+
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(allowed_methods),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE, max_retries=retry)
+
+    session = TimeoutSession(timeout)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+_http_sessions: Dict[bool, TimeoutSession] = {}
+_http_sessions_lock = threading.Lock()
+
+def get_http_session(retry_post: bool = False) -> TimeoutSession:
+    """
+    Get the process-wide session for outbound API calls
+
+    Args:
+        retry_post (bool): Session that also retries POST, for idempotent APIs such as Gemini
+
+    Returns:
+        Shared TimeoutSession
+    """
+    session: Optional[TimeoutSession] = _http_sessions.get(retry_post)
+    if session is None:
+        with _http_sessions_lock:
+            session = _http_sessions.get(retry_post)
+            if session is None:
+                session = create_http_session(retry_post)
+                _http_sessions[retry_post] = session
+    return session
+
+_async_http_client: Optional[httpx.AsyncClient] = None
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide async client, pooled like the blocking sessions
+
+    Its connections belong to one event loop, use it only from the LLM
+    runtime loop (llm_runtime.LLMRuntime.submit).
+
+    Returns:
+        Shared httpx.AsyncClient
+    """
+    global _async_http_client
+    if _async_http_client is None:
+        with _http_sessions_lock:
+            if _async_http_client is None:
+                _async_http_client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                    limits=httpx.Limits(max_connections=POOL_HOSTS * POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+                    transport=httpx.AsyncHTTPTransport(retries=MAX_RETRIES)
+                )
+    return _async_http_client
+
+async def async_post(url: str, **kwargs) -> httpx.Response:
+    """
+    POST with the shared async client, retrying like a retry_post session
+
+    Only for idempotent APIs: read errors, timeouts and 429/5xx responses
+    are retried with exponential backoff, honouring Retry-After. Connection
+    failures are retried by the transport.
+
+    Args:
+        url (str): Request URL
+        **kwargs: httpx request arguments (json, headers, timeout, ...)
+
+    Returns:
+        Last response (which may still have a retryable status)
+    """
+    client = get_async_http_client()
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            response = await client.post(url, **kwargs)
+        except (httpx.ReadError, httpx.ReadTimeout, httpx.RemoteProtocolError):
+            if attempt == MAX_RETRIES:
+                raise
+            delay = BACKOFF_FACTOR * 2 ** attempt
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return response
+            delay = _retry_after(response) or BACKOFF_FACTOR * 2 ** attempt
+        await asyncio.sleep(delay)
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds from a numeric Retry-After header"""
+    try:
+        return max(0.0, float(response.headers.get('Retry-After', '')))
+    except ValueError:
+        return None
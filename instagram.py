@@ -3,6 +3,7 @@ import requests
 import hmac
 import hashlib
 from typing import Dict, Any, Optional
+from http_client import get_http_session
 
 class InstagramMessaging:
     """Instagram Messaging API integration for the chatbot"""
@@ -104,7 +105,7 @@ class InstagramMessaging:
         params = {'access_token': self.page_access_token}
         
         try:
-            response = requests.post(url, json=payload, params=params)
+            response = get_http_session().post(url, json=payload, params=params)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
@@ -158,7 +159,7 @@ class InstagramMessaging:
         }
         
         try:
-            response = requests.get(url, params=params)
+            response = get_http_session().get(url, params=params)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -181,7 +182,7 @@ class InstagramMessaging:
         params = {'access_token': self.page_access_token}
         
         try:
-            response = requests.post(url, json=payload, params=params)
+            response = get_http_session().post(url, json=payload, params=params)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
@@ -201,7 +202,7 @@ class InstagramMessaging:
         }
         
         try:
-            response = requests.get(url, params=params)
+            response = get_http_session().get(url, params=params)
             response.raise_for_status()
             data = response.json()
             
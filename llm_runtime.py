@@ -0,0 +1,183 @@
+"""
+Shared asyncio runtime for LLM calls
+
+OpenAI and Gemini requests run as coroutines on one background event loop
+instead of each holding a worker thread for the whole call, so a process
+can keep hundreds of requests in flight on a single thread. Each provider
+has a semaphore that bounds how many of its requests run at once; callers
+beyond the limit wait on the loop without using a connection. Requests to
+a provider whose circuit breaker is open fail immediately.
+
+Blocking code (Flask views) uses run() or start(), async code awaits
+submit() from any event loop.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, Optional
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError, get_circuit_breaker
+
+# Requests per provider allowed to run at the same time
+PROVIDER_CONCURRENCY = {
+    'openai': int(os.getenv('OPENAI_MAX_CONCURRENCY', '64')),
+    'gemini': int(os.getenv('GEMINI_MAX_CONCURRENCY', '32'))
+}
+DEFAULT_CONCURRENCY = 16
+
+class LLMRuntime:
+    """
+    Background event loop thread with per-provider concurrency limits.
+
+    Clients holding connections (AsyncOpenAI, httpx.AsyncClient) must only
+    be used inside submit(), which always runs them on this loop.
+    """
+
+    def __init__(self, concurrency: Optional[Dict[str, int]] = None):
+        """
+        Start the event loop thread
+
+        Args:
+            concurrency (Dict[str, int]): Limits overriding PROVIDER_CONCURRENCY
+        """
+        self.concurrency = dict(PROVIDER_CONCURRENCY, **(concurrency or {}))
+        self.loop = asyncio.new_event_loop()
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._running: Dict[str, int] = defaultdict(int)
+        self._waiting: Dict[str, int] = defaultdict(int)
+        self._thread = threading.Thread(target=self.loop.run_forever, name='llm-runtime', daemon=True)
+        self._thread.start()
+
+    def run(self, coroutine: Coroutine) -> Any:
+        """
+        Run a coroutine on the runtime loop and block until it finishes
+
+        Args:
+            coroutine (Coroutine): Coroutine to run
+
+        Returns:
+            Result of the coroutine
+        """
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError('LLMRuntime.run() would block its own event loop, await the coroutine instead')
+        return self.start(coroutine).result()
+
+    def start(self, coroutine: Coroutine) -> Future:
+        """
+        Schedule a coroutine on the runtime loop without waiting for it
+
+        Args:
+            coroutine (Coroutine): Coroutine to run
+
+        Returns:
+            Future of the result, waiting on it with a timeout leaves the coroutine running
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    async def submit(self, provider: str, coroutine: Coroutine) -> Any:
+        """
+        Run a provider request on the runtime loop within the provider's concurrency limit
+
+        Exceptions and calls slower than the breaker's slow-call limit count
+        as failures of the provider's circuit breaker.
+
+        Args:
+            provider (str): Provider name, e.g. 'openai' or 'gemini'
+            coroutine (Coroutine): Request coroutine, it should raise on error responses
+
+        Returns:
+            Result of the coroutine
+
+        Raises:
+            CircuitOpenError: The provider's breaker is open, the request was not sent
+        """
+        breaker = get_circuit_breaker(provider)
+        if not breaker.allow_request():
+            coroutine.close()
+            raise CircuitOpenError(provider)
+
+        limited = self._limited(provider, coroutine, breaker)
+        if asyncio.get_running_loop() is self.loop:
+            return await limited
+        future: Future = asyncio.run_coroutine_threadsafe(limited, self.loop)
+
+        def release_if_cancelled(done: Future) -> None:
+            # Cancelled before _limited started, it could not report anything
+            if done.cancelled():
+                breaker.record_ignored()
+
+        future.add_done_callback(release_if_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get per-provider load
+
+        Returns:
+            Dict of provider to its limit, running and waiting request counts
+        """
+        providers = set(self.concurrency) | set(self._running)
+        return {
+            provider: {
+                'limit': self.concurrency.get(provider, DEFAULT_CONCURRENCY),
+                'running': self._running[provider],
+                'waiting': self._waiting[provider]
+            }
+            for provider in sorted(providers)
+        }
+
+    async def _limited(self, provider: str, coroutine: Coroutine, breaker: CircuitBreaker) -> Any:
+        """Await coroutine holding one of the provider's slots and report its outcome (runs on the runtime loop)"""
+        semaphore = self._semaphores.get(provider)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.concurrency.get(provider, DEFAULT_CONCURRENCY))
+            self._semaphores[provider] = semaphore
+
+        self._waiting[provider] += 1
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            coroutine.close()
+            breaker.record_ignored()
+            raise
+        finally:
+            self._waiting[provider] -= 1
+
+        # Timed after the slot is acquired, waiting for our own limit is not provider latency
+        self._running[provider] += 1
+        started = time.monotonic()
+        try:
+            result = await coroutine
+        except Exception:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.record_ignored()
+            raise
+        finally:
+            self._running[provider] -= 1
+            semaphore.release()
+        breaker.record_success(time.monotonic() - started)
+        return result
+
+_llm_runtime: Optional[LLMRuntime] = None
+_llm_runtime_lock = threading.Lock()
+
+def get_llm_runtime() -> LLMRuntime:
+    """
+    Get the process-wide LLM runtime (its loop thread starts on first use)
+
+    Returns:
+        Shared LLMRuntime
+    """
+    global _llm_runtime
+    if _llm_runtime is None:
+        with _llm_runtime_lock:
+            if _llm_runtime is None:
+                _llm_runtime = LLMRuntime()
+    return _llm_runtime
@@ -8,13 +8,16 @@ Contains AI models and search engines for the chatbot system
 
 from .gemini_image_search import GeminiImageSearchModel, create_gemini_image_search_model
 from .product_search_engine import ProductSearchEngine, ProductMatch, create_product_search_engine
+from .product_catalog import ProductCatalog, get_product_catalog
 
 __all__ = [
     'GeminiImageSearchModel',
     'create_gemini_image_search_model',
     'ProductSearchEngine', 
     'ProductMatch',
-    'create_product_search_engine'
+    'create_product_search_engine',
+    'ProductCatalog',
+    'get_product_catalog'
 ]
 
 __version__ = '1.0.0'
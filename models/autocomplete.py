@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Autocomplete for Arabic AI Chatbot
+Prefix suggestions over ad title n-grams and buyer queries, served from a sorted array
+"""
+
+import bisect
+import heapq
+import math
+import re
+import threading
+import weakref
+from collections import Counter
+from typing import Dict, List, Optional
+
+from arabic_utils import ArabicTextProcessor, get_arabic_analyzer
+from .product_catalog import ProductCatalog, get_product_catalog
+
+# Phrases are title n-grams of up to this many words
+MAX_PHRASE_WORDS = 3
+
+# A logged buyer query counts as much as this many ads containing the phrase
+QUERY_LOG_WEIGHT = 2.0
+
+# Cached prefix results, dropped whenever the phrases change
+PREFIX_CACHE_SIZE = 4096
+
+# Logged queries kept at most; past it the least logged half is forgotten
+# and the counts of the rest are halved, so new searches can catch up
+MAX_LOGGED_QUERIES = 10000
+
+WORD_PATTERN = re.compile(r'[^\s\-–,.:;!?؟،؛()\[\]"\'/|]+')
+SEGMENT_SPLIT_PATTERN = re.compile(r'\s[-–|]\s|[,.:;!?؟،؛()\[\]]')
+
+def suggestion_key(text: str) -> str:
+    """Normalized form used to match prefixes (clean_text, lower-cased)"""
+    return ArabicTextProcessor.clean_text(text).lower()
+
+def same_id(first, second) -> bool:
+    """Compare ad ids, a missing id (None or NaN from an empty CSV cell) equals another missing id"""
+    if first == second:
+        return True
+    return _is_missing(first) and _is_missing(second)
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+class AutocompleteIndex:
+    """
+    Sorted array of normalized phrases searched with bisect.
+
+    Phrases are word n-grams of ad titles (brand and model names included)
+    and logged buyer queries. Each phrase is weighted by the number of ads
+    containing it plus QUERY_LOG_WEIGHT per logged query, and is displayed
+    in its most common original spelling. At most MAX_LOGGED_QUERIES
+    queries are kept.
+    """
+
+    def __init__(self, products: Optional[List[Dict]] = None):
+        """
+        Build the index
+
+        Args:
+            products (List[Dict]): Catalog snapshot
+        """
+        self.keys: List[str] = []
+        self.ad_counts: Counter = Counter()
+        self.query_counts: Counter = Counter()
+        self.spellings: Dict[str, Counter] = {}
+        self.indexed_ids: List = []
+        self._prefix_cache: Dict[tuple, List[str]] = {}
+        self._lock = threading.Lock()
+
+        keys = set()
+        for product in products or []:
+            keys.update(self._count_product(product))
+        self.keys = sorted(keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add_product(self, product: Dict) -> None:
+        """
+        Add the phrases of a newly approved ad without rebuilding
+
+        Args:
+            product (Dict): Product record
+        """
+        with self._lock:
+            for key in self._count_product(product):
+                self._insert_key(key)
+            self._prefix_cache.clear()
+
+    def record_query(self, query: str) -> None:
+        """
+        Log a buyer query so popular searches rank higher
+
+        Words that no ad title contains are left out ("ايفون القاهرة" is
+        logged as "ايفون"), so typos fixed by the search and places are not
+        offered back as suggestions.
+
+        Args:
+            query (str): Raw query text
+        """
+        words = WORD_PATTERN.findall(query or '')
+        if not words or len(words) > MAX_PHRASE_WORDS + 2:
+            return
+        useful = [self._is_useful_word(word) for word in words]
+        kept = [
+            (word, is_useful) for word, is_useful in zip(words, useful)
+            if not is_useful or self.ad_counts[suggestion_key(word)]
+        ]
+        # Stop words and numbers may only sit between title words
+        while kept and not kept[0][1]:
+            kept.pop(0)
+        while kept and not kept[-1][1]:
+            kept.pop()
+        surface = ' '.join(word for word, _ in kept)
+        key = suggestion_key(surface)
+        if not key:
+            return
+        with self._lock:
+            self.query_counts[key] += 1
+            self.spellings.setdefault(key, Counter())[surface] += 1
+            self._insert_key(key)
+            if len(self.query_counts) > MAX_LOGGED_QUERIES:
+                self._prune_queries()
+            self._prefix_cache.clear()
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[str]:
+        """
+        Complete a typed prefix
+
+        Args:
+            prefix (str): Text typed so far
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            Suggestions, highest weight first
+        """
+        key = suggestion_key(prefix)
+        if not key:
+            return []
+
+        cache_key = (key, limit)
+        cached = self._prefix_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
+        with self._lock:
+            start = bisect.bisect_left(self.keys, key)
+            end = bisect.bisect_left(self.keys, key + '￿', lo=start)
+            best = heapq.nsmallest(
+                limit,
+                (self.keys[i] for i in range(start, end) if self.keys[i] != key or end - start == 1),
+                key=lambda phrase: (-self._weight(phrase), len(phrase), phrase)
+            )
+            suggestions = [self.spellings[phrase].most_common(1)[0][0] for phrase in best]
+
+            if len(self._prefix_cache) >= PREFIX_CACHE_SIZE:
+                self._prefix_cache.clear()
+            self._prefix_cache[cache_key] = suggestions
+        return list(suggestions)
+
+    def _prune_queries(self) -> None:
+        """Keep the most logged half of the queries with halved counts, drop phrases only they added"""
+        kept = dict(heapq.nlargest(MAX_LOGGED_QUERIES // 2, self.query_counts.items(), key=lambda item: item[1]))
+        dropped = {key for key in self.query_counts if key not in kept and not self.ad_counts[key]}
+        self.query_counts = Counter({key: (count + 1) // 2 for key, count in kept.items()})
+        if dropped:
+            self.keys = [key for key in self.keys if key not in dropped]
+            for key in dropped:
+                del self.spellings[key]
+
+    def _weight(self, key: str) -> float:
+        return self.ad_counts[key] + QUERY_LOG_WEIGHT * self.query_counts[key]
+
+    def _insert_key(self, key: str) -> None:
+        """Insert a key into the sorted array if it is new"""
+        position = bisect.bisect_left(self.keys, key)
+        if position == len(self.keys) or self.keys[position] != key:
+            self.keys.insert(position, key)
+
+    def _count_product(self, product: Dict) -> set:
+        """Count the title phrases of a product, returns its phrase keys"""
+        self.indexed_ids.append(product.get('id'))
+        keys = set()
+        for surface in self._title_phrases(product):
+            key = suggestion_key(surface)
+            self.spellings.setdefault(key, Counter())[surface] += 1
+            keys.add(key)
+        for key in keys:
+            self.ad_counts[key] += 1
+        return keys
+
+    @staticmethod
+    def _is_useful_word(word: str) -> bool:
+        """Words a phrase may start or end with: not a stop word or number"""
+        return bool(get_arabic_analyzer().analyze(word)) and not word.isdigit()
+
+    @staticmethod
+    def _title_phrases(product: Dict) -> List[str]:
+        """Word n-grams of the title that do not start or end with a stop word or number"""
+        title = product.get('title')
+        if not isinstance(title, str) or not title.strip():
+            text = product.get('text')
+            title = SEGMENT_SPLIT_PATTERN.split(text)[0] if isinstance(text, str) else ''
+
+        phrases = []
+        for segment in SEGMENT_SPLIT_PATTERN.split(title):
+            words = WORD_PATTERN.findall(segment)
+            useful = [AutocompleteIndex._is_useful_word(word) for word in words]
+            for size in range(1, MAX_PHRASE_WORDS + 1):
+                for start in range(len(words) - size + 1):
+                    if useful[start] and useful[start + size - 1]:
+                        phrases.append(' '.join(words[start:start + size]))
+        return phrases
+
+class AutocompleteService:
+    """
+    Autocomplete over the shared catalog.
+
+    When the catalog snapshot changes only by appended ads (the approval
+    path), the new ads are added to the existing index; any other change
+    rebuilds it. Logged queries survive rebuilds.
+    """
+
+    def __init__(self, catalog: Optional[ProductCatalog] = None):
+        """
+        Initialize the service
+
+        Args:
+            catalog (ProductCatalog): Optional catalog, defaults to the shared dataset catalog
+        """
+        self.catalog = catalog or get_product_catalog()
+        self.index: Optional[AutocompleteIndex] = None
+        self.version = None
+        self._lock = threading.Lock()
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[str]:
+        """
+        Complete a typed prefix from the current catalog
+
+        Args:
+            prefix (str): Text typed so far
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            List of suggestions
+        """
+        return self._get_index().suggest(prefix, limit)
+
+    def record_query(self, query: str) -> None:
+        """Log a buyer query that returned results"""
+        self._get_index().record_query(query)
+
+    def _get_index(self) -> AutocompleteIndex:
+        """Bring the index up to date with the catalog snapshot"""
+        products, version = self.catalog.get_snapshot()
+        if self.index is not None and version == self.version:
+            return self.index
+
+        with self._lock:
+            if self.index is None or version != self.version:
+                if self.index is not None and self._is_append(products):
+                    for product in products[len(self.index.indexed_ids):]:
+                        self.index.add_product(product)
+                else:
+                    index = AutocompleteIndex(products)
+                    if self.index is not None:
+                        for key, count in self.index.query_counts.items():
+                            index.query_counts[key] = count
+                            index.spellings.setdefault(key, Counter()).update(self.index.spellings.get(key, {}))
+                            index._insert_key(key)
+                    self.index = index
+                self.version = version
+            return self.index
+
+    def _is_append(self, products: List[Dict]) -> bool:
+        """Check whether products extend the indexed ones"""
+        indexed_ids = self.index.indexed_ids
+        if len(products) < len(indexed_ids):
+            return False
+        if not indexed_ids:
+            return True
+        last = len(indexed_ids) - 1
+        return same_id(products[last].get('id'), indexed_ids[last]) and same_id(products[0].get('id'), indexed_ids[0])
+
+# An entry lives as long as its service is used, and the service keeps its
+# catalog alive, so a catalog id is never reused while its entry exists
+_autocomplete_services: 'weakref.WeakValueDictionary[int, AutocompleteService]' = weakref.WeakValueDictionary()
+_autocomplete_lock = threading.Lock()
+
+def get_autocomplete_service(catalog: Optional[ProductCatalog] = None) -> AutocompleteService:
+    """
+    Get the process-wide autocomplete service for a catalog
+
+    Args:
+        catalog (ProductCatalog): Optional catalog, defaults to the shared dataset catalog
+
+    Returns:
+        Shared AutocompleteService, dropped once nothing uses it
+    """
+    catalog = catalog or get_product_catalog()
+    service = _autocomplete_services.get(id(catalog))
+    if service is None:
+        with _autocomplete_lock:
+            service = _autocomplete_services.get(id(catalog))
+            if service is None:
+                service = AutocompleteService(catalog)
+                _autocomplete_services[id(catalog)] = service
+    return service
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Catalog Columns for Arabic AI Chatbot
+Column-oriented price, location and category data used to pre-filter searches
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from arabic_utils import ArabicTextProcessor
+
+# Code used for rows whose location or category could not be detected
+UNKNOWN_CODE = -1
+
+class CatalogColumns:
+    """
+    NumPy columns over a catalog snapshot.
+
+    Locations and categories are stored as integer codes of the values
+    detected by ArabicTextProcessor, the same detector used on buyer queries,
+    so a query constraint can be turned into a boolean mask in one pass.
+    """
+
+    def __init__(self, products: List[Dict]):
+        """
+        Build the columns
+
+        Args:
+            products (List[Dict]): Catalog snapshot
+        """
+        self.products = products
+        self.location_codes_by_name: Dict[str, int] = {}
+        self.category_codes_by_name: Dict[str, int] = {}
+
+        prices = np.zeros(len(products), dtype=np.float64)
+        location_codes = np.full(len(products), UNKNOWN_CODE, dtype=np.int32)
+        category_codes = np.full(len(products), UNKNOWN_CODE, dtype=np.int32)
+
+        for row, product in enumerate(products):
+            prices[row] = self._to_price(product.get('price'))
+            location_codes[row] = self._encode(self._detect_location(product), self.location_codes_by_name)
+            category_codes[row] = self._encode(self._detect_category(product), self.category_codes_by_name)
+
+        self.prices = prices
+        self.unknown_prices = prices == 0
+        self.location_codes = location_codes
+        self.category_codes = category_codes
+        self.location_names = self._decode_table(self.location_codes_by_name)
+        self.category_names = self._decode_table(self.category_codes_by_name)
+
+        # Row ids ordered by price, a price range is two binary searches and a slice
+        self.price_order = np.argsort(prices, kind='stable')
+        self.sorted_prices = prices[self.price_order]
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def filter_mask(self, price_range: Optional[Tuple[float, float]] = None,
+                    location: Optional[str] = None,
+                    category: Optional[str] = None) -> Optional[np.ndarray]:
+        """
+        Build a boolean row mask for structured query constraints
+
+        Rows without a price, location or category are kept, only rows that
+        contradict a constraint are filtered out.
+
+        Args:
+            price_range (Tuple[float, float]): Inclusive (min, max) price
+            location (str): Location as returned by ArabicTextProcessor.extract_location
+            category (str): Category as returned by ArabicTextProcessor.detect_category(whole_token=True)
+
+        Returns:
+            Boolean array (True = row qualifies), or None when there is no constraint
+        """
+        mask = None
+
+        if price_range:
+            mask = self.unknown_prices.copy()
+            mask[self.price_rows(price_range[0], price_range[1])] = True
+
+        if location:
+            mask = self._and(mask, self._code_mask(self.location_codes, self.location_codes_by_name.get(location)))
+
+        if category:
+            mask = self._and(mask, self._code_mask(self.category_codes, self.category_codes_by_name.get(category)))
+
+        return mask
+
+    def category_rows(self, category: str) -> np.ndarray:
+        """
+        Boolean mask of the rows detected as a category (rows with an unknown category excluded)
+
+        Args:
+            category (str): Category name
+
+        Returns:
+            Boolean array
+        """
+        code = self.category_codes_by_name.get(category)
+        if code is None:
+            return np.zeros(len(self.products), dtype=bool)
+        return self.category_codes == code
+
+    def price_rows(self, min_price: float, max_price: float) -> np.ndarray:
+        """
+        Get the rows priced within an inclusive range
+
+        Args:
+            min_price (float): Lowest price
+            max_price (float): Highest price, may be inf
+
+        Returns:
+            Row ids ordered by price (a view, must not be modified)
+        """
+        start = np.searchsorted(self.sorted_prices, min_price, side='left')
+        end = np.searchsorted(self.sorted_prices, max_price, side='right')
+        return self.price_order[start:end]
+
+    @staticmethod
+    def _code_mask(codes: np.ndarray, code: Optional[int]) -> np.ndarray:
+        """Rows with the given code or an unknown code"""
+        unknown = codes == UNKNOWN_CODE
+        if code is None:
+            return unknown
+        return unknown | (codes == code)
+
+    @staticmethod
+    def _and(mask: Optional[np.ndarray], other: np.ndarray) -> np.ndarray:
+        return other if mask is None else mask & other
+
+    @staticmethod
+    def _to_price(value) -> float:
+        """Convert a catalog price to float, 0 when missing"""
+        try:
+            price = float(value)
+        except (TypeError, ValueError):
+            return 0.0
+        return 0.0 if math.isnan(price) else price
+
+    @staticmethod
+    def _detect_location(product: Dict) -> Optional[str]:
+        location = product.get('location')
+        if isinstance(location, str) and location:
+            return ArabicTextProcessor.extract_location(location)
+        return None
+
+    @staticmethod
+    def _detect_category(product: Dict) -> Optional[str]:
+        for field in ('category', 'text'):
+            value = product.get(field)
+            if isinstance(value, str) and value:
+                # A keyword inside a longer word is not enough to file the ad under a category
+                category = ArabicTextProcessor.detect_category(value, whole_token=True)
+                if category:
+                    return category
+        return None
+
+    @staticmethod
+    def _encode(value: Optional[str], codes: Dict[str, int]) -> int:
+        if value is None:
+            return UNKNOWN_CODE
+        if value not in codes:
+            codes[value] = len(codes)
+        return codes[value]
+
+    @staticmethod
+    def _decode_table(codes: Dict[str, int]) -> List[str]:
+        names = [''] * len(codes)
+        for name, code in codes.items():
+            names[code] = name
+        return names
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Facet Index for Arabic AI Chatbot
+Packed row bitmaps per category, location and price bucket, used to count search refinements
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .catalog_columns import CatalogColumns
+
+# (label, inclusive min, exclusive max) in EGP
+PRICE_BUCKETS: List[Tuple[str, float, float]] = [
+    ('أقل من 1000', 0, 1000),
+    ('1000 - 5000', 1000, 5000),
+    ('5000 - 20000', 5000, 20000),
+    ('20000 - 100000', 20000, 100000),
+    ('أكثر من 100000', 100000, float('inf'))
+]
+
+FACET_NAMES = ('category', 'location', 'price')
+
+# Number of set bits of every byte value
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint32)
+
+class FacetIndex:
+    """
+    One packed bitmap (8 rows per byte) per facet value of a catalog snapshot.
+
+    All bitmaps are rows of a single matrix, so counting every facet value
+    for a result set is one AND against the result bitmap and one popcount
+    per byte, instead of a search per value. Rows whose category, location
+    or price is unknown are not counted.
+    """
+
+    def __init__(self, columns: CatalogColumns):
+        """
+        Build the bitmaps
+
+        Args:
+            columns (CatalogColumns): Columns of the snapshot
+        """
+        self.products = columns.products
+        self.size = len(columns)
+        self.values: List[Tuple[str, str]] = []
+        self.price_bounds: Dict[str, Tuple[float, float]] = {}
+
+        masks = []
+        for code, name in enumerate(columns.category_names):
+            self.values.append(('category', name))
+            masks.append(columns.category_codes == code)
+        for code, name in enumerate(columns.location_names):
+            self.values.append(('location', name))
+            masks.append(columns.location_codes == code)
+        for label, low, high in PRICE_BUCKETS:
+            self.values.append(('price', label))
+            self.price_bounds[label] = (low, high)
+            masks.append((columns.prices > 0) & (columns.prices >= low) & (columns.prices < high))
+
+        if masks:
+            self.bitmaps = np.packbits(np.vstack(masks), axis=1)
+        else:
+            self.bitmaps = np.zeros((0, 0), dtype=np.uint8)
+
+    def rows_bitmap(self, rows: Iterable[int]) -> np.ndarray:
+        """
+        Pack a set of row numbers into a bitmap
+
+        Args:
+            rows (Iterable[int]): Row numbers in the snapshot
+
+        Returns:
+            Packed bitmap
+        """
+        selected = np.zeros(self.size, dtype=bool)
+        selected[np.fromiter(rows, dtype=np.int64)] = True
+        return np.packbits(selected)
+
+    def counts(self, rows: Iterable[int], limit: Optional[int] = None) -> Dict[str, List[Dict]]:
+        """
+        Count matching rows per facet value
+
+        Args:
+            rows (Iterable[int]): Row numbers of the result set
+            limit (int): Maximum values per facet
+
+        Returns:
+            Dict of facet name to [{'value', 'count'}] (price buckets also carry
+            'min' and 'max'), largest first (ties by value) except price buckets which keep
+            their order, values without matches are left out
+        """
+        facets: Dict[str, List[Dict]] = {name: [] for name in FACET_NAMES}
+        if self.size == 0 or len(self.values) == 0:
+            return facets
+
+        totals = POPCOUNT[self.bitmaps & self.rows_bitmap(rows)].sum(axis=1)
+        for (facet, value), count in zip(self.values, totals.tolist()):
+            if count == 0:
+                continue
+            entry = {'value': value, 'count': count}
+            if facet == 'price':
+                low, high = self.price_bounds[value]
+                entry['min'] = low
+                entry['max'] = None if high == float('inf') else high
+            facets[facet].append(entry)
+
+        for facet in ('category', 'location'):
+            facets[facet].sort(key=lambda entry: (-entry['count'], entry['value']))
+        if limit is not None:
+            facets = {facet: entries[:limit] for facet, entries in facets.items()}
+        return facets
+
+def merge_facet_counts(facet_counts: List[Dict[str, List[Dict]]], limit: Optional[int] = None) -> Dict[str, List[Dict]]:
+    """
+    Add up facet counts computed over disjoint parts of a catalog
+
+    Args:
+        facet_counts (List[Dict]): Results of FacetIndex.counts
+        limit (int): Maximum values per facet
+
+    Returns:
+        Merged counts in the FacetIndex.counts format
+    """
+    merged: Dict[str, Dict[str, Dict]] = {name: {} for name in FACET_NAMES}
+    for facets in facet_counts:
+        for facet, entries in facets.items():
+            for entry in entries:
+                current = merged[facet].get(entry['value'])
+                if current is None:
+                    merged[facet][entry['value']] = dict(entry)
+                else:
+                    current['count'] += entry['count']
+
+    bucket_order = {label: position for position, (label, _, _) in enumerate(PRICE_BUCKETS)}
+    result = {
+        'category': sorted(merged['category'].values(), key=lambda entry: (-entry['count'], entry['value'])),
+        'location': sorted(merged['location'].values(), key=lambda entry: (-entry['count'], entry['value'])),
+        'price': sorted(merged['price'].values(), key=lambda entry: bucket_order[entry['value']])
+    }
+    if limit is not None:
+        result = {facet: entries[:limit] for facet, entries in result.items()}
+    return result
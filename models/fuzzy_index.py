@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Fuzzy Term Index for Arabic AI Chatbot
+Character-trigram index over the search vocabulary for typo and spelling tolerant lookups
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from arabic_utils import ArabicTextProcessor, get_arabic_analyzer
+
+# Shortest term that may be corrected, and the length from which 2 edits are allowed
+MIN_FUZZY_LENGTH = 4
+TWO_EDITS_LENGTH = 8
+
+def max_edit_distance(term: str) -> int:
+    """
+    Number of edits tolerated for a term of this length
+
+    Args:
+        term (str): Analyzed query term
+
+    Returns:
+        0, 1 or 2
+    """
+    if len(term) < MIN_FUZZY_LENGTH:
+        return 0
+    return 2 if len(term) >= TWO_EDITS_LENGTH else 1
+
+def bounded_edit_distance(source: str, target: str, limit: int) -> Optional[int]:
+    """
+    Levenshtein distance, abandoned as soon as it must exceed limit
+
+    Args:
+        source (str): First string
+        target (str): Second string
+        limit (int): Largest distance of interest
+
+    Returns:
+        Distance, or None if it is greater than limit
+    """
+    if abs(len(source) - len(target)) > limit:
+        return None
+    if len(source) > len(target):
+        source, target = target, source
+
+    previous = list(range(len(target) + 1))
+    for i, source_char in enumerate(source, 1):
+        current = [i] + [0] * len(target)
+        row_min = i
+        for j, target_char in enumerate(target, 1):
+            cost = 0 if source_char == target_char else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if current[j] < row_min:
+                row_min = current[j]
+        if row_min > limit:
+            return None
+        previous = current
+
+    distance = previous[-1]
+    return distance if distance <= limit else None
+
+def trigrams(term: str) -> List[str]:
+    """
+    Distinct character trigrams of a term padded with boundary markers
+
+    Args:
+        term (str): Analyzed term
+
+    Returns:
+        List of trigrams
+    """
+    padded = f'${term}$'
+    return list(dict.fromkeys(padded[i:i + 3] for i in range(len(padded) - 2)))
+
+def is_fuzzy_term(term: str) -> bool:
+    """Numbers and short terms are only matched exactly"""
+    return len(term) >= MIN_FUZZY_LENGTH and not any(char.isdigit() for char in term)
+
+class FuzzyTermIndex:
+    """
+    Trigram posting lists over vocabulary terms.
+
+    A lookup collects the terms sharing enough trigrams with the query term
+    to possibly be within the allowed edit distance (each edit changes at
+    most three trigrams), then verifies only those with a bounded
+    Levenshtein distance.
+    """
+
+    def __init__(self, terms: Iterable[str] = ()):
+        """
+        Build the index
+
+        Args:
+            terms (Iterable[str]): Vocabulary terms
+        """
+        self.terms: List[str] = []
+        self.term_ids: Dict[str, int] = {}
+        self.postings: Dict[str, List[int]] = {}
+
+        for term in terms:
+            self.add_term(term)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def add_term(self, term: str) -> None:
+        """
+        Add a vocabulary term, ignored if known or not eligible for fuzzy matching
+
+        Args:
+            term (str): Analyzed term
+        """
+        if term in self.term_ids or not is_fuzzy_term(term):
+            return
+        term_id = len(self.terms)
+        self.terms.append(term)
+        self.term_ids[term] = term_id
+        for gram in trigrams(term):
+            self.postings.setdefault(gram, []).append(term_id)
+
+    def lookup(self, term: str, max_distance: Optional[int] = None, limit: int = 3) -> List[Tuple[str, int]]:
+        """
+        Find vocabulary terms within a small edit distance
+
+        Args:
+            term (str): Analyzed query term
+            max_distance (int): Allowed edits, defaults to max_edit_distance(term)
+            limit (int): Maximum number of terms returned
+
+        Returns:
+            List of (term, distance), closest first, then in alphabetical order
+        """
+        if not is_fuzzy_term(term):
+            return []
+        if max_distance is None:
+            max_distance = max_edit_distance(term)
+        if max_distance <= 0:
+            return [(term, 0)] if term in self.term_ids else []
+
+        grams = trigrams(term)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for term_id in self.postings.get(gram, ()):
+                shared[term_id] = shared.get(term_id, 0) + 1
+
+        required = max(1, len(grams) - 3 * max_distance)
+        matches = []
+        for term_id, count in shared.items():
+            if count < required:
+                continue
+            candidate = self.terms[term_id]
+            distance = bounded_edit_distance(term, candidate, max_distance)
+            if distance is not None:
+                matches.append((distance, candidate))
+
+        # Ties go by spelling, so shards of a catalog agree on the closest terms
+        matches.sort()
+        return [(candidate, distance) for distance, candidate in matches[:limit]]
+
+    def containing(self, term: str, limit: int = 3) -> List[str]:
+        """
+        Find vocabulary terms that contain a term, e.g. 'شيرت' in 'تيشيرت'
+
+        Candidates must hold every inner trigram of the term, only those
+        are checked for the substring.
+
+        Args:
+            term (str): Analyzed query term
+            limit (int): Maximum number of terms returned
+
+        Returns:
+            List of terms, shortest first, then in alphabetical order
+        """
+        if not is_fuzzy_term(term):
+            return []
+        grams = [gram for gram in trigrams(term) if '$' not in gram]
+        candidates = None
+        for gram in grams:
+            term_ids = set(self.postings.get(gram, ()))
+            candidates = term_ids if candidates is None else candidates & term_ids
+            if not candidates:
+                return []
+
+        matches = sorted(
+            (len(self.terms[term_id]), self.terms[term_id]) for term_id in candidates
+            if term in self.terms[term_id] and self.terms[term_id] != term
+        )
+        return [candidate for _, candidate in matches[:limit]]
+
+_brand_aliases = None
+
+def get_brand_aliases() -> Dict[str, Tuple[str, ...]]:
+    """
+    Map each analyzed brand spelling to all spellings of the brand
+
+    Built from ArabicTextProcessor.BRANDS so "samsung" and "سامسونج"
+    retrieve the same ads.
+
+    Returns:
+        Dict of term -> tuple of alternative terms (including itself)
+    """
+    global _brand_aliases
+    if _brand_aliases is None:
+        analyzer = get_arabic_analyzer()
+        aliases = {}
+        for spellings in ArabicTextProcessor.BRANDS.values():
+            terms = tuple(dict.fromkeys(
+                term for spelling in spellings for term in analyzer.analyze(spelling)
+            ))
+            for term in terms:
+                aliases[term] = terms
+        _brand_aliases = aliases
+    return _brand_aliases
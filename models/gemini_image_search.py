@@ -8,10 +8,23 @@ Handles image analysis and product search functionality
 
 import os
 import base64
-import requests
 import json
 from typing import Dict, List, Optional
 
+from ai_cache import get_ai_cache, make_cache_key
+from arabic_utils import get_arabic_analyzer
+from http_client import async_post, get_http_session
+from llm_runtime import get_llm_runtime
+from single_flight import get_single_flight
+
+TEXT_QUERY_MODEL = 'gemini-pro'
+
+# Bump when the query rewrite prompt changes, older cached rewrites are then ignored
+TEXT_QUERY_PROMPT_VERSION = 1
+
+# AI cache namespace of query rewrites, kept apart from ad enhancements
+TEXT_QUERY_CACHE = 'query_rewrites'
+
 class GeminiImageSearchModel:
     """
     Model for handling image analysis and product search using Gemini AI
@@ -26,6 +39,7 @@ class GeminiImageSearchModel:
         """
         self.api_key = api_key or os.getenv('GEMINI_API_KEY', '')
         self.api_url = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-pro-vision:generateContent'
+        self.text_api_url = f'https://generativelanguage.googleapis.com/v1beta/models/{TEXT_QUERY_MODEL}:generateContent'
         self.arabic_prompt = """
         حلل هذه الصورة واستخرج معلومات المنتج باللغة العربية بدقة.
         
@@ -40,6 +54,18 @@ class GeminiImageSearchModel:
         """
         
     def analyze_image(self, image_path: str) -> Dict[str, any]:
+        """
+        Analyze an image using Gemini AI (blocks until analyze_image_async finishes)
+        
+        Args:
+            image_path (str): Path to the image file
+            
+        Returns:
+            Dict containing analysis results
+        """
+        return get_llm_runtime().run(self.analyze_image_async(image_path))
+        
+    async def analyze_image_async(self, image_path: str) -> Dict[str, any]:
         """
         Analyze an image using Gemini AI and extract product information
         
@@ -105,36 +131,21 @@ class GeminiImageSearchModel:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.post(
-                f"{self.api_url}?key={self.api_key}",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
+            result = await get_llm_runtime().submit('gemini', self._post(self.api_url, payload, headers))
             
-            if response.status_code == 200:
-                result = response.json()
+            if 'candidates' in result and len(result['candidates']) > 0:
+                content = result['candidates'][0]['content']['parts'][0]['text']
+                
+                # Parse the response
+                parsed_result = self._parse_gemini_response(content)
+                parsed_result['confidence'] = self._calculate_confidence(result)
+                parsed_result['success'] = True
                 
-                if 'candidates' in result and len(result['candidates']) > 0:
-                    content = result['candidates'][0]['content']['parts'][0]['text']
-                    
-                    # Parse the response
-                    parsed_result = self._parse_gemini_response(content)
-                    parsed_result['success'] = True
-                    
-                    return parsed_result
-                else:
-                    return {
-                        'success': False,
-                        'error': 'No response from Gemini',
-                        'description': '',
-                        'keywords': [],
-                        'confidence': 0.0
-                    }
+                return parsed_result
             else:
                 return {
                     'success': False,
-                    'error': f'API request failed: {response.status_code}',
+                    'error': 'No response from Gemini',
                     'description': '',
                     'keywords': [],
                     'confidence': 0.0
@@ -159,27 +170,149 @@ class GeminiImageSearchModel:
         Returns:
             List of search keywords
         """
-        # Common Arabic stop words to filter out
-        stop_words = {
-            'في', 'من', 'إلى', 'على', 'عن', 'مع', 'هذا', 'هذه', 'ذلك', 'تلك',
-            'التي', 'الذي', 'التي', 'اللذان', 'اللتان', 'الذين', 'اللواتي',
-            'أن', 'إن', 'كان', 'كانت', 'يكون', 'تكون', 'أو', 'و', 'لكن',
-            'لكن', 'غير', 'سوف', 'قد', 'لقد', 'كل', 'بعض', 'جميع'
-        }
+        # Same analysis as the search indexes, so keywords match indexed terms
+        keywords = list(dict.fromkeys(get_arabic_analyzer().analyze(description)))
         
-        # Split description into words and filter
-        words = description.split()
-        keywords = []
+        return keywords[:10]  # Return top 10 keywords
+
+    def analyze_text_query(self, query: str) -> Dict[str, any]:
+        """
+        Rewrite a buyer's text query using Gemini (blocks until analyze_text_query_async finishes)
+
+        Args:
+            query (str): Buyer's search query in Arabic
+
+        Returns:
+            Dict with product type, price, location, specifications and keywords
+        """
+        return get_llm_runtime().run(self.analyze_text_query_async(query))
+
+    async def analyze_text_query_async(self, query: str) -> Dict[str, any]:
+        """
+        Rewrite a buyer's text query into search keywords using Gemini
+
+        Identical queries sent by several users at the same time share one
+        API request, and rewrites are cached so a rewrite that arrives after
+        the buyer was answered still serves the next identical query.
+
+        Args:
+            query (str): Buyer's search query in Arabic
+
+        Returns:
+            Dict with product type, price, location, specifications and keywords
+        """
+        if not self.api_key:
+            return {
+                'success': False,
+                'error': 'Gemini API key not configured',
+                'keywords': '',
+                'enhanced_query': query
+            }
+
+        prompt = f"""
+        حلل طلب البحث التالي واستخرج معلومات المنتج المطلوب باللغة العربية.
+
+        طلب البحث: {query}
+
+        اكتب الإجابة في الأسطر التالية فقط:
+        نوع المنتج: ...
+        السعر: ...
+        الموقع: ...
+        المواصفات: ... (مفصولة بفواصل)
+        الكلمات المفتاحية: ... (كلمات مناسبة للبحث في الإعلانات)
+        """
+
+        try:
+            cache_key = make_cache_key('analyze_text_query', TEXT_QUERY_MODEL, TEXT_QUERY_PROMPT_VERSION, query)
+            cached = get_ai_cache(TEXT_QUERY_CACHE).get(cache_key)
+            if cached is not None:
+                return dict(cached, cached=True)
+
+            content = await get_single_flight().do_async(('gemini', self.text_api_url, prompt), self._generate_text, prompt)
+            if not content:
+                return {
+                    'success': False,
+                    'error': 'No response from Gemini',
+                    'keywords': '',
+                    'enhanced_query': query
+                }
+
+            result = self._parse_text_analysis_response(content, query)
+            result['success'] = True
+            get_ai_cache(TEXT_QUERY_CACHE).put(cache_key, result)
+            return dict(result, cached=False)
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'keywords': '',
+                'enhanced_query': query
+            }
+
+    async def _generate_text(self, prompt: str) -> str:
+        """
+        Send a text prompt to Gemini within the Gemini concurrency limit
+
+        Args:
+            prompt (str): Prompt text
+
+        Returns:
+            Generated text, empty if Gemini returned no candidate
+        """
+        payload = {
+            "contents": [{
+                "parts": [{"text": prompt}]
+            }],
+            "generationConfig": {
+                "temperature": 0.3,
+                "maxOutputTokens": 512
+            }
+        }
+
+        result = await get_llm_runtime().submit(
+            'gemini', self._post(self.text_api_url, payload, {'Content-Type': 'application/json'})
+        )
+        if 'candidates' in result and len(result['candidates']) > 0:
+            return result['candidates'][0]['content']['parts'][0]['text']
+        return ''
+
+    async def _post(self, url: str, payload: Dict, headers: Dict[str, str]) -> Dict:
+        """
+        Send a generateContent request
+
+        Args:
+            url (str): Model endpoint without the API key
+            payload (Dict): Request body
+            headers (Dict[str, str]): Request headers
+
+        Returns:
+            Decoded response body
+
+        Raises:
+            RuntimeError: Gemini answered with an error status (counted by the circuit breaker)
+        """
+        response = await async_post(f"{url}?key={self.api_key}", headers=headers, json=payload, timeout=30)
+        if response.status_code != 200:
+            raise RuntimeError(f'API request failed: {response.status_code}')
+        return response.json()
+
+    def _parse_gemini_response(self, content: str) -> Dict[str, any]:
+        """
+        Parse Gemini's image description
         
-        for word in words:
-            # Clean word from punctuation
-            clean_word = word.strip('.,!?؟،؛:')
+        Args:
+            content (str): Response from Gemini
             
-            # Skip stop words and short words
-            if len(clean_word) > 2 and clean_word not in stop_words:
-                keywords.append(clean_word)
-        
-        return keywords[:10]  # Return top 10 keywords
+        Returns:
+            Dict with the description and its search keywords
+        """
+        description = content.strip()
+        return {
+            'description': description,
+            'keywords': self.extract_keywords(description),
+            'confidence': 0.5
+        }
 
     def _parse_text_analysis_response(self, content: str, original_query: str) -> Dict[str, any]:
         """
@@ -293,8 +426,8 @@ class GeminiImageSearchModel:
                 }]
             }
             
-            response = requests.post(
-                f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={self.api_key}",
+            response = get_http_session(retry_post=True).post(
+                f"{self.text_api_url}?key={self.api_key}",
                 headers={'Content-Type': 'application/json'},
                 json=payload,
                 timeout=10
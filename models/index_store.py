@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Index Store for Arabic AI Chatbot
+Versioned on-disk format for the TF-IDF search index, loaded with memory mapping
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, Optional
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from arabic_utils import ArabicAnalyzer, get_arabic_analyzer
+
+# Bump when the layout or the meaning of the stored arrays changes
+INDEX_FORMAT_VERSION = 2
+
+DEFAULT_INDEX_DIR = 'models/tfidf_index'
+MANIFEST_FILE = 'manifest.json'
+ARRAY_FILES = ('idf', 'data', 'indices', 'indptr', 'ad_ids')
+
+def dataset_checksum(dataset_path: str, length: Optional[int] = None) -> str:
+    """
+    SHA-256 of the dataset file, or of its first `length` bytes
+
+    Args:
+        dataset_path (str): Path to the dataset CSV
+        length (int): Number of leading bytes to hash, defaults to the whole file
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    remaining = length
+    with open(dataset_path, 'rb') as f:
+        while remaining is None or remaining > 0:
+            chunk = f.read(1 << 20 if remaining is None else min(1 << 20, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+class TfidfIndex:
+    """TF-IDF vectorizer, document matrix and row -> ad id map loaded from disk"""
+
+    def __init__(self, vectorizer: TfidfVectorizer, matrix: sparse.csr_matrix,
+                 ad_ids: np.ndarray, manifest: Dict):
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.ad_ids = ad_ids
+        self.manifest = manifest
+
+    @property
+    def rows(self) -> int:
+        return self.matrix.shape[0]
+
+def save_tfidf_index(index_dir: str, vectorizer: TfidfVectorizer, matrix: sparse.csr_matrix,
+                     ad_ids: np.ndarray, dataset_path: str, extra: Optional[Dict] = None) -> None:
+    """
+    Write the index as a new generation directory and switch the manifest to it
+
+    Readers that already mapped the previous generation keep working, the
+    manifest is replaced atomically.
+
+    Args:
+        index_dir (str): Index directory
+        vectorizer (TfidfVectorizer): Fitted vectorizer
+        matrix (csr_matrix): Document-term matrix of the dataset rows
+        ad_ids (np.ndarray): Ad id of each row (-1 when unknown)
+        dataset_path (str): Dataset the index was built from
+        extra (Dict): Additional manifest fields
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    generation = f"gen-{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    generation_dir = os.path.join(index_dir, generation)
+    os.makedirs(generation_dir)
+
+    matrix = matrix.tocsr()
+    arrays = {
+        'idf': np.asarray(vectorizer.idf_, dtype=np.float64),
+        'data': np.asarray(matrix.data, dtype=np.float64),
+        'indices': np.asarray(matrix.indices, dtype=np.int32),
+        'indptr': np.asarray(matrix.indptr, dtype=np.int32),
+        'ad_ids': np.asarray(ad_ids, dtype=np.int64)
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(generation_dir, f'{name}.npy'), array)
+
+    vocabulary = {term: int(column) for term, column in vectorizer.vocabulary_.items()}
+    with open(os.path.join(generation_dir, 'vocabulary.json'), 'w', encoding='utf-8') as f:
+        json.dump(vocabulary, f, ensure_ascii=False)
+
+    dataset_bytes = os.path.getsize(dataset_path)
+    manifest = {
+        'format_version': INDEX_FORMAT_VERSION,
+        'generation': generation,
+        'created_at': time.time(),
+        'dataset_bytes': dataset_bytes,
+        'dataset_checksum': dataset_checksum(dataset_path, dataset_bytes),
+        'rows': matrix.shape[0],
+        'features': matrix.shape[1],
+        'vectorizer': {
+            'analyzer_version': ArabicAnalyzer.VERSION,
+            'max_features': vectorizer.max_features
+        }
+    }
+    manifest.update(extra or {})
+
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    temp_path = f'{manifest_path}.{uuid.uuid4().hex[:8]}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, manifest_path)
+
+    # Remove older generations, processes that mapped them keep their pages
+    for name in os.listdir(index_dir):
+        path = os.path.join(index_dir, name)
+        if name.startswith('gen-') and name != generation and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+def load_tfidf_index(index_dir: str, dataset_path: str) -> Optional[TfidfIndex]:
+    """
+    Load the index if it was built from the current dataset
+
+    The dataset may have grown by appends since the index was written, the
+    index is accepted as long as it matches the leading bytes of the file.
+    Rows past manifest['rows'] are left for the caller to add.
+
+    Args:
+        index_dir (str): Index directory
+        dataset_path (str): Current dataset CSV
+
+    Returns:
+        TfidfIndex with memory-mapped arrays, or None if missing or stale
+    """
+    try:
+        with open(os.path.join(index_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get('format_version') != INDEX_FORMAT_VERSION:
+        return None
+
+    # Terms produced by another analyzer version would not match the vocabulary
+    params = manifest.get('vectorizer', {})
+    if params.get('analyzer_version') != ArabicAnalyzer.VERSION:
+        return None
+
+    try:
+        dataset_bytes = manifest['dataset_bytes']
+        if os.path.getsize(dataset_path) < dataset_bytes:
+            return None
+        if dataset_checksum(dataset_path, dataset_bytes) != manifest['dataset_checksum']:
+            return None
+
+        generation_dir = os.path.join(index_dir, manifest['generation'])
+        arrays = {
+            name: np.load(os.path.join(generation_dir, f'{name}.npy'), mmap_mode='r')
+            for name in ARRAY_FILES
+        }
+        with open(os.path.join(generation_dir, 'vocabulary.json'), encoding='utf-8') as f:
+            vocabulary = json.load(f)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Error loading search index: {e}")
+        return None
+
+    vectorizer = TfidfVectorizer(
+        vocabulary=vocabulary,
+        analyzer=get_arabic_analyzer().analyze_ngrams
+    )
+    vectorizer.idf_ = arrays['idf']
+
+    matrix = sparse.csr_matrix(
+        (arrays['data'], arrays['indices'], arrays['indptr']),
+        shape=(manifest['rows'], manifest['features']),
+        copy=False
+    )
+    return TfidfIndex(vectorizer, matrix, arrays['ad_ids'], manifest)
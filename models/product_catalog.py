@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Product Catalog for Arabic AI Chatbot
+Keeps a process-wide, in-memory snapshot of the ads dataset
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .catalog_columns import CatalogColumns
+from .facet_index import FacetIndex
+from .search_index import InvertedIndex
+from .semantic_index import SemanticIndex
+
+DEFAULT_DATASET_PATH = 'dataset/ads_dataset.csv'
+
+class ProductCatalog:
+    """
+    In-memory snapshot of the ads dataset shared by every search in the process.
+
+    The CSV is parsed once and reused until the file changes on disk (detected
+    through its mtime and size) or until invalidate()/reload() is called.
+    """
+
+    def __init__(self, dataset_path: str = DEFAULT_DATASET_PATH):
+        """
+        Initialize the catalog
+
+        Args:
+            dataset_path (str): Path to the ads dataset CSV file
+        """
+        self.dataset_path = dataset_path
+        self.version = 0
+        self._products = None
+        self._snapshot: Optional[Tuple[List[Dict], int]] = None
+        self._derived: Dict[str, Any] = {}
+        self._file_signature = None
+        self._lock = threading.Lock()
+        self._semantic_build: Optional[threading.Thread] = None
+
+    def get_products(self) -> List[Dict]:
+        """
+        Get the current catalog snapshot
+
+        Returns:
+            List of product dictionaries (shared, must not be modified)
+        """
+        return self.get_snapshot()[0]
+
+    def get_snapshot(self) -> Tuple[List[Dict], int]:
+        """
+        Get the current snapshot together with its version
+
+        The version goes up every time a new snapshot is loaded, callers use
+        it to tag results derived from the snapshot.
+
+        Returns:
+            (products, version)
+        """
+        signature = self._get_file_signature()
+        snapshot = self._snapshot
+        if snapshot is None or signature != self._file_signature:
+            with self._lock:
+                if self._snapshot is None or signature != self._file_signature:
+                    self._load(signature)
+                snapshot = self._snapshot
+        return snapshot
+
+    def get_index(self, products: Optional[List[Dict]] = None) -> InvertedIndex:
+        """
+        Get the inverted index built for a snapshot
+
+        Args:
+            products (List[Dict]): Snapshot to index, defaults to get_products()
+
+        Returns:
+            InvertedIndex over the snapshot
+        """
+        return self._get_derived('index', InvertedIndex, products)
+
+    def get_columns(self, products: Optional[List[Dict]] = None) -> CatalogColumns:
+        """
+        Get the price/location/category columns built for a snapshot
+
+        Args:
+            products (List[Dict]): Snapshot to index, defaults to get_products()
+
+        Returns:
+            CatalogColumns over the snapshot
+        """
+        return self._get_derived('columns', CatalogColumns, products)
+
+    def get_semantic_index(self, products: Optional[List[Dict]] = None) -> SemanticIndex:
+        """
+        Get the dense vector index built for a snapshot, on first semantic search
+
+        Args:
+            products (List[Dict]): Snapshot to index, defaults to get_products()
+
+        Returns:
+            SemanticIndex over the snapshot
+        """
+        return self._get_derived('semantic', SemanticIndex, products)
+
+    def semantic_index_ready(self, products: Optional[List[Dict]] = None) -> bool:
+        """
+        Check whether the semantic index of a snapshot is built, without building it
+
+        A missing index is built on a background thread (warm_semantic_index),
+        so a search can use keyword results instead of waiting for the build.
+
+        Args:
+            products (List[Dict]): Snapshot to check, defaults to get_products()
+
+        Returns:
+            True if get_semantic_index() returns at once
+        """
+        if products is None:
+            products = self.get_products()
+        semantic_index = self._derived.get('semantic')
+        if semantic_index is not None and semantic_index.products is products:
+            return True
+        self.warm_semantic_index(products)
+        return False
+
+    def warm_semantic_index(self, products: Optional[List[Dict]] = None) -> None:
+        """
+        Build the semantic index of a snapshot on a background thread
+
+        Only one build runs at a time, and it runs outside the catalog lock
+        so snapshot reloads and the other indexes do not wait for it.
+
+        Args:
+            products (List[Dict]): Snapshot to index, defaults to get_products()
+        """
+        if products is None:
+            products = self.get_products()
+        with self._lock:
+            if self._semantic_build is not None and self._semantic_build.is_alive():
+                return
+            self._semantic_build = threading.Thread(
+                target=self._build_semantic_index, args=(products,), name='semantic-index', daemon=True
+            )
+            self._semantic_build.start()
+
+    def _build_semantic_index(self, products: List[Dict]) -> None:
+        """Build the semantic index of a snapshot and keep it if the snapshot is still current"""
+        try:
+            semantic_index = SemanticIndex(products)
+        except Exception as e:
+            print(f"Error building semantic index: {e}")
+            return
+        with self._lock:
+            if products is self._products:
+                self._derived['semantic'] = semantic_index
+
+    def get_facets(self, products: Optional[List[Dict]] = None) -> FacetIndex:
+        """
+        Get the facet bitmaps built for a snapshot
+
+        Args:
+            products (List[Dict]): Snapshot to index, defaults to get_products()
+
+        Returns:
+            FacetIndex over the snapshot
+        """
+        if products is None:
+            products = self.get_products()
+        columns = self.get_columns(products)
+        return self._get_derived('facets', lambda _products: FacetIndex(columns), products)
+
+    def _get_derived(self, name: str, builder: Callable[[List[Dict]], Any],
+                     products: Optional[List[Dict]] = None) -> Any:
+        """Get a structure derived from a snapshot, built once per current snapshot"""
+        if products is None:
+            products = self.get_products()
+        derived = self._derived.get(name)
+        if derived is None or derived.products is not products:
+            with self._lock:
+                derived = self._derived.get(name)
+                if derived is None or derived.products is not products:
+                    derived = builder(products)
+                    if products is self._products:
+                        self._derived[name] = derived
+        return derived
+
+    def reload(self) -> None:
+        """Reload the catalog from disk immediately"""
+        with self._lock:
+            self._load(self._get_file_signature())
+
+    def invalidate(self) -> None:
+        """Drop the current snapshot so the next search reloads it"""
+        with self._lock:
+            self._products = None
+            self._snapshot = None
+            self._derived: Dict[str, Any] = {}
+            self._file_signature = None
+
+    def _load(self, signature: Optional[Tuple[int, int]]) -> None:
+        """Parse the dataset file and publish a new snapshot"""
+        products = self._read_products()
+
+        self.version += 1
+        self._products = products
+        self._snapshot = (products, self.version)
+        self._file_signature = signature
+
+    def _read_products(self) -> List[Dict]:
+        """Parse the dataset file into product dictionaries"""
+        try:
+            import pandas as pd
+            df = pd.read_csv(self.dataset_path)
+            return df.to_dict('records')
+        except Exception as e:
+            print(f"Error loading products: {e}")
+            return []
+
+    def _get_file_signature(self) -> Optional[Tuple[int, int]]:
+        """Get (mtime, size) of the dataset file, or None if it is missing"""
+        try:
+            stat = os.stat(self.dataset_path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+_catalogs: Dict[str, ProductCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+def get_product_catalog(dataset_path: str = DEFAULT_DATASET_PATH) -> ProductCatalog:
+    """
+    Get the process-wide catalog for a dataset file
+
+    Args:
+        dataset_path (str): Path to the ads dataset CSV file
+
+    Returns:
+        Shared ProductCatalog instance
+    """
+    key = os.path.abspath(dataset_path)
+    catalog = _catalogs.get(key)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.get(key)
+            if catalog is None:
+                catalog = ProductCatalog(dataset_path)
+                _catalogs[key] = catalog
+    return catalog
@@ -8,10 +8,25 @@ Handles advanced product matching and similarity search
 
 import os
 import json
+import heapq
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 import re
 
+from arabic_utils import ArabicTextProcessor, get_arabic_analyzer, get_entity_matcher
+
+from .autocomplete import get_autocomplete_service
+from .product_catalog import ProductCatalog, get_product_catalog
+from .query_cache import QueryCache
+from .search_index import BM25_MIN_SIMILARITY, CollectionStats, InvertedIndex, product_document
+from .semantic_index import SemanticIndex
+
+# Ranking modes accepted by ProductSearchEngine.search_by_text and search_with_facets
+SEARCH_RANKINGS = ('keyword', 'bm25', 'semantic')
+
+# Added to matches in a category hinted by a keyword inside a longer query word
+CATEGORY_BOOST = 0.1
+
 @dataclass
 class ProductMatch:
     """Data class for product search results"""
@@ -29,8 +44,19 @@ class ProductSearchEngine:
     Advanced product search engine with multiple matching strategies
     """
     
-    def __init__(self):
-        """Initialize the search engine"""
+    # Ranking modes this engine supports
+    rankings = SEARCH_RANKINGS
+    
+    def __init__(self, catalog: Optional[ProductCatalog] = None, cache: Optional[QueryCache] = None):
+        """
+        Initialize the search engine
+        
+        Args:
+            catalog (ProductCatalog): Optional catalog, defaults to the shared dataset catalog
+            cache (QueryCache): Optional text search result cache
+        """
+        self.catalog = catalog or get_product_catalog()
+        self.cache = cache or QueryCache()
         self.arabic_numbers = {
             'صفر': 0, 'واحد': 1, 'اثنان': 2, 'ثلاثة': 3, 'أربعة': 4,
             'خمسة': 5, 'ستة': 6, 'سبعة': 7, 'ثمانية': 8, 'تسعة': 9,
@@ -39,14 +65,11 @@ class ProductSearchEngine:
             'تسعون': 90, 'مئة': 100, 'ألف': 1000, 'مليون': 1000000
         }
         
-        self.product_categories = {
-            'إلكترونيات': ['موبايل', 'هاتف', 'لابتوب', 'كمبيوتر', 'تلفزيون', 'تابلت', 'ساعة ذكية'],
-            'سيارات': ['سيارة', 'عربية', 'أوتوموبيل', 'مركبة', 'شاحنة', 'دراجة نارية'],
-            'عقارات': ['شقة', 'بيت', 'منزل', 'فيلا', 'أرض', 'محل', 'مكتب'],
-            'ملابس': ['قميص', 'بنطلون', 'فستان', 'حذاء', 'جاكيت', 'تيشيرت'],
-            'أثاث': ['كرسي', 'طاولة', 'سرير', 'خزانة', 'أريكة', 'مكتب'],
-            'رياضة': ['دراجة', 'كرة', 'جهاز رياضي', 'ملعب', 'نادي']
-        }
+        self.product_categories = ArabicTextProcessor.PRODUCT_CATEGORIES
+        
+        self.analyzer = get_arabic_analyzer()
+        self.entity_matcher = get_entity_matcher()
+        self.autocomplete = get_autocomplete_service(self.catalog)
         
     def search_by_image_description(self, description: str, products: List[Dict]) -> List[ProductMatch]:
         """
@@ -61,9 +84,10 @@ class ProductSearchEngine:
         """
         matches = []
         description_keywords = self._extract_keywords(description)
+        query_categories = self._detect_product_categories(description_keywords)
         
         for product in products:
-            similarity = self._calculate_image_similarity(description_keywords, product)
+            similarity = self._calculate_image_similarity(description_keywords, product, query_categories)
             if similarity > 0.3:  # Minimum threshold
                 matches.append(ProductMatch(
                     id=product.get('id', 0),
@@ -76,83 +100,201 @@ class ProductSearchEngine:
                     match_type='image'
                 ))
         
-        # Sort by similarity score
-        matches.sort(key=lambda x: x.similarity, reverse=True)
-        return matches[:5]  # Return top 5 matches
+        # Keep the top 5 matches by similarity score
+        return heapq.nlargest(5, matches, key=lambda x: x.similarity)
     
-    def search_by_text(self, query: str, max_results: int = 10) -> List[Dict]:
+    def search_by_text(self, query: str, max_results: int = 10, ranking: str = 'keyword') -> List[Dict]:
         """
         Search products using text query
         
         Args:
             query (str): Search query in Arabic
             max_results (int): Maximum number of results to return
+            ranking (str): 'keyword' (share of query keywords found), 'bm25' or
+                'semantic' (nearest LSA vectors, matches paraphrases)
             
         Returns:
             List of product dictionaries
         """
-        # Load products from database
-        products = self._load_products_from_db()
+        matches, _ = self._search(query, max_results, ranking)
+        return list(matches)
+    
+    def search_with_facets(self, query: str, max_results: int = 10,
+                           ranking: str = 'keyword') -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+        """
+        Search products and count every matching product per category, location and price bucket
+        
+        Args:
+            query (str): Search query in Arabic
+            max_results (int): Maximum number of results to return
+            ranking (str): 'keyword', 'bm25' or 'semantic'
+            
+        Returns:
+            (list of product dictionaries, facet counts as returned by FacetIndex.counts)
+        """
+        matches, facets = self._search(query, max_results, ranking)
+        return list(matches), {facet: list(entries) for facet, entries in facets.items()}
+    
+    def _search(self, query: str, max_results: int, ranking: str) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+        """Run a text search, returns the top matches and the facet counts of all matches"""
+        if ranking not in SEARCH_RANKINGS:
+            raise ValueError(f"Unknown ranking: {ranking}")
+        if ranking not in self.rankings:
+            raise ValueError(f"{type(self).__name__} does not support {ranking} ranking")
+        
+        products, version = self.catalog.get_snapshot()
         
-        matches = []
         query_keywords = self._extract_keywords(query)
         price_range = self._extract_price_range(query)
         
-        for product in products:
-            similarity = self._calculate_text_similarity(query_keywords, product)
+        # Only a whole-word category keyword filters; one inside a longer word
+        # ('خدمة' in 'مستخدمة', 'كيا' in 'نوكيا') merely boosts that category.
+        # Locations filter on whole words only ('السويس' in 'السويسري' is ignored)
+        hits = self.entity_matcher.scan(query)
+        location = self.entity_matcher.best(hits, 'location', whole_token=True)
+        category = self.entity_matcher.best(hits, 'category', whole_token=True)
+        boost_category = None if category else self.entity_matcher.best(hits, 'category')
+        
+        # Repeated queries are served from the cache until the catalog changes
+        cache_key = (ranking, max_results, tuple(query_keywords), price_range, location, category, boost_category)
+        cached = self.cache.get(cache_key, version)
+        if cached is not None:
+            return cached
+        
+        result = self._rank(products, query_keywords, price_range, location, category, max_results, ranking,
+                            boost_category=boost_category)
+        self.cache.put(cache_key, version, result)
+        
+        # Queries that found ads feed the autocomplete weights, cached repeats
+        # are not logged again
+        if result[0]:
+            self.autocomplete.record_query(query)
+        return result
+    
+    def _rank(self, products: List[Dict], query_keywords: List[str], price_range: Optional[Tuple[float, float]],
+              location: Optional[str], category: Optional[str], max_results: int,
+              ranking: str, query_terms: Optional[List[Tuple[str, ...]]] = None,
+              boost_category: Optional[str] = None) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+        """Score a parsed query against a snapshot, returns the top matches and the facet counts of all matches"""
+        top, facets = self._select(products, query_keywords, price_range, location, category, max_results,
+                                   ranking, query_terms, boost_category)
+        matches = [
+            self._format_match(products[doc_id], similarity, match_type)
+            for doc_id, similarity, match_type in top
+        ]
+        return matches, facets
+    
+    def _select(self, products: List[Dict], query_keywords: List[str], price_range: Optional[Tuple[float, float]],
+                location: Optional[str], category: Optional[str], max_results: int,
+                ranking: str, query_terms: Optional[List[Tuple[str, ...]]] = None,
+                boost_category: Optional[str] = None, stats: Optional[CollectionStats] = None
+                ) -> Tuple[List[Tuple[int, float, str]], Dict[str, List[Dict]]]:
+        """
+        Score a parsed query against a snapshot, returns the top (row, similarity, match type)
+        and the facet counts of all matches
+        
+        query_terms overrides the expansion of query_keywords and stats the
+        BM25 statistics, shards receive both computed over the whole catalog.
+        """
+        index = self.catalog.get_index(products)
+        columns = self.catalog.get_columns(products)
+        
+        # Structured constraints become a row mask applied before text scoring
+        mask = columns.filter_mask(
+            price_range=price_range,
+            location=location,
+            category=category
+        )
+        
+        # Brand spellings and typo corrections, resolved locally instead of by an LLM rewrite
+        if query_terms is None:
+            query_terms = index.expand_terms(query_keywords)
+        
+        if ranking == 'semantic':
+            scored = self._score_semantic(self.catalog.get_semantic_index(products), index, query_terms, mask)
+        elif ranking == 'bm25':
+            scored = self._score_bm25(index, query_terms, mask, stats)
+        else:
+            scored = self._score_keywords(index, query_terms, mask)
+        
+        if boost_category:
+            boosted = columns.category_rows(boost_category)
+            scored = [
+                (doc_id, min(1.0, similarity + CATEGORY_BOOST) if boosted[doc_id] else similarity, match_type)
+                for doc_id, similarity, match_type in scored
+            ]
+        
+        # Select the top matches by similarity score, ties by catalog order; only those get formatted
+        top = heapq.nlargest(max_results, scored, key=lambda x: (x[1], -x[0]))
+        
+        # Refinement counts cover every match, not only the returned page
+        facets = self.catalog.get_facets(products).counts(doc_id for doc_id, _, _ in scored)
+        return top, facets
+    
+    @staticmethod
+    def _format_match(product: Dict, similarity: float, match_type: str) -> Dict:
+        """Build a search result from a catalog product"""
+        return {
+            'id': product.get('id'),
+            'title': product.get('title', product.get('text', '')[:50]),
+            'price': product.get('price'),
+            'location': product.get('location'),
+            'contact': product.get('contact_info'),
+            'image_url': product.get('image_url'),
+            'similarity': similarity,
+            'match_type': match_type
+        }
+    
+    def _score_keywords(self, index: InvertedIndex, query_terms: List[Tuple[str, ...]], mask=None) -> List[Tuple[int, float, str]]:
+        """Score candidates by the share of query terms (or their variants) found in each product"""
+        scored = []
+        if not query_terms:
+            return scored
+        
+        # Only score products that share at least one term with the query
+        for doc_id, hits in index.term_hits(query_terms, mask):
+            similarity = hits / len(query_terms)
             
-            # Apply price filter if specified
-            if price_range and product.get('price'):
-                if not (price_range[0] <= product['price'] <= price_range[1]):
-                    continue
+            # Boost for exact phrase matches
+            if hits == len(query_terms) and self._contains_phrase(index.document_terms(doc_id), query_terms):
+                similarity += 0.3
             
+            similarity = min(1.0, similarity)
             if similarity > 0.2:  # Minimum threshold
                 match_type = 'exact' if similarity > 0.8 else 'partial'
-                matches.append({
-                    'id': product.get('id'),
-                    'title': product.get('title', product.get('text', '')[:50]),
-                    'price': product.get('price'),
-                    'location': product.get('location'),
-                    'contact': product.get('contact_info'),
-                    'image_url': product.get('image_url'),
-                    'similarity': similarity,
-                    'match_type': match_type
-                })
-        
-        # Sort by similarity score
-        matches.sort(key=lambda x: x['similarity'], reverse=True)
-        return matches[:max_results]
+                scored.append((doc_id, similarity, match_type))
+        
+        return scored
     
-    def _load_products_from_db(self) -> List[Dict]:
-        """Load products from database"""
-        try:
-            import pandas as pd
-            df = pd.read_csv('dataset/ads_dataset.csv')
-            return df.to_dict('records')
-        except Exception as e:
-            print(f"Error loading products: {e}")
+    def _score_bm25(self, index: InvertedIndex, query_terms: List[Tuple[str, ...]], mask=None,
+                    stats: Optional[CollectionStats] = None) -> List[Tuple[int, float, str]]:
+        """Score products with BM25, scaled to 0..1 by the best reachable score"""
+        max_score = index.bm25_max_score(query_terms, stats)
+        if max_score <= 0:
             return []
-    
-    def _extract_keywords(self, text: str) -> List[str]:
-        """Extract meaningful keywords from Arabic text"""
-        # Remove punctuation and normalize
-        text = re.sub(r'[^\w\s]', ' ', text)
-        words = text.split()
-        
-        # Arabic stop words
-        stop_words = {
-            'في', 'من', 'إلى', 'على', 'عن', 'مع', 'هذا', 'هذه', 'ذلك', 'تلك',
-            'التي', 'الذي', 'أن', 'إن', 'كان', 'كانت', 'يكون', 'تكون', 'سوف',
-            'قد', 'لقد', 'بعد', 'قبل', 'أثناء', 'خلال', 'عند', 'لدى', 'حول'
-        }
         
-        keywords = []
-        for word in words:
-            word = word.strip()
-            if len(word) > 2 and word not in stop_words:
-                keywords.append(word)
+        scored = []
+        for doc_id, score, hits in index.bm25_scores(query_terms, mask, stats):
+            similarity = score / max_score
+            if similarity > BM25_MIN_SIMILARITY:  # Same cutoff as DatasetManager
+                match_type = 'exact' if hits == len(query_terms) else 'partial'
+                scored.append((doc_id, similarity, match_type))
         
-        return keywords
+        return scored
+    
+    def _score_semantic(self, semantic_index: SemanticIndex, index: InvertedIndex,
+                        query_terms: List[Tuple[str, ...]], mask=None) -> List[Tuple[int, float, str]]:
+        """Score products by cosine similarity of their LSA vectors to the query"""
+        # Brand spellings and corrections are embedded together with the query terms
+        terms = [term for group in query_terms for term in group]
+        return [
+            (doc_id, similarity, 'semantic')
+            for doc_id, similarity in semantic_index.search(terms, mask, index.candidates(query_terms))
+        ]
+    
+    def _extract_keywords(self, text: str) -> List[str]:
+        """Extract search terms with the analyzer shared by the indexes"""
+        return list(dict.fromkeys(self.analyzer.analyze(text)))
     
     def _extract_price_range(self, query: str) -> Optional[Tuple[float, float]]:
         """Extract price range from query"""
@@ -182,61 +324,52 @@ class ProductSearchEngine:
         
         return None
     
-    def _calculate_image_similarity(self, description_keywords: List[str], product: Dict) -> float:
+    def _calculate_image_similarity(self, description_keywords: List[str], product: Dict,
+                                    query_categories: Optional[set] = None) -> float:
         """Calculate similarity between image description and product"""
-        product_text = (product.get('text', '') + ' ' + 
-                       product.get('category', '')).lower()
+        product_terms = set(self.analyzer.analyze(product_document(product)))
         
-        matches = 0
         total_keywords = len(description_keywords)
         
         if total_keywords == 0:
             return 0.0
         
-        for keyword in description_keywords:
-            if keyword.lower() in product_text:
-                matches += 1
+        matches = sum(1 for keyword in description_keywords if keyword in product_terms)
         
         base_similarity = matches / total_keywords
         
         # Boost similarity for category matches
-        category_boost = self._get_category_boost(description_keywords, product)
+        if query_categories is None:
+            query_categories = self._detect_product_categories(description_keywords)
+        category_boost = self._get_category_boost(query_categories, product)
         
         return min(1.0, base_similarity + category_boost)
     
-    def _calculate_text_similarity(self, query_keywords: List[str], product: Dict) -> float:
-        """Calculate similarity between text query and product"""
-        product_text = (product.get('text', '') + ' ' + 
-                       product.get('category', '')).lower()
-        
-        matches = 0
-        total_keywords = len(query_keywords)
-        
-        if total_keywords == 0:
-            return 0.0
-        
-        for keyword in query_keywords:
-            if keyword.lower() in product_text:
-                matches += 1
-        
-        base_similarity = matches / total_keywords
-        
-        # Boost for exact phrase matches
-        query_phrase = ' '.join(query_keywords).lower()
-        if query_phrase in product_text:
-            base_similarity += 0.3
-        
-        return min(1.0, base_similarity)
+    @staticmethod
+    def _contains_phrase(terms: List[str], phrase: List) -> bool:
+        """Check whether phrase terms (or tuples of alternatives) appear contiguously in terms"""
+        size = len(phrase)
+        if size == 0:
+            return False
+        phrase = [(term,) if isinstance(term, str) else term for term in phrase]
+        for start in range(len(terms) - size + 1):
+            if all(terms[start + offset] in alternatives for offset, alternatives in enumerate(phrase)):
+                return True
+        return False
+    
+    def _detect_product_categories(self, keywords: List[str]) -> set:
+        """Product categories whose keywords appear in the query terms"""
+        hits = self.entity_matcher.scan_clean(' '.join(keywords))
+        return set(self.entity_matcher.values(hits, 'product_category'))
     
-    def _get_category_boost(self, keywords: List[str], product: Dict) -> float:
+    def _get_category_boost(self, query_categories: set, product: Dict) -> float:
         """Get category-based similarity boost"""
-        product_category = product.get('category', '').lower()
+        product_category = product.get('category', '')
+        product_category = product_category.lower() if isinstance(product_category, str) else ''
         
-        for category, category_keywords in self.product_categories.items():
+        for category in query_categories:
             if category.lower() == product_category:
-                for keyword in keywords:
-                    if any(cat_keyword in keyword.lower() for cat_keyword in category_keywords):
-                        return 0.2  # 20% boost for category match
+                return 0.2  # 20% boost for category match
         
         return 0.0
     
@@ -276,23 +409,30 @@ class ProductSearchEngine:
         
         return response
     
-    def get_search_suggestions(self, query: str) -> List[str]:
+    def get_search_suggestions(self, query: str, limit: int = 5) -> List[str]:
         """Get search suggestions based on query"""
-        suggestions = []
-        
-        # Category-based suggestions
-        for category, keywords in self.product_categories.items():
-            for keyword in keywords:
-                if keyword in query.lower():
-                    suggestions.extend([
-                        f"{keyword} جديد",
-                        f"{keyword} مستعمل",
-                        f"{keyword} رخيص",
-                        f"{keyword} بحالة ممتازة"
-                    ])
-                    break
-        
-        return suggestions[:5]  # Return top 5 suggestions
+        # Completions from ad titles and popular searches
+        suggestions = self.autocomplete.suggest(query, limit)
+        if suggestions:
+            return suggestions
+        
+        # Category-based suggestions, first listed keyword of each matched category
+        keywords_by_category = {}
+        for hit in self.entity_matcher.scan(query):
+            if hit.kind == 'product_category':
+                current = keywords_by_category.get(hit.value)
+                if current is None or hit.priority < current.priority:
+                    keywords_by_category[hit.value] = hit
+        
+        for hit in sorted(keywords_by_category.values(), key=lambda hit: hit.priority):
+            suggestions.extend([
+                f"{hit.keyword} جديد",
+                f"{hit.keyword} مستعمل",
+                f"{hit.keyword} رخيص",
+                f"{hit.keyword} بحالة ممتازة"
+            ])
+        
+        return suggestions[:limit]
 
 # Factory function
 def create_product_search_engine() -> ProductSearchEngine:
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Query Cache for Arabic AI Chatbot
+LRU + TTL cache of search results, invalidated by catalog version
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 300
+
+class QueryCache:
+    """
+    Bounded cache of search results.
+
+    Every entry is tagged with the version of the data it was computed from.
+    A lookup with a newer version treats the entry as stale, so approving,
+    ingesting or reloading ads never serves outdated results, without
+    having to clear the cache explicitly.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries (int): Least recently used entries are evicted past this size
+            ttl_seconds (float): Entries older than this are recomputed
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale = 0
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        """
+        Look up a cached value
+
+        Args:
+            key (Hashable): Normalized query key
+            version (int): Current data version
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, stored_at, value = entry
+                if entry_version != version:
+                    self.stale += 1
+                    del self._entries[key]
+                elif now - stored_at > self.ttl_seconds:
+                    self.expirations += 1
+                    del self._entries[key]
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, version: int, value: Any) -> None:
+        """
+        Store a value computed from a data version
+
+        Args:
+            key (Hashable): Normalized query key
+            version (int): Data version the value was computed from
+            value (Any): Value to cache, must not be modified afterwards
+        """
+        with self._lock:
+            self._entries[key] = (version, time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry, counters are kept"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters, used to size max_entries and ttl_seconds
+
+        Returns:
+            Dict with size, limits, hit/miss counters and hit ratio
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'stale': self.stale,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
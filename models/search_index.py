@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Search Index for Arabic AI Chatbot
+Inverted index over analyzed ad text used for candidate generation and BM25
+"""
+
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from arabic_utils import get_arabic_analyzer
+from .fuzzy_index import FuzzyTermIndex, get_brand_aliases
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Scaled BM25 scores (score / bm25_max_score) at or below this are not matches
+BM25_MIN_SIMILARITY = 0.1
+
+# A query term, or a tuple of alternative spellings matched as one term
+QueryTerm = Union[str, Tuple[str, ...]]
+
+# Typo corrections added to a query term that matches nothing
+MAX_CORRECTIONS = 3
+
+# Candidate correction of a query term: (kind, closeness, term), closer first.
+# Terms within the edit distance (closeness = edits) beat terms containing
+# the query term (closeness = length)
+FUZZY_CORRECTION = 0
+CONTAINING_CORRECTION = 1
+Correction = Tuple[int, int, str]
+
+# (number of products, total document length, document frequency per term),
+# the collection statistics BM25 needs, summed over shards for global scores
+CollectionStats = Tuple[int, int, Dict[str, int]]
+
+def best_corrections(candidates: Optional[List[Correction]]) -> List[str]:
+    """
+    Pick the corrections of a query term among its candidates
+
+    Candidates from several shards may be concatenated, each shard's best
+    candidates include its part of the catalog-wide best ones.
+
+    Args:
+        candidates (List[Correction]): Candidates, None or empty when the term needs no correction
+
+    Returns:
+        Up to MAX_CORRECTIONS terms, closest first
+    """
+    if not candidates:
+        return []
+    if any(kind == FUZZY_CORRECTION for kind, _, _ in candidates):
+        candidates = [candidate for candidate in candidates if candidate[0] == FUZZY_CORRECTION]
+    return list(dict.fromkeys(term for _, _, term in sorted(candidates)))[:MAX_CORRECTIONS]
+
+def product_document(product: Dict) -> str:
+    """
+    Build the searchable text of a product (ad text plus category)
+
+    Args:
+        product (Dict): Product record from the catalog
+
+    Returns:
+        Document text
+    """
+    text = product.get('text', '')
+    category = product.get('category', '')
+    return (text if isinstance(text, str) else '') + ' ' + (category if isinstance(category, str) else '')
+
+def expand_query_terms(terms: List[str], corrections: List[Optional[List[Correction]]]) -> List[Tuple[str, ...]]:
+    """
+    Add brand spellings and typo corrections to query terms
+
+    Brand names are expanded to their Arabic and Latin spellings. Terms
+    that match nothing in the index get the corrections chosen by
+    best_corrections().
+
+    Args:
+        terms (List[str]): Analyzed, de-duplicated query terms
+        corrections (List): InvertedIndex.term_corrections() of each term
+
+    Returns:
+        One tuple of alternatives per query term, the term itself first
+    """
+    aliases = get_brand_aliases()
+    groups = []
+    for term, candidates in zip(terms, corrections):
+        variants = [term] + list(aliases.get(term, ()))
+        for correction in best_corrections(candidates):
+            variants.extend(aliases.get(correction, (correction,)))
+        groups.append(tuple(dict.fromkeys(variants)))
+    return groups
+
+class InvertedIndex:
+    """
+    Token to posting-list index over a list of products.
+
+    Posting lists hold product positions in ascending order, so iterating
+    candidates preserves the catalog order used for tie-breaking. Term
+    frequencies, document lengths and IDF are computed once at build time
+    for BM25 ranking. A trigram index over the vocabulary is built on first
+    use to correct misspelled query terms.
+    """
+
+    def __init__(self, products: List[Dict]):
+        """
+        Build the index
+
+        Args:
+            products (List[Dict]): Catalog snapshot to index
+        """
+        self.products = products
+        self.postings: Dict[str, List[int]] = {}
+        self.term_frequencies: Dict[str, List[int]] = {}
+        self.doc_lengths: List[int] = []
+        self._fuzzy: Optional[FuzzyTermIndex] = None
+        self._stats_norms: Optional[Tuple[float, List[float]]] = None
+
+        for doc_id, product in enumerate(products):
+            tokens = self.tokenize(product_document(product))
+            self.doc_lengths.append(len(tokens))
+            for token, count in Counter(tokens).items():
+                self.postings.setdefault(token, []).append(doc_id)
+                self.term_frequencies.setdefault(token, []).append(count)
+
+        doc_count = len(products)
+        avg_length = (sum(self.doc_lengths) / doc_count) if doc_count else 0.0
+        self._avg_length = avg_length
+        self.idf = {
+            term: math.log(1 + (doc_count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            for term, doc_ids in self.postings.items()
+        }
+        self._length_norms = [
+            BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length) if avg_length else BM25_K1
+            for length in self.doc_lengths
+        ]
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """
+        Split text into index terms with the shared Arabic analyzer
+
+        Args:
+            text (str): Raw text
+
+        Returns:
+            List of terms in text order
+        """
+        return get_arabic_analyzer().analyze(text)
+
+    def document_terms(self, doc_id: int) -> List[str]:
+        """
+        Get the terms of an indexed product in text order
+
+        Args:
+            doc_id (int): Product position
+
+        Returns:
+            List of terms
+        """
+        return self.tokenize(product_document(self.products[doc_id]))
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def add_product(self, product: Dict) -> int:
+        """
+        Append a product to the index without rebuilding it
+
+        IDF is refreshed only for the product's own terms and the average
+        document length is kept, so scores drift slightly until the index
+        is rebuilt.
+
+        Args:
+            product (Dict): Product record, appended to self.products
+
+        Returns:
+            Position of the new product
+        """
+        doc_id = len(self.products)
+        self.products.append(product)
+
+        tokens = self.tokenize(product_document(product))
+        self.doc_lengths.append(len(tokens))
+        for token, count in Counter(tokens).items():
+            if token not in self.postings and self._fuzzy is not None:
+                self._fuzzy.add_term(token)
+            self.postings.setdefault(token, []).append(doc_id)
+            self.term_frequencies.setdefault(token, []).append(count)
+            doc_freq = len(self.postings[token])
+            self.idf[token] = math.log(1 + (len(self.products) - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        self._avg_length = self._avg_length or float(len(tokens))
+        self._stats_norms = None
+        self._length_norms.append(
+            BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / self._avg_length) if self._avg_length else BM25_K1
+        )
+
+        return doc_id
+
+    def candidates(self, terms: Sequence[QueryTerm], mask=None) -> List[int]:
+        """
+        Get the products that share at least one term with the query
+
+        Args:
+            terms (List): Analyzed query terms, an entry may be a tuple of alternatives
+            mask: Optional boolean row mask, rows where it is False are skipped
+
+        Returns:
+            Sorted list of product positions
+        """
+        return [doc_id for doc_id, _ in self.term_hits(terms, mask)]
+
+    def term_hits(self, terms: Sequence[QueryTerm], mask=None) -> List[Tuple[int, int]]:
+        """
+        Count how many query terms each product contains
+
+        Args:
+            terms (List): Analyzed, de-duplicated query terms, an entry may be
+                a tuple of alternatives counted once
+            mask: Optional boolean row mask, rows where it is False are skipped
+
+        Returns:
+            List of (product position, number of query terms found), ordered by position
+        """
+        hits: Dict[int, int] = {}
+        for group in self._as_groups(terms):
+            doc_ids = self._group_postings(group)
+            for doc_id in doc_ids:
+                if mask is not None and not mask[doc_id]:
+                    continue
+                hits[doc_id] = hits.get(doc_id, 0) + 1
+        return sorted(hits.items())
+
+    def query_terms(self, text: str) -> List[str]:
+        """
+        Analyze a query into de-duplicated index terms
+
+        Args:
+            text (str): Raw query text
+
+        Returns:
+            List of terms in query order
+        """
+        return list(dict.fromkeys(self.tokenize(text)))
+
+    def fuzzy_terms(self) -> FuzzyTermIndex:
+        """
+        Get the trigram index over the vocabulary, built on first use
+
+        Returns:
+            FuzzyTermIndex kept in sync by add_product()
+        """
+        if self._fuzzy is None:
+            self._fuzzy = FuzzyTermIndex(list(self.postings))
+        return self._fuzzy
+
+    def term_corrections(self, term: str) -> Optional[List[Correction]]:
+        """
+        Get the candidate corrections of a query term
+
+        Args:
+            term (str): Analyzed query term
+
+        Returns:
+            None if the term or one of its brand spellings is indexed, else the
+            closest vocabulary terms within a small edit distance or, failing
+            that, the shortest terms containing it ('شيرت' finds 'تيشيرت', as
+            the substring keyword matching did)
+        """
+        variants = get_brand_aliases().get(term, (term,))
+        if term in self.postings or any(variant in self.postings for variant in variants):
+            return None
+        fuzzy = self.fuzzy_terms()
+        candidates = [(FUZZY_CORRECTION, distance, correction)
+                      for correction, distance in fuzzy.lookup(term, limit=MAX_CORRECTIONS)]
+        if not candidates:
+            candidates = [(CONTAINING_CORRECTION, len(correction), correction)
+                          for correction in fuzzy.containing(term, MAX_CORRECTIONS)]
+        return candidates
+
+    def expand_terms(self, terms: List[str]) -> List[Tuple[str, ...]]:
+        """
+        Add brand spellings and typo corrections to query terms
+
+        Args:
+            terms (List[str]): Analyzed, de-duplicated query terms
+
+        Returns:
+            One tuple of alternatives per query term, the term itself first
+        """
+        return expand_query_terms(terms, [self.term_corrections(term) for term in terms])
+
+    def collection_stats(self, terms: Iterable[str]) -> CollectionStats:
+        """
+        Get the statistics BM25 needs for some terms
+
+        Args:
+            terms (Iterable[str]): Index terms
+
+        Returns:
+            (number of products, total document length, document frequency of each term)
+        """
+        doc_freqs = {term: len(self.postings.get(term, ())) for term in terms}
+        return len(self.doc_lengths), sum(self.doc_lengths), doc_freqs
+
+    def bm25_scores(self, terms: Sequence[QueryTerm], mask=None,
+                    stats: Optional[CollectionStats] = None) -> List[Tuple[int, float, int]]:
+        """
+        Score products against query terms with BM25
+
+        Args:
+            terms (List): Analyzed, de-duplicated query terms, for a tuple of
+                alternatives the best scoring one counts
+            mask: Optional boolean row mask, rows where it is False are skipped
+            stats (CollectionStats): Statistics of the whole catalog when this
+                index holds one shard, defaults to the index's own
+
+        Returns:
+            List of (product position, BM25 score, number of query terms found),
+            ordered by product position
+        """
+        idf, length_norms = self._bm25_weights(stats)
+        scores: Dict[int, float] = {}
+        hits: Dict[int, int] = {}
+        for group in self._as_groups(terms):
+            group_scores: Dict[int, float] = {}
+            for term in group:
+                doc_ids = self.postings.get(term)
+                if not doc_ids or term not in idf:
+                    continue
+                term_idf = idf[term]
+                for doc_id, tf in zip(doc_ids, self.term_frequencies[term]):
+                    if mask is not None and not mask[doc_id]:
+                        continue
+                    score = term_idf * tf * (BM25_K1 + 1) / (tf + length_norms[doc_id])
+                    if score > group_scores.get(doc_id, 0.0):
+                        group_scores[doc_id] = score
+            for doc_id, score in group_scores.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+                hits[doc_id] = hits.get(doc_id, 0) + 1
+        return [(doc_id, scores[doc_id], hits[doc_id]) for doc_id in sorted(scores)]
+
+    def bm25_max_score(self, terms: Sequence[QueryTerm], stats: Optional[CollectionStats] = None) -> float:
+        """
+        Upper bound of the BM25 score for query terms, used to scale scores to 0..1
+
+        Args:
+            terms (List): Analyzed, de-duplicated query terms or tuples of alternatives
+            stats (CollectionStats): Statistics of the whole catalog, defaults to the index's own
+
+        Returns:
+            Maximum reachable score
+        """
+        idf = self._bm25_weights(stats)[0] if stats is not None else self.idf
+        return sum(
+            max((idf[term] for term in group if term in idf), default=0.0) * (BM25_K1 + 1)
+            for group in self._as_groups(terms)
+        )
+
+    def _bm25_weights(self, stats: Optional[CollectionStats]) -> Tuple[Dict[str, float], List[float]]:
+        """IDF and per-document length norms, from the index itself or from catalog-wide statistics"""
+        if stats is None:
+            return self.idf, self._length_norms
+        doc_count, total_length, doc_freqs = stats
+        idf = {
+            term: math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+            for term, doc_freq in doc_freqs.items() if doc_freq
+        }
+        avg_length = (total_length / doc_count) if doc_count else 0.0
+        cached = self._stats_norms
+        if cached is None or cached[0] != avg_length:
+            norms = [
+                BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length) if avg_length else BM25_K1
+                for length in self.doc_lengths
+            ]
+            cached = (avg_length, norms)
+            self._stats_norms = cached
+        return idf, cached[1]
+
+    @staticmethod
+    def _as_groups(terms: Sequence[QueryTerm]) -> List[Tuple[str, ...]]:
+        """Turn plain terms into one-element tuples of alternatives"""
+        return [(term,) if isinstance(term, str) else tuple(term) for term in terms]
+
+    def _group_postings(self, group: Tuple[str, ...]) -> List[int]:
+        """Products containing any term of a tuple of alternatives"""
+        if len(group) == 1:
+            return self.postings.get(group[0], [])
+        doc_ids = set()
+        for term in group:
+            doc_ids.update(self.postings.get(term, ()))
+        return sorted(doc_ids)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Semantic Index for Arabic AI Chatbot
+Offline dense retrieval: LSA vectors over character n-grams with an IVF nearest-neighbour index
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from arabic_utils import get_arabic_analyzer
+from .search_index import product_document
+
+# LSA vector size, smaller catalogs use fewer dimensions
+SEMANTIC_DIMENSIONS = 128
+
+# Character n-grams inside words, robust to prefixes, suffixes and spelling variants
+NGRAM_RANGE = (2, 4)
+MAX_NGRAM_FEATURES = 50000
+
+# Catalogs smaller than this are scanned exhaustively, larger ones through the IVF lists
+IVF_MIN_ROWS = 5000
+DEFAULT_NPROBE = 8
+
+# Cosine similarity below which a product is not considered a match
+MIN_SEMANTIC_SIMILARITY = 0.35
+
+# Length of the character n-grams that anchor a product to a query
+ANCHOR_NGRAM_SIZE = 4
+
+class SemanticIndex:
+    """
+    Dense vectors of a catalog snapshot, computed locally without any API.
+
+    Documents are analyzed like every other index (normalization, stop
+    words, light stemming), turned into TF-IDF over character n-grams and
+    reduced with truncated SVD (latent semantic analysis), so spelling
+    variants, inflections and related vocabulary end up close. Vectors are
+    L2-normalized and stored as float16. Large catalogs are clustered with
+    k-means into inverted lists (IVF) and a query only scores the lists of
+    its nprobe nearest centroids.
+
+    A product is only scored when it is anchored to the query: it shares a
+    query term or a full inner 4-gram (no word boundary). Without it, a
+    query whose n-grams the catalog barely knows (a product nobody sells)
+    lands on an arbitrary direction of the reduced space and matches
+    unrelated ads with a high cosine.
+    """
+
+    def __init__(self, products: List[Dict], dimensions: int = SEMANTIC_DIMENSIONS):
+        """
+        Build the vectors and the IVF lists
+
+        Args:
+            products (List[Dict]): Catalog snapshot
+            dimensions (int): Maximum LSA vector size
+        """
+        self.products = products
+        self.vectorizer: Optional[TfidfVectorizer] = None
+        self.svd: Optional[TruncatedSVD] = None
+        self.vectors = np.zeros((len(products), 0), dtype=np.float16)
+        self.centroids: Optional[np.ndarray] = None
+        self.list_rows: Optional[np.ndarray] = None
+        self.list_offsets: Optional[np.ndarray] = None
+        self.anchor_columns: Dict[str, int] = {}
+        self.anchor_matrix = None
+
+        documents = [self._analyze(product_document(product)) for product in products]
+        if sum(1 for document in documents if document) < 3:
+            return
+
+        try:
+            self.vectorizer = TfidfVectorizer(
+                analyzer='char_wb',
+                ngram_range=NGRAM_RANGE,
+                max_features=MAX_NGRAM_FEATURES,
+                sublinear_tf=True
+            )
+            matrix = self.vectorizer.fit_transform(documents)
+            components = min(dimensions, matrix.shape[0] - 1, matrix.shape[1] - 1)
+            self.svd = TruncatedSVD(n_components=components, random_state=42)
+            vectors = normalize(self.svd.fit_transform(matrix))
+        except ValueError as e:
+            print(f"Error building semantic index: {e}")
+            self.vectorizer = self.svd = None
+            return
+
+        self.vectors = vectors.astype(np.float16)
+
+        anchors = [
+            (feature, column) for feature, column in self.vectorizer.vocabulary_.items()
+            if len(feature) == ANCHOR_NGRAM_SIZE and ' ' not in feature
+        ]
+        self.anchor_columns = {feature: position for position, (feature, _) in enumerate(anchors)}
+        self.anchor_matrix = matrix[:, [column for _, column in anchors]].tocsc()
+        if len(products) >= IVF_MIN_ROWS:
+            self._build_ivf(vectors)
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def search(self, terms: List[str], mask: Optional[np.ndarray] = None,
+               term_rows: Optional[Sequence[int]] = None, nprobe: int = DEFAULT_NPROBE,
+               min_similarity: float = MIN_SEMANTIC_SIMILARITY) -> List[Tuple[int, float]]:
+        """
+        Find products close to a query
+
+        Args:
+            terms (List[str]): Query terms from ArabicAnalyzer.analyze
+            mask: Optional boolean row mask, rows where it is False are skipped
+            term_rows (Sequence[int]): Products containing a query term, from InvertedIndex.candidates
+            nprobe (int): Number of IVF lists scored for large catalogs
+            min_similarity (float): Lowest cosine similarity returned
+
+        Returns:
+            List of (product position, cosine similarity), ordered by product position
+        """
+        query = self.embed(terms)
+        if query is None:
+            return []
+
+        if self.centroids is None:
+            rows = np.arange(len(self.products))
+        else:
+            nearest = np.argsort(-(self.centroids @ query))[:nprobe]
+            rows = np.sort(np.concatenate([
+                self.list_rows[self.list_offsets[cluster]:self.list_offsets[cluster + 1]]
+                for cluster in nearest
+            ]))
+
+        anchored = self._anchored_rows(terms, term_rows)
+        if mask is not None:
+            anchored &= mask
+        rows = rows[anchored[rows]]
+
+        similarities = self.vectors[rows].astype(np.float32) @ query
+        keep = similarities >= min_similarity
+        return list(zip(rows[keep].tolist(), similarities[keep].tolist()))
+
+    def embed(self, terms: List[str]) -> Optional[np.ndarray]:
+        """
+        Get the normalized LSA vector of analyzed terms
+
+        Args:
+            terms (List[str]): Terms from ArabicAnalyzer.analyze
+
+        Returns:
+            float32 vector, or None if the text has no known n-grams
+        """
+        if self.svd is None:
+            return None
+        document = ' '.join(terms)
+        if not document:
+            return None
+        vector = self.svd.transform(self.vectorizer.transform([document]))[0].astype(np.float32)
+        length = np.linalg.norm(vector)
+        if length == 0:
+            return None
+        return vector / length
+
+    def _anchored_rows(self, terms: List[str], term_rows: Optional[Sequence[int]]) -> np.ndarray:
+        """Boolean row mask of products sharing a query term or an inner 4-gram with the query"""
+        anchored = np.zeros(len(self.products), dtype=bool)
+        if term_rows is not None and len(term_rows):
+            anchored[np.asarray(term_rows, dtype=np.int64)] = True
+
+        ngrams = self.vectorizer.build_analyzer()(' '.join(terms))
+        columns = sorted({self.anchor_columns[ngram] for ngram in ngrams if ngram in self.anchor_columns})
+        if columns:
+            anchored[self.anchor_matrix[:, columns].indices] = True
+        return anchored
+
+    def _build_ivf(self, vectors: np.ndarray) -> None:
+        """Cluster the vectors and group rows by nearest centroid"""
+        clusters = max(2, int(math.sqrt(len(vectors))))
+        kmeans = MiniBatchKMeans(n_clusters=clusters, random_state=42, n_init=3, batch_size=4096)
+        labels = kmeans.fit_predict(vectors)
+        self.centroids = normalize(kmeans.cluster_centers_).astype(np.float32)
+        self.list_rows = np.argsort(labels, kind='stable')
+        self.list_offsets = np.searchsorted(labels[self.list_rows], np.arange(clusters + 1))
+
+    @staticmethod
+    def _analyze(text: str) -> str:
+        return ' '.join(get_arabic_analyzer().analyze(text))
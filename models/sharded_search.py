@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Sharded Search for Arabic AI Chatbot
+Splits the catalog into shards searched in parallel worker processes
+"""
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .facet_index import merge_facet_counts
+from .fuzzy_index import get_brand_aliases
+from .product_catalog import DEFAULT_DATASET_PATH, ProductCatalog, get_product_catalog
+from .product_search_engine import ProductSearchEngine
+from .search_index import CollectionStats, Correction, expand_query_terms
+
+class ShardCatalog(ProductCatalog):
+    """
+    Every num_shards-th row of the dataset, starting at shard_id.
+
+    Rows are dealt round-robin so shards stay balanced as ads are appended.
+    The shard reloads whenever the dataset file changes, like the full catalog.
+    """
+
+    def __init__(self, dataset_path: str, shard_id: int, num_shards: int):
+        """
+        Initialize the shard
+
+        Args:
+            dataset_path (str): Path to the ads dataset CSV file
+            shard_id (int): Shard number, 0 <= shard_id < num_shards
+            num_shards (int): Total number of shards
+        """
+        super().__init__(dataset_path)
+        self.shard_id = shard_id
+        self.num_shards = num_shards
+
+    def _read_products(self) -> List[Dict]:
+        return super()._read_products()[self.shard_id::self.num_shards]
+
+# Shard engines of the current worker process, keyed by (dataset path, shard id, shard count)
+_shard_engines: Dict[Tuple[str, int, int], ProductSearchEngine] = {}
+
+def _get_shard_engine(dataset_path: str, shard_id: int, num_shards: int) -> ProductSearchEngine:
+    """Engine of a shard in the current worker process, its index is kept between calls"""
+    key = (dataset_path, shard_id, num_shards)
+    engine = _shard_engines.get(key)
+    if engine is None:
+        engine = ProductSearchEngine(ShardCatalog(dataset_path, shard_id, num_shards))
+        _shard_engines[key] = engine
+    return engine
+
+def _expand_on_shard(dataset_path: str, shard_id: int, num_shards: int,
+                     query_keywords: List[str]) -> Tuple[List[Optional[List[Correction]]], CollectionStats]:
+    """
+    Worker entry point: candidate corrections of the query terms in one shard's vocabulary,
+    and the shard's BM25 statistics for every term the expansion may use
+    """
+    index = _get_shard_engine(dataset_path, shard_id, num_shards).catalog.get_index()
+    corrections = [index.term_corrections(term) for term in query_keywords]
+
+    # A correction chosen for the catalog is among the candidates of every
+    # shard containing it, but its brand spellings may be on other shards
+    terms = set(query_keywords) | set(get_brand_aliases())
+    for candidates in corrections:
+        terms.update(correction for _, _, correction in candidates or ())
+    return corrections, index.collection_stats(terms)
+
+def _rank_on_shard(dataset_path: str, shard_id: int, num_shards: int, parsed_query: tuple,
+                   max_results: int, ranking: str) -> Tuple[List[Tuple[int, Dict]], Dict[str, List[Dict]]]:
+    """Worker entry point: rank a parsed query against one shard, matches come with their catalog row"""
+    engine = _get_shard_engine(dataset_path, shard_id, num_shards)
+    products, _ = engine.catalog.get_snapshot()
+    query_keywords, query_terms, price_range, location, category, boost_category, stats = parsed_query
+    top, facets = engine._select(products, query_keywords, price_range, location, category, max_results, ranking,
+                                 query_terms, boost_category, stats)
+    matches = [
+        (doc_id * num_shards + shard_id, engine._format_match(products[doc_id], similarity, match_type))
+        for doc_id, similarity, match_type in top
+    ]
+    return matches, facets
+
+def merge_corrections(shard_corrections: List[List[Optional[List[Correction]]]]) -> List[Optional[List[Correction]]]:
+    """
+    Combine per-shard candidate corrections into those of the whole catalog
+
+    A term found on any shard needs no correction, otherwise the candidates
+    of all shards are pooled and best_corrections() picks the catalog-wide
+    best ones.
+
+    Args:
+        shard_corrections (List): term_corrections() of every query term, per shard
+
+    Returns:
+        Candidate corrections per query term
+    """
+    if not shard_corrections:
+        return []
+    merged = []
+    for candidates in zip(*shard_corrections):
+        if any(shard_candidates is None for shard_candidates in candidates):
+            merged.append(None)
+        else:
+            merged.append([candidate for shard_candidates in candidates for candidate in shard_candidates])
+    return merged
+
+def merge_collection_stats(shard_stats: List[CollectionStats]) -> CollectionStats:
+    """
+    Add up the BM25 statistics of disjoint shards
+
+    Args:
+        shard_stats (List[CollectionStats]): collection_stats() of every shard
+
+    Returns:
+        Statistics of the whole catalog
+    """
+    doc_freqs: Dict[str, int] = {}
+    for _, _, shard_doc_freqs in shard_stats:
+        for term, doc_freq in shard_doc_freqs.items():
+            doc_freqs[term] = doc_freqs.get(term, 0) + doc_freq
+    return (
+        sum(doc_count for doc_count, _, _ in shard_stats),
+        sum(total_length for _, total_length, _ in shard_stats),
+        doc_freqs
+    )
+
+class ShardedProductSearchEngine(ProductSearchEngine):
+    """
+    ProductSearchEngine that ranks queries across catalog shards in parallel.
+
+    Each shard is owned by a single-process pool, so its index is built once
+    in that process and reused by every query. Queries are parsed and cached
+    here. A first round over the shards collects their candidate typo
+    corrections and BM25 term statistics, which are merged into those of the
+    whole catalog; a second round ranks the query on every shard with them.
+    Shards return their top matches with their catalog row, and ties are
+    broken by that row as a single engine does, so keyword and BM25 results
+    and facet counts equal a single ProductSearchEngine over the catalog.
+
+    Semantic ranking is not supported: every shard would fit its own LSA
+    space, and cosine scores from different spaces cannot be compared.
+
+    Each query pays two round trips to every worker, so sharding only pays
+    off with a free CPU core per shard and a catalog large enough for
+    scoring to dominate (see benchmarks/bench_sharded_search.py).
+    """
+
+    rankings = ('keyword', 'bm25')
+
+    def __init__(self, num_shards: Optional[int] = None, dataset_path: str = DEFAULT_DATASET_PATH,
+                 catalog: Optional[ProductCatalog] = None):
+        """
+        Initialize the engine and start the shard workers
+
+        Args:
+            num_shards (int): Number of shards, defaults to the number of CPU cores
+            dataset_path (str): Path to the ads dataset CSV file
+            catalog (ProductCatalog): Optional catalog used for caching and suggestions
+        """
+        super().__init__(catalog or get_product_catalog(dataset_path))
+        self.dataset_path = os.path.abspath(self.catalog.dataset_path)
+        self.num_shards = max(1, num_shards or os.cpu_count() or 1)
+        self.executors = [ProcessPoolExecutor(max_workers=1) for _ in range(self.num_shards)]
+
+    def warm_up(self) -> None:
+        """Load the shards and build their indexes before the first query"""
+        for future in self._submit(_expand_on_shard, []):
+            future.result()
+
+    def shutdown(self) -> None:
+        """Stop the shard workers"""
+        for executor in self.executors:
+            executor.shutdown(wait=True)
+
+    def _rank(self, products: List[Dict], query_keywords: List[str], price_range: Optional[Tuple[float, float]],
+              location: Optional[str], category: Optional[str], max_results: int,
+              ranking: str, query_terms: Optional[List[Tuple[str, ...]]] = None,
+              boost_category: Optional[str] = None) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+        """Rank the parsed query on every shard and merge the per-shard top matches"""
+        # Typo corrections and BM25 statistics need the whole catalog
+        shard_expansions = [future.result() for future in self._submit(_expand_on_shard, query_keywords)]
+        if query_terms is None:
+            corrections = merge_corrections([corrections for corrections, _ in shard_expansions])
+            query_terms = expand_query_terms(query_keywords, corrections)
+        stats = merge_collection_stats([stats for _, stats in shard_expansions])
+
+        parsed_query = (query_keywords, query_terms, price_range, location, category, boost_category, stats)
+        shard_results = [future.result() for future in self._submit(_rank_on_shard, parsed_query, max_results, ranking)]
+
+        # Ties by catalog row, like ProductSearchEngine
+        top = heapq.nlargest(
+            max_results,
+            (match for shard_matches, _ in shard_results for match in shard_matches),
+            key=lambda match: (match[1]['similarity'], -match[0])
+        )
+        facets = merge_facet_counts([shard_facets for _, shard_facets in shard_results])
+        return [match for _, match in top], facets
+
+    def _submit(self, function, *args) -> list:
+        """Run a worker entry point on every shard, returns one future per shard"""
+        return [
+            executor.submit(function, self.dataset_path, shard_id, self.num_shards, *args)
+            for shard_id, executor in enumerate(self.executors)
+        ]
+
+def create_sharded_product_search_engine(num_shards: Optional[int] = None) -> ShardedProductSearchEngine:
+    """Create ShardedProductSearchEngine instance"""
+    return ShardedProductSearchEngine(num_shards)
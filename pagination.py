@@ -0,0 +1,104 @@
+"""
+Keyset pagination helpers for listing endpoints
+
+Pages are addressed by an opaque cursor holding the (created_at, id) of the
+last row returned, so fetching page N costs the same as page one: the
+database seeks to the cursor instead of skipping N * limit rows.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select
+
+COUNT_MODES = ('exact', 'approx', 'none')
+
+# Approximate counts stop scanning after this many rows
+COUNT_ESTIMATE_CAP = 1000
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded"""
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """
+    Build an opaque cursor from the sort key of the last row of a page
+
+    Args:
+        created_at (datetime): created_at of the row
+        row_id (int): id of the row
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = json.dumps({'c': created_at.isoformat(), 'i': row_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Read the sort key from a cursor
+
+    Args:
+        cursor (str): Cursor from encode_cursor
+
+    Returns:
+        (created_at, id)
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(payload['c']), int(payload['i'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor}") from e
+
+def keyset_page(query_obj, model, limit: int, cursor: Optional[str] = None) -> Tuple[List, Optional[str]]:
+    """
+    Fetch one page ordered newest first, continuing after a cursor
+
+    Args:
+        query_obj: SQLAlchemy query over model, without ORDER BY
+        model: Mapped model with created_at and id columns
+        limit (int): Page size
+        cursor (str): Cursor of the previous page, None for the first page
+
+    Returns:
+        (rows, next cursor or None when this is the last page)
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query_obj = query_obj.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id)
+        ))
+
+    # One extra row tells whether another page exists
+    rows = query_obj.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last.created_at, last.id)
+
+def count_rows(query_obj, mode: str = 'exact') -> Tuple[Optional[int], bool]:
+    """
+    Count the rows of a query
+
+    Args:
+        query_obj: SQLAlchemy query
+        mode (str): 'exact', 'approx' (stops at COUNT_ESTIMATE_CAP) or 'none'
+
+    Returns:
+        (count or None, True if the count is exact)
+    """
+    if mode == 'none':
+        return None, False
+    if mode == 'approx':
+        capped = query_obj.order_by(None).limit(COUNT_ESTIMATE_CAP + 1).subquery()
+        count = query_obj.session.execute(select(func.count()).select_from(capped)).scalar()
+        return min(count, COUNT_ESTIMATE_CAP), count <= COUNT_ESTIMATE_CAP
+    return query_obj.order_by(None).count(), True
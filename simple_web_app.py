@@ -13,13 +13,30 @@ from flask import Flask, render_template, request, jsonify, redirect, url_for, s
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import uuid
+import heapq
 from werkzeug.utils import secure_filename
 import json
-from models.gemini_image_search import create_gemini_image_search_model
+import time
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from models.gemini_image_search import TEXT_QUERY_CACHE, create_gemini_image_search_model
 from models.product_search_engine import ProductSearchEngine
+from models.product_catalog import get_product_catalog
+from models.sharded_search import ShardedProductSearchEngine
+from models.query_cache import QueryCache
+from models.search_index import BM25_MIN_SIMILARITY, InvertedIndex
+from models.index_store import load_tfidf_index, save_tfidf_index
+from arabic_utils import ArabicTextProcessor, get_arabic_analyzer
+from http_client import get_http_session
+from llm_runtime import get_llm_runtime
+from ai_cache import get_ai_cache
+from circuit_breaker import circuit_breaker_stats
+from single_flight import get_single_flight
+from fts_search import ensure_fts_index, fts_search
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from scipy import sparse
 import numpy as np
 
 app = Flask(__name__)
@@ -62,15 +79,45 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY', '')
 GEMINI_API_URL = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-pro-vision:generateContent'
 
+# Approvals update the TF-IDF model incrementally, the vocabulary is refit
+# on a schedule or when the added ads drift away from it
+RETRAIN_INTERVAL_SECONDS = 24 * 60 * 60
+RETRAIN_GROWTH_RATIO = 0.2  # share of ads added since the last fit
+RETRAIN_MIN_ROWS = 50
+RETRAIN_OOV_DRIFT = 0.15  # rise of the out-of-vocabulary term share over the training texts
+RETRAIN_MIN_TERMS = 200
+OOV_SAMPLE_SIZE = 1000
+
 # Dataset and AI Model Integration
 class DatasetManager:
     def __init__(self):
         self.dataset_path = 'dataset/ads_dataset.csv'
         self.model_path = 'models/'
+        self.index_dir = f'{self.model_path}tfidf_index'
         self.vectorizer = None
         self.ad_vectors = None
+        self.ad_ids = None
+        self.search_index = None
+        
+        # Rows added since the last fit or load, kept apart from ad_vectors
+        # (memory-mapped after a load) so appends never copy it
+        self.delta_rows = []
+        self.delta_ad_ids = []
+        self._delta_vectors = None
         self.dataset = None
         
+        # Bumped whenever the indexed ads change, tags cached search results
+        self.index_version = 0
+        self.search_cache = QueryCache()
+        
+        # Incremental update state, reset by train_model
+        self.trained_at = 0.0
+        self.trained_rows = 0
+        self.baseline_oov_ratio = 0.0
+        self.rows_since_training = 0
+        self.terms_since_training = 0
+        self.oov_terms_since_training = 0
+        
         os.makedirs('dataset', exist_ok=True)
         os.makedirs('models', exist_ok=True)
         
@@ -86,7 +133,9 @@ class DatasetManager:
                 # Create initial dataset from existing ads
                 self.create_initial_dataset()
             
-            self.train_model()
+            # Warm start from the persisted index, retrain only when it is missing or stale
+            if not self.load_model():
+                self.train_model()
         except Exception as e:
             print(f"Dataset error: {e}")
             self.dataset = pd.DataFrame(columns=['text', 'category', 'price', 'location'])
@@ -99,6 +148,7 @@ class DatasetManager:
             
             for ad in ads:
                 data.append({
+                    'id': ad.id,
                     'text': ad.enhanced_text,
                     'category': ad.category or 'عام',
                     'price': ad.price or 0,
@@ -114,9 +164,10 @@ class DatasetManager:
             self.dataset = pd.DataFrame(columns=['text', 'category', 'price', 'location'])
     
     def add_to_dataset(self, ad):
-        """Add new approved ad to dataset"""
+        """Add new approved ad to dataset and update the search model incrementally"""
         try:
             new_row = {
+                'id': ad.id,
                 'text': ad.enhanced_text,
                 'category': ad.category or 'عام',
                 'price': ad.price or 0,
@@ -124,17 +175,84 @@ class DatasetManager:
                 'contact_info': ad.contact_info or ''
             }
             
+            previous_columns = list(self.dataset.columns)
             self.dataset = pd.concat([self.dataset, pd.DataFrame([new_row])], ignore_index=True)
-            self.save_dataset()
-            self.train_model()  # Retrain model with new data
+            
+            # Append the new row instead of rewriting the whole file when the columns did not change
+            if list(self.dataset.columns) == previous_columns and os.path.exists(self.dataset_path):
+                self.append_to_dataset_file(self.dataset.iloc[[-1]])
+            else:
+                self.save_dataset()
+            
+            if self.should_retrain():
+                self.train_model()
+            else:
+                self.update_model(self.dataset.iloc[-1].to_dict())
             print(f"Added ad to dataset. Total records: {len(self.dataset)}")
         except Exception as e:
             print(f"Error adding to dataset: {e}")
     
+    def append_to_dataset_file(self, rows):
+        """Append rows to the dataset CSV"""
+        rows.to_csv(self.dataset_path, mode='a', header=False, index=False, encoding='utf-8')
+        get_product_catalog(self.dataset_path).invalidate()
+    
+    def should_retrain(self):
+        """Check whether the next approval should refit the vocabulary instead of updating it"""
+        if self.vectorizer is None or self.ad_vectors is None:
+            return True
+        
+        # Scheduled retrain
+        if time.time() - self.trained_at >= RETRAIN_INTERVAL_SECONDS:
+            return True
+        
+        # Too many ads added since the vocabulary was fitted
+        if self.rows_since_training >= max(RETRAIN_MIN_ROWS, self.trained_rows * RETRAIN_GROWTH_RATIO):
+            return True
+        
+        # Terms of the added ads are missing from the vocabulary more often than in the training texts
+        if self.terms_since_training >= RETRAIN_MIN_TERMS:
+            oov_ratio = self.oov_terms_since_training / self.terms_since_training
+            if oov_ratio - self.baseline_oov_ratio >= RETRAIN_OOV_DRIFT:
+                return True
+        
+        return False
+    
+    def update_model(self, row):
+        """Add one ad to the TF-IDF delta rows and BM25 index using the existing vocabulary"""
+        text = '' if pd.isna(row.get('text')) else str(row.get('text'))
+        
+        # Transform with the fitted vocabulary, the base matrix is left untouched
+        self.delta_rows.append(self.vectorizer.transform([text]))
+        self.delta_ad_ids.append(self._to_ad_id(row.get('id')))
+        self._delta_vectors = None
+        if self.search_index is not None:
+            self.search_index.add_product(row)
+        
+        # Track vocabulary drift
+        terms, oov_terms = self._count_oov_terms([text])
+        self.terms_since_training += terms
+        self.oov_terms_since_training += oov_terms
+        self.rows_since_training += 1
+        self.index_version += 1
+    
+    def _count_oov_terms(self, texts):
+        """Count (terms, out-of-vocabulary terms) of texts for the fitted vectorizer"""
+        analyzer = self.vectorizer.build_analyzer()
+        vocabulary = self.vectorizer.vocabulary_
+        terms = oov_terms = 0
+        for text in texts:
+            for term in analyzer(text):
+                terms += 1
+                if term not in vocabulary:
+                    oov_terms += 1
+        return terms, oov_terms
+    
     def save_dataset(self):
         """Save dataset to CSV"""
         try:
             self.dataset.to_csv(self.dataset_path, index=False, encoding='utf-8-sig')
+            get_product_catalog(self.dataset_path).invalidate()
         except Exception as e:
             print(f"Error saving dataset: {e}")
     
@@ -148,55 +266,185 @@ class DatasetManager:
             texts = self.dataset['text'].fillna('').astype(str)
             
             # Train TF-IDF vectorizer
+            # Unigrams and bigrams of the shared analyzer's terms
             self.vectorizer = TfidfVectorizer(
                 max_features=1000,
-                stop_words=None,  # Arabic stop words handled in arabic_utils
-                ngram_range=(1, 2)
+                analyzer=get_arabic_analyzer().analyze_ngrams
             )
             
             self.ad_vectors = self.vectorizer.fit_transform(texts)
             
-            # Save model
-            with open(f'{self.model_path}vectorizer.pkl', 'wb') as f:
-                pickle.dump(self.vectorizer, f)
+            self.ad_ids = self._get_ad_ids()
+            self._reset_delta()
             
-            with open(f'{self.model_path}ad_vectors.pkl', 'wb') as f:
-                pickle.dump(self.ad_vectors, f)
+            # Build the inverted index used for BM25 ranking
+            self.search_index = InvertedIndex(self.dataset.to_dict('records'))
+            
+            # Reset drift tracking for incremental updates
+            sample = texts.sample(min(len(texts), OOV_SAMPLE_SIZE), random_state=0)
+            sample_terms, sample_oov_terms = self._count_oov_terms(sample)
+            self.baseline_oov_ratio = sample_oov_terms / sample_terms if sample_terms else 0.0
+            self.trained_at = time.time()
+            self.index_version += 1
+            self.trained_rows = len(texts)
+            self.rows_since_training = 0
+            self.terms_since_training = 0
+            self.oov_terms_since_training = 0
+            
+            # Save model
+            save_tfidf_index(
+                self.index_dir, self.vectorizer, self.ad_vectors, self.ad_ids, self.dataset_path,
+                extra={'baseline_oov_ratio': self.baseline_oov_ratio}
+            )
             
             print(f"🤖 Trained AI model with {len(texts)} samples")
         except Exception as e:
             print(f"Error training model: {e}")
     
-    def search_similar_ads(self, query, top_k=5):
-        """Find similar ads using AI model"""
+    def load_model(self):
+        """Load the persisted TF-IDF index, adding rows appended to the dataset since it was saved"""
         try:
-            if self.vectorizer is None or self.ad_vectors is None:
-                return []
-            
-            # Vectorize query
-            query_vector = self.vectorizer.transform([query])
-            
-            # Calculate similarities
-            similarities = cosine_similarity(query_vector, self.ad_vectors).flatten()
-            
-            # Get top similar ads
-            top_indices = np.argsort(similarities)[::-1][:top_k]
-            
-            results = []
-            for idx in top_indices:
-                if similarities[idx] > 0.1:  # Minimum similarity threshold
-                    results.append({
-                        'text': self.dataset.iloc[idx]['text'],
-                        'category': self.dataset.iloc[idx]['category'],
-                        'price': self.dataset.iloc[idx]['price'],
-                        'location': self.dataset.iloc[idx]['location'],
-                        'similarity': similarities[idx]
-                    })
-            
-            return results
+            index = load_tfidf_index(self.index_dir, self.dataset_path)
+            if index is None or index.rows > len(self.dataset):
+                return False
+            
+            self.vectorizer = index.vectorizer
+            self.ad_vectors = index.matrix
+            self.ad_ids = index.ad_ids
+            self._reset_delta()
+            self.search_index = None  # Built on first BM25 search
+            self.index_version += 1
+            
+            self.baseline_oov_ratio = index.manifest.get('baseline_oov_ratio', 0.0)
+            self.trained_at = index.manifest.get('created_at', 0.0)
+            self.trained_rows = index.rows
+            self.rows_since_training = 0
+            self.terms_since_training = 0
+            self.oov_terms_since_training = 0
+            
+            for idx in range(index.rows, len(self.dataset)):
+                self.update_model(self.dataset.iloc[idx].to_dict())
+            
+            print(f"🤖 Loaded AI model with {len(self.dataset)} samples")
+            return True
+        except Exception as e:
+            print(f"Error loading model: {e}")
+            return False
+    
+    def _reset_delta(self):
+        """Forget the rows added to the previous base matrix"""
+        self.delta_rows = []
+        self.delta_ad_ids = []
+        self._delta_vectors = None
+    
+    def _get_delta_vectors(self):
+        """Matrix of the added rows, stacked once per change"""
+        if self._delta_vectors is None and self.delta_rows:
+            self._delta_vectors = sparse.vstack(self.delta_rows, format='csr')
+        return self._delta_vectors
+    
+    def _get_ad_ids(self):
+        """Ad id of every dataset row (-1 when the row has none)"""
+        if 'id' not in self.dataset.columns:
+            return np.full(len(self.dataset), -1, dtype=np.int64)
+        return self.dataset['id'].fillna(-1).astype(np.int64).to_numpy()
+    
+    @staticmethod
+    def _to_ad_id(value):
+        return -1 if value is None or pd.isna(value) else int(value)
+    
+    def _row_ad_id(self, idx):
+        """Ad id of a dataset row, rows past the base matrix are delta rows"""
+        if self.ad_ids is None:
+            return -1
+        if idx < len(self.ad_ids):
+            return int(self.ad_ids[idx])
+        idx -= len(self.ad_ids)
+        return self.delta_ad_ids[idx] if idx < len(self.delta_ad_ids) else -1
+    
+    def _get_search_index(self):
+        """Get the BM25 index, building it from the dataset on first use"""
+        if self.search_index is None and self.dataset is not None:
+            self.search_index = InvertedIndex(self.dataset.to_dict('records'))
+        return self.search_index
+    
+    def search_similar_ads(self, query, top_k=5, ranking='tfidf'):
+        """Find similar ads using AI model (ranking: 'tfidf' cosine or 'bm25')"""
+        try:
+            # Repeated queries are served from the cache until the index changes
+            cache_key = (ranking, top_k, tuple(get_arabic_analyzer().analyze(query)))
+            version = self.index_version
+            cached = self.search_cache.get(cache_key, version)
+            if cached is not None:
+                return list(cached)
+            
+            if ranking == 'bm25':
+                results = self._search_bm25(query, top_k)
+            else:
+                results = self._search_tfidf(query, top_k)
+            
+            self.search_cache.put(cache_key, version, results)
+            return list(results)
         except Exception as e:
             print(f"Error in AI search: {e}")
             return []
+    
+    def _search_tfidf(self, query, top_k):
+        """Rank ads by TF-IDF cosine similarity"""
+        if self.vectorizer is None or self.ad_vectors is None:
+            return []
+        
+        # Vectorize query
+        query_vector = self.vectorizer.transform([query])
+        
+        # Calculate similarities, base rows first then the rows added since
+        similarities = cosine_similarity(query_vector, self.ad_vectors).flatten()
+        delta_vectors = self._get_delta_vectors()
+        if delta_vectors is not None:
+            similarities = np.concatenate([similarities, cosine_similarity(query_vector, delta_vectors).flatten()])
+        
+        # Get top similar ads, partition first so only top_k entries get sorted
+        if top_k < len(similarities):
+            top_indices = np.argpartition(-similarities, top_k)[:top_k]
+        else:
+            top_indices = np.arange(len(similarities))
+        top_indices = top_indices[np.argsort(-similarities[top_indices], kind='stable')]
+        
+        results = []
+        for idx in top_indices:
+            if similarities[idx] > 0.1:  # Minimum similarity threshold
+                results.append(self._format_result(idx, similarities[idx]))
+        
+        return results
+    
+    def _search_bm25(self, query, top_k):
+        """Rank ads with BM25 over the inverted index"""
+        search_index = self._get_search_index()
+        if search_index is None:
+            return []
+        
+        # Brand spellings and typo corrections for the query terms
+        terms = search_index.expand_terms(search_index.query_terms(query))
+        max_score = search_index.bm25_max_score(terms)
+        if max_score <= 0:
+            return []
+        
+        scored = [(score / max_score, idx) for idx, score, _ in search_index.bm25_scores(terms)]
+        top = heapq.nlargest(top_k, scored, key=lambda x: x[0])
+        
+        return [self._format_result(idx, similarity) for similarity, idx in top if similarity > BM25_MIN_SIMILARITY]
+    
+    def _format_result(self, idx, similarity):
+        """Build a search result from a dataset row"""
+        ad_id = self._row_ad_id(idx)
+        return {
+            'id': ad_id if ad_id >= 0 else None,
+            'text': self.dataset.iloc[idx]['text'],
+            'category': self.dataset.iloc[idx]['category'],
+            'price': self.dataset.iloc[idx]['price'],
+            'location': self.dataset.iloc[idx]['location'],
+            'similarity': similarity
+        }
 
 # Simple models for demo
 class SimpleUser(db.Model):
@@ -235,6 +483,8 @@ class SimpleConversation(db.Model):
 # Create tables
 with app.app_context():
     db.create_all()
+    # Full-text mirror of simple_ads used by search_ads_simple
+    ensure_fts_index(db.engine, SimpleAd.__tablename__)
 
 # Dataset manager will be initialized lazily when needed
 dataset_manager = None
@@ -245,6 +495,75 @@ def get_dataset_manager():
         dataset_manager = DatasetManager()
     return dataset_manager
 
+# Search engine is shared across requests, it reads from the cached catalog.
+# SEARCH_SHARDS > 1 splits the catalog across that many worker processes
+search_engine = None
+SEARCH_SHARDS = int(os.getenv('SEARCH_SHARDS', '1'))
+
+def get_search_engine():
+    global search_engine
+    if search_engine is None:
+        if SEARCH_SHARDS > 1:
+            search_engine = ShardedProductSearchEngine(SEARCH_SHARDS)
+        else:
+            search_engine = ProductSearchEngine()
+            # Paraphrase matching is ready a few seconds later, without making
+            # the first buyer wait for the build
+            search_engine.catalog.warm_semantic_index()
+    return search_engine
+
+# Gemini query rewrites must finish within this budget, counted from when the
+# buyer's search starts waiting for the rewrite, otherwise the buyer gets the
+# local results. QUERY_REWRITE_MODE 'fallback' asks Gemini only when local
+# search finds nothing, 'race' starts the rewrite alongside the local search
+# (less waiting) and cancels it as soon as local search finds results
+QUERY_REWRITE_BUDGET_MS = int(os.getenv('QUERY_REWRITE_BUDGET_MS', '300'))
+QUERY_REWRITE_MODE = os.getenv('QUERY_REWRITE_MODE', 'fallback')
+
+query_rewrite_stats = {'started': 0, 'used': 0, 'over_budget': 0, 'failed': 0, 'cancelled': 0}
+query_rewrite_stats_lock = threading.Lock()
+
+def count_query_rewrite(outcome):
+    with query_rewrite_stats_lock:
+        query_rewrite_stats[outcome] += 1
+
+def start_query_rewrite(message):
+    """Start the Gemini rewrite of a buyer query on the LLM runtime, returns its future"""
+    count_query_rewrite('started')
+    return get_llm_runtime().start(create_gemini_image_search_model().analyze_text_query_async(message))
+
+def cancel_query_rewrite(rewrite):
+    """
+    Stop waiting for a raced rewrite that local results made unnecessary.
+
+    Only this buyer's wait is cancelled: the Gemini call it may share with
+    other buyers keeps running until nobody waits for it (a request already
+    sent may still be billed).
+    """
+    if rewrite.cancel():
+        count_query_rewrite('cancelled')
+
+def wait_for_query_rewrite(rewrite):
+    """Rewritten search text if the rewrite succeeds within QUERY_REWRITE_BUDGET_MS from now, else None"""
+    try:
+        enhanced_query = rewrite.result(timeout=QUERY_REWRITE_BUDGET_MS / 1000)
+    except FutureTimeoutError:
+        # Left running: its outcome still feeds the circuit breaker and the rewrite cache
+        count_query_rewrite('over_budget')
+        print("Gemini query rewrite exceeded the latency budget, keeping local search results")
+        return None
+    except Exception as e:
+        count_query_rewrite('failed')
+        print(f"Gemini AI error, keeping basic search results: {e}")
+        return None
+    
+    if enhanced_query.get('success') and enhanced_query.get('keywords'):
+        count_query_rewrite('used')
+        return enhanced_query['keywords']
+    count_query_rewrite('failed')
+    print(f"Gemini did not provide keywords, using original query: {enhanced_query.get('error', '')}")
+    return None
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -280,7 +599,7 @@ def analyze_image_with_gemini(image_path):
         }
         
         # Make API request
-        response = requests.post(
+        response = get_http_session(retry_post=True).post(
             f"{GEMINI_API_URL}?key={GEMINI_API_KEY}",
             headers=headers,
             json=payload,
@@ -657,25 +976,30 @@ def process_simple_message(conversation, message):
         if len(message.split()) < 2:
             return "من فضلك اكتب تفاصيل أكثر عما تبحث عنه أو ارفع صورة للمنتج 📸"
         
-        # Handle buyer search query with Gemini AI enhancement as the primary method
+        # Handle buyer search query locally first, the search engine already
+        # tolerates typos and brand spellings and falls back to semantic
+        # matching for paraphrases; a Gemini rewrite is only used for queries
+        # that find nothing, and only if it arrives within the latency budget
         try:
-            search_text = message  # Default to original message
-            try:
-                # Attempt to enhance the query with Gemini AI first
-                gemini_model = create_gemini_image_search_model()
-                enhanced_query = gemini_model.analyze_text_query(message)
-                
-                if enhanced_query and enhanced_query.get('keywords'):
-                    search_text = enhanced_query['keywords']
-                    print(f"Using enhanced search query: {search_text}")
-                else:
-                    print("Gemini did not provide keywords, using original query.")
-            except Exception as gemini_error:
-                print(f"Gemini AI error, falling back to basic search: {gemini_error}")
+            rewrite = start_query_rewrite(message) if QUERY_REWRITE_MODE == 'race' else None
             
-            # Perform the search using the determined search text
-            search_engine = ProductSearchEngine()
-            results = search_engine.search_by_text(search_text)
+            results, facets = get_search_engine().search_with_facets(message)
+            
+            # Semantic matching only once its index is built in the background,
+            # until then the buyer gets the keyword results
+            if not results and 'semantic' in get_search_engine().rankings \
+                    and get_search_engine().catalog.semantic_index_ready():
+                results, facets = get_search_engine().search_with_facets(message, ranking='semantic')
+            
+            if results and rewrite is not None:
+                cancel_query_rewrite(rewrite)
+            elif not results:
+                if rewrite is None:
+                    rewrite = start_query_rewrite(message)
+                search_text = wait_for_query_rewrite(rewrite)
+                if search_text:
+                    print(f"Using enhanced search query: {search_text}")
+                    results, facets = get_search_engine().search_with_facets(search_text)
             
             if results:
                 response = "وجدت هذه النتائج:\n\n"
@@ -688,6 +1012,7 @@ def process_simple_message(conversation, message):
                         response += f"نوع المطابقة: {result['match_type']}\n"
                     response += f"رابط الإعلان: /ad/{result['id']}\n\n"
                 
+                response += format_facets_simple(facets)
                 response += "هل تريد البحث عن شيء آخر؟"
             else:
                 response = "لم أجد إعلانات مطابقة لبحثك حالياً.\n\n"
@@ -700,8 +1025,7 @@ def process_simple_message(conversation, message):
             print(f"Error in buyer search: {e}")
             # Fallback to regular search if Gemini fails
             try:
-                search_engine = ProductSearchEngine()
-                results = search_engine.search_by_text(message)
+                results = get_search_engine().search_by_text(message)
                 
                 if results:
                     response = "وجدت هذه النتائج:\n\n"
@@ -800,21 +1124,22 @@ def extract_contact_simple(text):
         return phone_match.group(0)
     return None
 
+def format_facets_simple(facets, per_facet=3):
+    """Refinement hints like 'القاهرة (12)' for facets with more than one value"""
+    labels = {'category': 'الفئة', 'location': 'الموقع', 'price': 'السعر'}
+    lines = []
+    for facet, label in labels.items():
+        entries = facets.get(facet, [])
+        if len(entries) > 1:
+            values = '، '.join(f"{entry['value']} ({entry['count']})" for entry in entries[:per_facet])
+            lines.append(f"{label}: {values}")
+    if not lines:
+        return ""
+    return "🔎 لتضييق البحث أضف أحد هذه التفاصيل:\n" + "\n".join(lines) + "\n\n"
+
 def extract_category_simple(text):
     """Extract category from text"""
-    categories = {
-        'موبايل': ['موبايل', 'جوال', 'هاتف', 'تليفون'],
-        'سيارات': ['سيارة', 'عربية', 'أوتوموبيل'],
-        'عقارات': ['شقة', 'فيلا', 'بيت', 'منزل'],
-        'إلكترونيات': ['تلفزيون', 'لابتوب', 'كمبيوتر']
-    }
-    
-    text_lower = text.lower()
-    for category, keywords in categories.items():
-        for keyword in keywords:
-            if keyword in text_lower:
-                return category
-    return 'عام'
+    return ArabicTextProcessor.detect_category(text) or 'عام'
 
 def process_platform_message(platform, sender_id, message):
     """Process message from any platform"""
@@ -842,11 +1167,13 @@ def notify_advertiser_approval(ad_id, approved=True):
 
 def search_ads_simple(query):
     """Simple ad search - only approved ads"""
-    # Search in enhanced text for approved ads only
-    ads = SimpleAd.query.filter(
-        SimpleAd.enhanced_text.contains(query),
-        SimpleAd.status == 'approved'
-    ).order_by(SimpleAd.created_at.desc()).all()
+    approved = SimpleAd.query.filter(SimpleAd.status == 'approved')
+    
+    # Full-text search in enhanced text ranked by bm25(), substring match if FTS5 is unavailable
+    fts_query = fts_search(approved, SimpleAd, query)
+    if fts_query is None:
+        fts_query = approved.filter(SimpleAd.enhanced_text.contains(query))
+    ads = fts_query.order_by(SimpleAd.created_at.desc()).all()
     
     if not ads:
         # Fallback: search by category for approved ads only
@@ -919,6 +1246,68 @@ def view_ad(ad_id):
     ad.text = ad.text.replace('\x00', '')
     return render_template('ad_view.html', ad=ad)
 
+@app.route('/api/search', methods=['GET'])
+def search_products():
+    """Search the catalog, with result counts per category, location and price bucket"""
+    try:
+        query = request.args.get('q', '')
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+        ranking = request.args.get('ranking', 'keyword')
+        rankings = get_search_engine().rankings
+        if ranking not in rankings:
+            return jsonify({'error': f'ranking must be one of {", ".join(rankings)}'}), 400
+        
+        results, facets = get_search_engine().search_with_facets(query, limit, ranking)
+        return jsonify({
+            'success': True,
+            'query': query,
+            'results': results,
+            'facets': facets
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/search/cache-stats', methods=['GET'])
+def get_search_cache_stats():
+    """Hit/miss counters of the search result caches, used to size them"""
+    try:
+        return jsonify({
+            'success': True,
+            'text_search': get_search_engine().cache.stats(),
+            'similar_ads': dataset_manager.search_cache.stats() if dataset_manager is not None else None
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/llm/stats', methods=['GET'])
+def get_llm_stats():
+    """Circuit breaker state, concurrency and query rewrite counters of the LLM providers"""
+    try:
+        return jsonify({
+            'success': True,
+            'circuit_breakers': circuit_breaker_stats(),
+            'concurrency': get_llm_runtime().stats(),
+            'single_flight': get_single_flight().stats(),
+            'query_rewrite': dict(query_rewrite_stats, budget_ms=QUERY_REWRITE_BUDGET_MS, mode=QUERY_REWRITE_MODE),
+            'query_rewrite_cache': get_ai_cache(TEXT_QUERY_CACHE).stats()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/suggestions', methods=['GET'])
+def get_suggestions():
+    """Autocomplete the search box from ad titles and popular searches"""
+    try:
+        query = request.args.get('q', '')
+        limit = max(1, min(request.args.get('limit', 5, type=int), 20))
+        return jsonify({
+            'success': True,
+            'query': query,
+            'suggestions': get_search_engine().get_search_suggestions(query, limit)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/ads', methods=['GET'])
 def get_ads():
     """Get all approved ads"""
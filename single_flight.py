@@ -0,0 +1,180 @@
+"""
+Single-flight coalescing of identical concurrent calls
+
+When several threads make the same upstream call at the same time (the same
+buyer query during a burst, for example), only the first one runs it; the
+others wait for its result instead of sending their own request.
+
+Async calls run as a task of their own. A cancelled caller only stops
+waiting, so cancelling the caller that started the call does not cancel
+it for the others; the call is cancelled once no caller waits for it.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+class SingleFlight:
+    """
+    Registry of in-flight calls keyed by request identity.
+
+    A key is only shared while its call is running, results are not cached.
+    Exceptions are propagated to every caller waiting on the key.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    def do(self, key: Hashable, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run function, or wait for the identical call already in flight
+
+        Args:
+            key (Hashable): Identity of the call, equal keys must produce equal results
+            function (Callable): Call to make when no identical call is running
+            *args, **kwargs: Arguments for function
+
+        Returns:
+            Result of the call (shared by all coalesced callers, must not be modified)
+        """
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                return future.result()
+            finally:
+                self._release(key, future)
+
+        try:
+            result = function(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._leave(key, future)
+
+    async def do_async(self, key: Hashable, function: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """
+        Await function, or the identical call already in flight
+
+        Shares keys with do(), so blocking and async callers of the same
+        request coalesce with each other. The call runs as its own task:
+        cancelling a caller (even the one that started the call) only stops
+        its wait, the call is cancelled when its last caller stops waiting.
+
+        Args:
+            key (Hashable): Identity of the call, equal keys must produce equal results
+            function (Callable): Coroutine function to await when no identical call is running
+            *args, **kwargs: Arguments for function
+
+        Returns:
+            Result of the call (shared by all coalesced callers, must not be modified)
+        """
+        future, leader = self._join(key)
+        if leader:
+            task = asyncio.ensure_future(self._run(key, future, function, *args, **kwargs))
+            with self._lock:
+                self._tasks[key] = task
+
+        try:
+            return await asyncio.shield(asyncio.wrap_future(future))
+        finally:
+            self._release(key, future)
+
+    def in_flight(self) -> int:
+        """Number of calls currently running"""
+        with self._lock:
+            return len(self._calls)
+
+    async def _run(self, key: Hashable, future: Future, function: Callable[..., Awaitable], *args, **kwargs) -> None:
+        """Await the shared call and hand its outcome to every caller (runs as its own task)"""
+        try:
+            result = await function(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            self._leave(key, future)
+
+    def _join(self, key: Hashable):
+        """Get the future of key and whether the caller leads (runs) the call"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = Future()
+                self._calls[key] = future
+                self._waiters[key] = 1
+                self.executed += 1
+                return future, True
+            self._waiters[key] += 1
+            self.coalesced += 1
+            return future, False
+
+    def _release(self, key: Hashable, future: Future) -> None:
+        """Stop waiting for a call, the last caller to stop cancels an async call still running"""
+        with self._lock:
+            if self._calls.get(key) is not future:
+                return
+            self._waiters[key] -= 1
+            task = self._tasks.get(key)
+            if self._waiters[key] > 0 or task is None or future.done():
+                return
+            # Later identical calls start afresh instead of joining the cancelled one
+            del self._calls[key], self._waiters[key], self._tasks[key]
+            self.cancelled += 1
+        task.get_loop().call_soon_threadsafe(task.cancel)
+
+    def _leave(self, key: Hashable, future: Future) -> None:
+        """Forget a finished call"""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key], self._waiters[key]
+                self._tasks.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get coalescing counters
+
+        Returns:
+            Dict with executed, coalesced and cancelled (no caller left) call
+            counts and the share of calls saved
+        """
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                'in_flight': len(self._calls),
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'cancelled': self.cancelled,
+                'saved_ratio': self.coalesced / total if total else 0.0
+            }
+
+_single_flight: Optional[SingleFlight] = None
+_single_flight_lock = threading.Lock()
+
+def get_single_flight() -> SingleFlight:
+    """
+    Get the process-wide single-flight registry shared by the AI clients
+
+    Returns:
+        Shared SingleFlight instance
+    """
+    global _single_flight
+    if _single_flight is None:
+        with _single_flight_lock:
+            if _single_flight is None:
+                _single_flight = SingleFlight()
+    return _single_flight
@@ -1,6 +1,7 @@
 import os
 import requests
 from typing import Dict, Any, Optional
+from http_client import get_http_session
 
 class TelegramBot:
     """Telegram Bot API integration for the chatbot"""
@@ -150,7 +151,7 @@ class TelegramBot:
         url = f'{self.base_url}/sendMessage'
         
         try:
-            response = requests.post(url, json=message_data)
+            response = get_http_session().post(url, json=message_data)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
@@ -220,7 +221,7 @@ class TelegramBot:
         url = f'{self.base_url}/answerCallbackQuery'
         
         try:
-            response = requests.post(url, json=payload)
+            response = get_http_session().post(url, json=payload)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
@@ -243,7 +244,7 @@ class TelegramBot:
         url = f'{self.base_url}/setWebhook'
         
         try:
-            response = requests.post(url, json=payload)
+            response = get_http_session().post(url, json=payload)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
@@ -258,7 +259,7 @@ class TelegramBot:
         url = f'{self.base_url}/getWebhookInfo'
         
         try:
-            response = requests.get(url)
+            response = get_http_session().get(url)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -274,7 +275,7 @@ class TelegramBot:
         url = f'{self.base_url}/setMyCommands'
         
         try:
-            response = requests.post(url, json=payload)
+            response = get_http_session().post(url, json=payload)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
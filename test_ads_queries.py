@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Query-count and full-text search tests for the ads tables"""
+
+import sys
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+sys.path.insert(0, os.path.dirname(__file__))
+
+# ads.py creates an AIService at import, no API call is made in these tests
+os.environ.setdefault('OPENAI_API_KEY', 'test-key')
+
+from flask import Flask
+from sqlalchemy import create_engine, event, text
+
+from database import db, ensure_indexes
+from user import User
+from ad import Ad, AdStatus
+from ads import ads_bp
+from fts_search import build_match_query, ensure_fts_index
+
+@contextmanager
+def count_queries(engine):
+    """Count SQL statements executed on engine inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+@contextmanager
+def assert_max_queries(engine, limit):
+    """Fail if the block runs more than limit SQL statements"""
+    with count_queries(engine) as statements:
+        yield statements
+    assert len(statements) <= limit, f"Expected at most {limit} queries, got {len(statements)}:\n" + "\n".join(statements)
+
+def create_test_app(ad_count, database_uri='sqlite://'):
+    """App with a database (in memory by default) holding ad_count ads from 5 users"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.register_blueprint(ads_bp, url_prefix='/api/ads')
+
+    with app.app_context():
+        db.create_all()
+        users = [User(name=f'user {i}', phone=f'0100000000{i}') for i in range(5)]
+        db.session.add_all(users)
+        db.session.flush()
+        statuses = [AdStatus.APPROVED, AdStatus.PENDING, AdStatus.REJECTED]
+        categories = ['موبايل', 'سيارات', 'عقارات', None]
+        for i in range(ad_count):
+            db.session.add(Ad(
+                user_id=users[i % len(users)].id,
+                original_text=f'موبايل للبيع {i}',
+                enhanced_text=f'موبايل للبيع {i}',
+                status=statuses[i % len(statuses)],
+                category=categories[i % len(categories)],
+                price=1000 + i
+            ))
+        db.session.commit()
+    return app
+
+def test_listing_query_counts_do_not_grow_with_results():
+    """search, pending and stats run a fixed number of queries"""
+    for ad_count in (10, 60):
+        app = create_test_app(ad_count)
+        client = app.test_client()
+        with app.app_context():
+            engine = db.engine
+
+        # count + page with joined users
+        with assert_max_queries(engine, 2):
+            response = client.get('/api/ads/search?limit=20')
+        assert response.status_code == 200, response.get_json()
+        assert all(result['user']['name'] for result in response.get_json()['results'])
+
+        with assert_max_queries(engine, 2):
+            response = client.get('/api/ads/pending?limit=20')
+        assert response.status_code == 200, response.get_json()
+        assert all(result['user']['phone'] for result in response.get_json()['results'])
+
+        # status GROUP BY, recent count, category GROUP BY
+        with assert_max_queries(engine, 3):
+            response = client.get('/api/ads/stats')
+        stats = response.get_json()['stats']
+        assert stats['total_ads'] == ad_count
+        assert sum(stats['category_breakdown'].values()) == ad_count - ad_count // 4
+
+def test_search_cursor_pages_cover_all_results():
+    """Following next_cursor returns every approved ad once"""
+    app = create_test_app(45)
+    client = app.test_client()
+
+    seen = []
+    cursor = ''
+    while True:
+        response = client.get(f'/api/ads/search?limit=4&count=none&cursor={cursor}')
+        data = response.get_json()
+        seen.extend(result['id'] for result in data['results'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    assert len(seen) == len(set(seen)) == 15
+
+def test_category_price_search_uses_composite_index():
+    """Category + price range searches seek ix_ads_status_category_price instead of scanning"""
+    app = create_test_app(60)
+    with app.app_context():
+        query_obj = Ad.search_query(category='سيارات', min_price=1010, max_price=1040)
+        statement = query_obj.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+        plan = ' '.join(str(row[-1]) for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {statement}')))
+        assert 'ix_ads_status_category_price' in plan, plan
+        
+        prices = sorted(ad.price for ad in query_obj.all())
+        assert prices == [1000 + i for i in range(60) if i % 3 == 0 and i % 4 == 1 and 1010 <= 1000 + i <= 1040]
+
+def test_category_search_matches_names_containing_text():
+    """A category filter keeps matching every category name that contains the text, ignoring case"""
+    app = create_test_app(24)
+    with app.app_context():
+        db.session.add(Ad(user_id=1, original_text='Laptop', enhanced_text='Laptop', status=AdStatus.APPROVED,
+                          category='Electronics', price=5000))
+        db.session.commit()
+        for category in ('سيارات', 'سيار', ' سيارات '):
+            assert {ad.category for ad in Ad.search_query(category=category).all()} == {'سيارات'}
+        assert len(Ad.search_query(category='سيار').all()) == 2
+        assert [ad.category for ad in Ad.search_query(category='electro').all()] == ['Electronics']
+        assert Ad.search_query(category='دراجات').all() == []
+
+def test_ensure_indexes_upgrades_existing_tables():
+    """Indexes missing from a table created before they were declared are added at startup"""
+    app = create_test_app(10)
+    with app.app_context():
+        db.session.execute(text('DROP INDEX ix_ads_status_category_price'))
+        db.session.commit()
+        ensure_indexes(db.engine, Ad)
+        ensure_indexes(db.engine, Ad)
+        names = {row[0] for row in db.session.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))}
+        assert {'ix_ads_status_category_price', 'ix_ads_status_created_at_id'} <= names
+
+def test_fts_index_follows_plain_sqlite_writers():
+    """Ads changed through sqlite3 without any registered function are found by full-text search"""
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'ads.db')
+    app = create_test_app(6, f'sqlite:///{path}')
+    with app.app_context():
+        assert ensure_fts_index(db.engine, Ad.__tablename__)
+        approved_ids = sorted(ad.id for ad in Ad.search_query('موبايل').all())
+        assert len(approved_ids) == 2
+    
+    connection = sqlite3.connect(path)
+    connection.execute("UPDATE ads SET enhanced_text = 'سيارة تويوتا كورولا' WHERE id = ?", (approved_ids[0],))
+    connection.commit()
+    connection.close()
+    
+    with app.app_context():
+        assert [ad.id for ad in Ad.search_query('تويوتا').all()] == [approved_ids[0]]
+        assert [ad.id for ad in Ad.search_query('موبايل').all()] == approved_ids[1:]
+        db.session.remove()
+        db.engine.dispose()
+
+def fts_ids(engine, query):
+    """Ids of the rows of the ads table matching query in its FTS5 mirror, best bm25() first"""
+    # Index the rows the triggers queued
+    assert ensure_fts_index(engine, 'ads')
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text('SELECT rowid FROM ads_fts WHERE ads_fts MATCH :match ORDER BY bm25(ads_fts)'),
+            {'match': build_match_query(query)}
+        )
+        return [row[0] for row in rows]
+
+def test_fts_index_follows_writes_with_ranking():
+    """Inserted, edited and deleted ads are queued by the triggers and indexed, denser matches rank first"""
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'ads.db')}")
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE ads (id INTEGER PRIMARY KEY, enhanced_text TEXT NOT NULL)'))
+    assert ensure_fts_index(engine, 'ads')
+
+    with engine.begin() as connection:
+        insert = text('INSERT INTO ads (id, enhanced_text) VALUES (:id, :text)')
+        connection.execute(insert, {'id': 1, 'text': 'شاشة سامسونج 55 بوصة سمارت بحالة ممتازة مع الريموت والكرتونة'})
+        connection.execute(insert, {'id': 2, 'text': 'سامسونج جالاكسي سامسونج'})
+    assert fts_ids(engine, 'سامسونج') == [2, 1]
+    assert fts_ids(engine, 'شاشه سمارت') == [1]
+
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE ads SET enhanced_text = 'ايفون 13 برو' WHERE id = 2"))
+    assert fts_ids(engine, 'سامسونج') == [1]
+    assert fts_ids(engine, 'ايفون') == [2]
+
+    with engine.begin() as connection:
+        connection.execute(text('DELETE FROM ads WHERE id = 1'))
+    assert fts_ids(engine, 'سامسونج') == []
+    engine.dispose()
+
+def main():
+    """Run all tests"""
+    print("Starting ads query tests...\n")
+    test_listing_query_counts_do_not_grow_with_results()
+    test_search_cursor_pages_cover_all_results()
+    test_category_price_search_uses_composite_index()
+    test_category_search_matches_names_containing_text()
+    test_ensure_indexes_upgrades_existing_tables()
+    test_fts_index_follows_plain_sqlite_writers()
+    test_fts_index_follows_writes_with_ranking()
+    print("Tests completed!")
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,18 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(__file__))
 
-from ai_service import AIService
+import asyncio
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+from ai_cache import DEFAULT_CACHE_PATH, DEFAULT_NAMESPACE, AICache, make_cache_key, namespace_path
+from ai_service import AIService, ENHANCE_MODEL, ENHANCE_PROMPT_VERSION
 from arabic_utils import ArabicTextProcessor
+from circuit_breaker import CircuitOpenError, get_circuit_breaker
+from llm_runtime import LLMRuntime
+from single_flight import SingleFlight, get_single_flight
 
 def test_arabic_utils():
     """Test Arabic text processing utilities"""
@@ -102,6 +112,201 @@ def test_ai_service():
     except Exception as e:
         print(f"Exception during response generation: {e}")
 
+class FakeCompletions:
+    """Stands in for client.chat.completions, counts calls"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def create(self, **kwargs):
+        self.calls += 1
+        message = SimpleNamespace(content=f"إعلان محسن رقم {self.calls}\n• حالة ممتازة")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+def test_enhancement_cache():
+    """Near-identical resubmissions reuse the cached enhancement, eviction keeps the size bounded"""
+    with tempfile.TemporaryDirectory() as directory:
+        cache = AICache(os.path.join(directory, 'ai_cache.db'), max_bytes=4096)
+        ai_service = AIService(cache=cache)
+        completions = FakeCompletions()
+        ai_service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        
+        first = ai_service.enhance_ad_text("موبايل سامسونج للبيع\nالسعر 3000 جنيه")
+        again = ai_service.enhance_ad_text("  موبايل  سامسونج للبيع السعر 3000 جنيه ")
+        assert completions.calls == 1
+        assert not first['cached'] and again['cached']
+        assert again['enhanced_text'] == first['enhanced_text']
+        assert again['original_text'] == "  موبايل  سامسونج للبيع السعر 3000 جنيه "
+        
+        other_price = ai_service.enhance_ad_text("موبايل سامسونج للبيع السعر 4000 جنيه")
+        assert completions.calls == 2 and not other_price['cached']
+        
+        # Survives a restart
+        reopened = AICache(cache.path, max_bytes=4096)
+        assert reopened.get(make_cache_key('enhance_ad_text', ENHANCE_MODEL, ENHANCE_PROMPT_VERSION,
+                                           "موبايل سامسونج للبيع السعر 3000 جنيه")) is not None
+        
+        for i in range(30):
+            ai_service.enhance_ad_text(f"إعلان رقم {i} للبيع")
+        stats = cache.stats()
+        assert stats['size_bytes'] <= 4096 and stats['evictions'] > 0
+        assert stats['hits'] == 1 and stats['hit_ratio'] > 0
+
+def test_cache_namespaces():
+    """Each cache namespace has its own file next to the default cache"""
+    assert namespace_path(DEFAULT_NAMESPACE) == DEFAULT_CACHE_PATH
+    assert namespace_path('query_rewrites') not in (DEFAULT_CACHE_PATH, namespace_path('other'))
+    assert namespace_path('query_rewrites').endswith('.db')
+
+def test_single_flight():
+    """Identical buyer queries arriving together share one completion request"""
+    release = threading.Event()
+    
+    class BlockingCompletions(FakeCompletions):
+        async def create(self, **kwargs):
+            deadline = time.time() + 5
+            while not release.is_set() and time.time() < deadline:
+                await asyncio.sleep(0.01)
+            return await super().create(**kwargs)
+    
+    ai_service = AIService()
+    completions = BlockingCompletions()
+    ai_service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    single_flight = get_single_flight()
+    coalesced = single_flight.stats()['coalesced']
+    
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(ai_service.analyze_buyer_query("عايز لابتوب ديل مستعمل")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 5
+    while single_flight.stats()['coalesced'] < coalesced + 7 and time.time() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert completions.calls == 1
+    assert len(results) == 8 and all(result['success'] for result in results)
+    assert len({result['ai_analysis'] for result in results}) == 1
+    assert single_flight.in_flight() == 0
+    
+    # Once the call finished, the next identical query is sent again
+    ai_service.analyze_buyer_query("عايز لابتوب ديل مستعمل")
+    assert completions.calls == 2
+
+def wait_until(condition, timeout=5):
+    """Poll condition until it holds or timeout seconds pass"""
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+
+def test_single_flight_cancelled_waiter():
+    """Cancelling the caller that started a shared call leaves it running for the others"""
+    runtime = LLMRuntime()
+    single_flight = SingleFlight()
+    release = threading.Event()
+    calls, cancelled = [], []
+    
+    async def rewrite():
+        calls.append(1)
+        try:
+            while not release.is_set():
+                await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+        return 'لابتوب ديل'
+    
+    leader = runtime.start(single_flight.do_async('query', rewrite))
+    wait_until(lambda: calls)
+    follower = runtime.start(single_flight.do_async('query', rewrite))
+    wait_until(lambda: single_flight.stats()['coalesced'] == 1)
+    leader.cancel()
+    release.set()
+    assert follower.result(timeout=5) == 'لابتوب ديل'
+    assert leader.cancelled() and len(calls) == 1 and not cancelled
+    assert single_flight.in_flight() == 0
+    
+    # The last caller to stop waiting cancels the call
+    release.clear()
+    alone = runtime.start(single_flight.do_async('query', rewrite))
+    wait_until(lambda: len(calls) == 2)
+    alone.cancel()
+    wait_until(lambda: cancelled)
+    assert cancelled and single_flight.in_flight() == 0
+    assert single_flight.stats()['cancelled'] == 1
+
+def test_async_concurrency_limit():
+    """Async callers on their own loop share the runtime, which caps concurrent requests per provider"""
+    runtime = LLMRuntime(concurrency={'openai': 3})
+    running = []
+    peak = []
+    
+    async def request(number):
+        running.append(number)
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.remove(number)
+        return number
+    
+    async def burst():
+        return await asyncio.gather(*(runtime.submit('openai', request(i)) for i in range(20)))
+    
+    assert asyncio.run(burst()) == list(range(20))
+    assert max(peak) == 3
+    assert runtime.run(runtime.submit('openai', request(20))) == 20
+    assert runtime.stats()['openai'] == {'limit': 3, 'running': 0, 'waiting': 0}
+    
+    # The async variants run from any event loop, the blocking ones stay thin wrappers
+    ai_service = AIService()
+    completions = FakeCompletions()
+    ai_service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    
+    async def analyze():
+        return await asyncio.gather(*(ai_service.analyze_buyer_query_async(f"عايز موبايل رقم {i}") for i in range(10)))
+    
+    results = asyncio.run(analyze())
+    assert completions.calls == 10 and all(result['success'] for result in results)
+    assert ai_service.analyze_buyer_query("عايز موبايل رقم 1")['success']
+
+def test_circuit_breaker():
+    """Consecutive failures open the provider's breaker, a successful probe closes it"""
+    runtime = LLMRuntime()
+    breaker = get_circuit_breaker('flaky')
+    breaker.failure_threshold = 3
+    breaker.reset_timeout = 0.1
+    calls = []
+    
+    async def request(fail):
+        calls.append(fail)
+        if fail:
+            raise RuntimeError('API request failed: 503')
+        return 'ok'
+    
+    for _ in range(3):
+        try:
+            runtime.run(runtime.submit('flaky', request(True)))
+        except RuntimeError:
+            pass
+    assert breaker.stats()['state'] == 'open'
+    
+    # Open: fails fast without calling the provider
+    try:
+        runtime.run(runtime.submit('flaky', request(False)))
+        assert False, 'expected CircuitOpenError'
+    except CircuitOpenError:
+        pass
+    assert len(calls) == 3 and breaker.stats()['rejected'] == 1
+    
+    time.sleep(0.15)
+    assert runtime.run(runtime.submit('flaky', request(False))) == 'ok'
+    stats = breaker.stats()
+    assert stats['state'] == 'closed' and stats['state_code'] == 0 and stats['times_opened'] == 1
+
 def main():
     """Run all tests"""
     print("Starting AI Services Tests...\n")
@@ -112,6 +317,22 @@ def main():
     # Test AI service (requires OpenAI API)
     test_ai_service()
     
+    # Test enhancement cache (no API calls)
+    test_enhancement_cache()
+    
+    # Test cache namespaces (no API calls)
+    test_cache_namespaces()
+    
+    # Test request coalescing (no API calls)
+    test_single_flight()
+    test_single_flight_cancelled_waiter()
+    
+    # Test async runtime (no API calls)
+    test_async_concurrency_limit()
+    
+    # Test circuit breaker (no API calls)
+    test_circuit_breaker()
+    
     print("Tests completed!")
 
 if __name__ == "__main__":
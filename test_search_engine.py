@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""Ranking and filtering tests for ProductSearchEngine on a small fixture catalog"""
+
+import sys
+import os
+import csv
+import gc
+import json
+import tempfile
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from arabic_utils import ArabicTextProcessor, get_arabic_analyzer
+from models import autocomplete
+from models.autocomplete import AutocompleteIndex, AutocompleteService, get_autocomplete_service
+from models.facet_index import merge_facet_counts
+from models.fuzzy_index import FuzzyTermIndex
+from models.index_store import MANIFEST_FILE, load_tfidf_index, save_tfidf_index
+from models.product_catalog import DEFAULT_DATASET_PATH, ProductCatalog
+from models.product_search_engine import ProductSearchEngine
+from models.search_index import BM25_MIN_SIMILARITY, InvertedIndex
+from models.sharded_search import ShardedProductSearchEngine
+
+DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), DEFAULT_DATASET_PATH)
+
+FIXTURE_ADS = [
+    (1, 'موبايل سامسونج جالاكسي S23', 'ممتاز', 'موبايل', 15000, 'القاهرة'),
+    (2, 'موبايل نوكيا 3310 كلاسيك', 'بحالة جيدة', 'موبايل', 800, 'الجيزة'),
+    (3, 'نوكيا G21 مستعمل', 'بطارية ممتازة', 'موبايل', 3000, 'القاهرة'),
+    (4, 'سيارة كيا سيراتو 2018', 'فابريكة', 'سيارات', 350000, 'الإسكندرية'),
+    (5, 'تيشيرت H&M بولو', 'استعمال خفيف', 'ملابس', 250, 'القاهرة'),
+    (6, 'هودي Zara قطن', 'لون أزرق', 'ملابس', 900, 'الجيزة'),
+    (7, 'دراجة هوائية جبلية', 'مقاس 26', 'رياضة', 3100, 'القاهرة'),
+    (8, 'لابتوب ديل انسبايرون', 'رام 16 جيجا', 'إلكترونيات', 22000, 'القاهرة'),
+]
+
+def write_fixture_csv(path, ads):
+    """Write ads in the dataset's column layout, an ad id of None leaves the cell empty"""
+    with open(path, 'w', encoding='utf-8', newline='') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['id', 'title', 'text', 'category', 'price', 'location', 'contact_info'])
+        for ad_id, title, details, category, price, location in ads:
+            text = f'{title} - {details}. السعر: {price} جنيه. للمعاينة في {location}.'
+            writer.writerow(['' if ad_id is None else ad_id, title, text, category, price, location, '01000000000'])
+
+def create_test_catalog(ads=FIXTURE_ADS):
+    """Catalog over a temporary CSV holding ads"""
+    path = os.path.join(tempfile.mkdtemp(), 'ads_dataset.csv')
+    write_fixture_csv(path, ads)
+    return ProductCatalog(path)
+
+def result_ids(results):
+    """Ad ids of search results in rank order"""
+    return [int(result['id']) for result in results]
+
+def test_catalog_snapshot_reloads_when_file_changes():
+    """Snapshots and derived indexes are reused until the file changes or is invalidated"""
+    catalog = create_test_catalog()
+    products, version = catalog.get_snapshot()
+    index = catalog.get_index()
+    assert catalog.get_snapshot() == (products, version)
+    assert catalog.get_snapshot()[0] is products
+    assert catalog.get_index() is index
+    assert catalog.get_facets() is catalog.get_facets()
+
+    write_fixture_csv(catalog.dataset_path, FIXTURE_ADS + [(9, 'شاحن نوكيا اصلي', 'جديد', 'موبايل', 300, 'القاهرة')])
+    new_products, new_version = catalog.get_snapshot()
+    assert new_version == version + 1
+    assert len(new_products) == len(products) + 1
+    assert catalog.get_index() is not index
+    assert catalog.get_index(products) is not catalog.get_index(products)
+    assert 9 in result_ids(ProductSearchEngine(catalog).search_by_text('شاحن'))
+
+    catalog.invalidate()
+    assert catalog.get_snapshot()[1] == new_version + 1
+
+def test_inverted_index_postings():
+    """Postings hold the products of each normalized term in catalog order"""
+    index = create_test_catalog().get_index()
+    assert index.postings['نوكيا'] == [1, 2]
+    assert index.candidates(['نوكيا']) == [1, 2]
+    assert index.candidates(['موبايل', 'نوكيا']) == [0, 1, 2]
+    assert index.term_hits(['موبايل', 'نوكيا']) == [(0, 1), (1, 2), (2, 2)]
+    assert index.candidates(['ثلاجة']) == []
+
+    engine = ProductSearchEngine(create_test_catalog())
+    assert set(result_ids(engine.search_by_text('موبايل نوكيا'))[:2]) == {2, 3}
+
+def test_bm25_ranks_more_matched_and_rarer_terms_higher():
+    """BM25 favours products matching more query terms and rarer terms"""
+    index = create_test_catalog().get_index()
+    terms = ['موبايل', 'نوكيا']
+
+    scores = index.bm25_scores(terms)
+    by_row = {doc_id: score for doc_id, score, _ in scores}
+    assert [(doc_id, hits) for doc_id, _, hits in scores] == [(0, 1), (1, 2), (2, 2)]
+    assert by_row[1] > by_row[0] and by_row[2] > by_row[0]
+    assert max(by_row.values()) < index.bm25_max_score(terms)
+    assert index.idf['نوكيا'] > index.idf['موبايل']
+
+    engine = ProductSearchEngine(create_test_catalog())
+    assert set(result_ids(engine.search_by_text('موبايل نوكيا', ranking='bm25'))[:2]) == {2, 3}
+
+def test_filter_masks_keep_rows_without_values():
+    """Price, location and category masks drop only rows that contradict the constraint"""
+    ads = FIXTURE_ADS + [(9, 'شاحن نوكيا اصلي', 'جديد', 'موبايل', '', '')]
+    catalog = create_test_catalog(ads)
+    columns = catalog.get_columns()
+    assert columns.filter_mask() is None
+    assert np.flatnonzero(columns.filter_mask(price_range=(700, 1000))).tolist() == [1, 5, 8]
+    assert np.flatnonzero(columns.filter_mask(location='الجيزة')).tolist() == [1, 5, 8]
+    assert np.flatnonzero(columns.filter_mask(location='أسوان')).tolist() == [8]
+    assert np.flatnonzero(columns.filter_mask(category='موبايل')).tolist() == [0, 1, 2, 6, 8]
+    assert np.flatnonzero(columns.filter_mask((700, 1000), 'الجيزة', 'موبايل')).tolist() == [1, 8]
+    assert columns.price_rows(800, 3000).tolist() == [1, 5, 2]
+    assert columns.price_rows(0, float('inf')).tolist()[:2] == [8, 4]
+
+    index = catalog.get_index()
+    terms = ['موبايل', 'نوكيا']
+    mask = columns.filter_mask(location='القاهرة')
+    assert [doc_id for doc_id, _, _ in index.bm25_scores(terms, mask=mask)] == [0, 2, 8]
+
+    engine = ProductSearchEngine(catalog)
+    for ranking in ('keyword', 'bm25'):
+        assert sorted(result_ids(engine.search_by_text('موبايل بسعر 1000', ranking=ranking))) == [2, 9]
+
+def test_inverted_index_add_product_matches_rebuild():
+    """Appending a product gives the postings and IDF a rebuild would"""
+    products = list(create_test_catalog().get_products())
+    index = InvertedIndex(products[:-1])
+    index.add_product(products[-1])
+    rebuilt = InvertedIndex(products)
+    assert index.postings == rebuilt.postings
+    assert index.term_frequencies == rebuilt.term_frequencies
+    assert index.doc_lengths == rebuilt.doc_lengths
+    assert index.idf['لابتوب'] == rebuilt.idf['لابتوب']
+    assert index.candidates(['لابتوب', 'ديل']) == [7]
+
+def test_tfidf_index_store_accepts_appends_only():
+    """A saved index loads after rows are appended, not after the file is modified"""
+    ads = FIXTURE_ADS[:6]
+    catalog = create_test_catalog(ads)
+    texts = [product['text'] for product in catalog.get_products()]
+    vectorizer = TfidfVectorizer(max_features=1000, analyzer=get_arabic_analyzer().analyze_ngrams)
+    matrix = vectorizer.fit_transform(texts)
+    index_dir = os.path.join(os.path.dirname(catalog.dataset_path), 'tfidf_index')
+    save_tfidf_index(index_dir, vectorizer, matrix, np.arange(1, 7), catalog.dataset_path)
+
+    loaded = load_tfidf_index(index_dir, catalog.dataset_path)
+    assert loaded.rows == 6
+    assert loaded.ad_ids.tolist() == [1, 2, 3, 4, 5, 6]
+    assert (loaded.matrix != matrix).nnz == 0
+
+    # Appended rows are transformed with the stored vocabulary and IDF, as by the fitted vectorizer
+    with open(catalog.dataset_path, 'a', encoding='utf-8', newline='') as handle:
+        csv.writer(handle).writerow([7, 'موبايل نوكيا جديد', 'موبايل نوكيا جديد بالكرتونة', 'موبايل', 1200, 'القاهرة', ''])
+    loaded = load_tfidf_index(index_dir, catalog.dataset_path)
+    assert loaded is not None and loaded.rows == 6
+    new_text = catalog.get_products()[-1]['text']
+    assert np.allclose(loaded.vectorizer.transform([new_text]).toarray(), vectorizer.transform([new_text]).toarray())
+
+    manifest_path = os.path.join(index_dir, MANIFEST_FILE)
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    manifest['vectorizer']['analyzer_version'] = -1
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    assert load_tfidf_index(index_dir, catalog.dataset_path) is None
+
+    save_tfidf_index(index_dir, vectorizer, matrix, np.arange(1, 7), catalog.dataset_path)
+    write_fixture_csv(catalog.dataset_path, [ads[1], ads[0]] + ads[2:])
+    assert load_tfidf_index(index_dir, catalog.dataset_path) is None
+
+def test_fuzzy_index_corrects_misspelled_terms():
+    """Trigram lookup finds terms within the edit distance, containing finds compound words"""
+    fuzzy = FuzzyTermIndex(['سامسونج', 'شاومي', 'تيشيرت', 'نوكيا'])
+    assert fuzzy.lookup('سامسنج') == [('سامسونج', 1)]
+    assert fuzzy.lookup('نوكا') == [('نوكيا', 1)]
+    assert fuzzy.lookup('سامسونج') == [('سامسونج', 0)]
+    assert fuzzy.lookup('كيا') == []
+    assert fuzzy.containing('شيرت') == ['تيشيرت']
+
+    engine = ProductSearchEngine(create_test_catalog())
+    for ranking in ('keyword', 'bm25'):
+        assert result_ids(engine.search_by_text('سامسنج', ranking=ranking)) == [1]
+        assert result_ids(engine.search_by_text('لابتوب دبل', ranking=ranking)) == [8]
+
+def test_autocomplete_ranks_by_ads_and_queries():
+    """Phrases in more titles come first, logged queries outrank them"""
+    service = AutocompleteService(create_test_catalog())
+    assert service.suggest('مو')[0] == 'موبايل'
+    assert service.suggest('ن') == ['نوكيا', 'نوكيا G21', 'نوكيا G21 مستعمل', 'نوكيا 3310 كلاسيك']
+    assert service.suggest('ثلا') == []
+
+    service.record_query('نوكيا 3310 كلاسيك')
+    service.record_query('نوكيا 3310 كلاسيك')
+    assert service.suggest('ن')[0] == 'نوكيا 3310 كلاسيك'
+    assert service.suggest('ن', limit=2) == ['نوكيا 3310 كلاسيك', 'نوكيا']
+
+def test_facet_counts_of_results():
+    """Facets count the whole result set per category, location and price bucket"""
+    engine = ProductSearchEngine(create_test_catalog())
+    results, facets = engine.search_with_facets('موبايل', 1)
+    assert len(results) == 1
+    assert facets['category'] == [{'value': 'موبايل', 'count': 3}]
+    assert facets['location'] == [{'value': 'القاهرة', 'count': 2}, {'value': 'الجيزة', 'count': 1}]
+    assert [(entry['value'], entry['count']) for entry in facets['price']] == \
+        [('أقل من 1000', 1), ('1000 - 5000', 1), ('5000 - 20000', 1)]
+
+    facet_index = create_test_catalog().get_facets()
+    halves = [facet_index.counts([0, 4, 6]), facet_index.counts([1, 5])]
+    merged = merge_facet_counts(halves)
+    assert merged == facet_index.counts([0, 1, 4, 5, 6])
+    assert merged['category'] == [{'value': 'ملابس', 'count': 2}, {'value': 'موبايل', 'count': 2}]
+    assert facet_index.counts([0, 1, 4, 5, 6], limit=1)['location'] == [{'value': 'القاهرة', 'count': 3}]
+
+def test_semantic_search_matches_inflections():
+    """Semantic ranking finds inflected and misspelled words, honours filters and skips unrelated text"""
+    engine = ProductSearchEngine(create_test_catalog())
+    assert set(result_ids(engine.search_by_text('موبايلات نوكيا', ranking='semantic'))[:2]) == {2, 3}
+    assert result_ids(engine.search_by_text('سيارات كيا', ranking='semantic')) == [4]
+    assert result_ids(engine.search_by_text('جاكسي', ranking='semantic')) == [1]
+    assert engine.search_by_text('ثلاجة', ranking='semantic') == []
+    assert result_ids(engine.search_by_text('موبايلات نوكيا في الجيزة', ranking='semantic')) == [2]
+
+    catalog = create_test_catalog()
+    semantic = catalog.get_semantic_index()
+    terms = get_arabic_analyzer().analyze('موبايلات نوكيا')
+    mask = np.ones(len(semantic), dtype=bool)
+    mask[1] = False
+    rows = [row for row, _ in semantic.search(terms, mask=mask)]
+    assert 2 in rows and 1 not in rows
+
+def test_semantic_index_builds_in_background():
+    """A missing semantic index is built on a thread instead of by the caller"""
+    catalog = create_test_catalog()
+    assert not catalog.semantic_index_ready()
+    catalog._semantic_build.join()
+    assert catalog.semantic_index_ready()
+    assert catalog.get_semantic_index() is catalog._derived['semantic']
+
+    write_fixture_csv(catalog.dataset_path, FIXTURE_ADS + [(9, 'شاحن نوكيا اصلي', 'جديد', 'موبايل', 300, 'القاهرة')])
+    assert not catalog.semantic_index_ready()
+    catalog._semantic_build.join()
+    assert catalog.semantic_index_ready()
+
+def test_category_keyword_inside_word_does_not_filter():
+    """'كيا' in 'نوكيا' and 'خدمة' in 'مستخدمة' are not category filters"""
+    assert ArabicTextProcessor.detect_category('نوكيا', whole_token=True) is None
+    assert ArabicTextProcessor.detect_category('سيارة كيا', whole_token=True) == 'سيارات'
+
+    engine = ProductSearchEngine(create_test_catalog())
+    for ranking in ('keyword', 'bm25'):
+        assert set(result_ids(engine.search_by_text('نوكيا', ranking=ranking))) == {2, 3}
+        assert result_ids(engine.search_by_text('هودي زارا مستخدمة', ranking=ranking))[0] == 6
+        assert result_ids(engine.search_by_text('سويت شيرت مستخدمة', ranking=ranking)) == [5]
+
+def test_whole_word_category_filters():
+    """A whole-word category keyword still restricts results to that category"""
+    engine = ProductSearchEngine(create_test_catalog())
+    assert result_ids(engine.search_by_text('سيارة كيا')) == [4]
+    assert result_ids(engine.search_by_text('موبايل سامسونج'))[0] == 1
+
+def test_location_inside_word_does_not_filter():
+    """'السويس' in 'السويسري', 'قنا' in 'قناع' and 'طنطا' in 'طنطاوي' are not location filters"""
+    for text in ('ساعة السويسري', 'قناع', 'طنطاوي'):
+        assert ArabicTextProcessor.extract_location(text) is None
+    assert ArabicTextProcessor.extract_location('شقة بالقاهرة') == 'القاهرة'
+
+    engine = ProductSearchEngine(create_test_catalog())
+    for ranking in ('keyword', 'bm25'):
+        assert result_ids(engine.search_by_text('هودي قطن السويسري', ranking=ranking)) == [6]
+        assert result_ids(engine.search_by_text('هودي قطن طنطاوي', ranking=ranking)) == [6]
+        assert result_ids(engine.search_by_text('هودي بالجيزة', ranking=ranking))[0] == 6
+        assert 5 not in result_ids(engine.search_by_text('تيشيرت بولو في الجيزة', ranking=ranking))
+
+def test_bm25_drops_weak_matches():
+    """BM25 applies the DatasetManager cutoff instead of returning ~0 scores"""
+    engine = ProductSearchEngine(create_test_catalog())
+    results = engine.search_by_text('موبايل بسعر 3000 جنيه', ranking='bm25')
+    assert result_ids(results) == [3]
+    assert all(result['similarity'] > BM25_MIN_SIMILARITY for result in results)
+
+def test_autocomplete_appends_after_ad_without_id():
+    """A trailing ad with an empty id (NaN) does not force a rebuild on every append"""
+    ads = FIXTURE_ADS + [(None, 'شنطة جلد طبيعي', 'جديدة', 'ملابس', 700, 'القاهرة')]
+    catalog = create_test_catalog(ads)
+    service = AutocompleteService(catalog)
+    assert service.suggest('شنط')[0] == 'شنطة'
+    index = service.index
+
+    write_fixture_csv(catalog.dataset_path, ads + [(9, 'شنطة ظهر لابتوب', 'جديدة', 'ملابس', 400, 'الجيزة')])
+    assert service.suggest('شنط')[0] == 'شنطة'
+    assert 'شنطة ظهر' in service.suggest('شنطة ظ')
+    assert service.index is index
+
+def test_autocomplete_logs_known_words_of_query():
+    """Query words no title contains are dropped instead of the whole query"""
+    service = AutocompleteService(create_test_catalog())
+    service.record_query('تيشيرت في القاهرة')
+    service.record_query('هودي Zara مستخدمة')
+    assert dict(service.index.query_counts) == {'تيشيرت': 1, 'هودي zara': 1}
+
+def test_autocomplete_query_log_is_capped():
+    """Past MAX_LOGGED_QUERIES the least logged queries and their phrases are forgotten"""
+    original = autocomplete.MAX_LOGGED_QUERIES
+    autocomplete.MAX_LOGGED_QUERIES = 4
+    try:
+        index = AutocompleteIndex(create_test_catalog().get_products())
+        phrases = len(index)
+        for _ in range(3):
+            index.record_query('هودي Zara')
+        for query in ('موبايل نوكيا', 'سامسونج', 'دراجة', 'تيشيرت قطن'):
+            index.record_query(query)
+        assert dict(index.query_counts) == {'هودي zara': 2, 'موبايل نوكيا': 1}
+        # A phrase only the forgotten query added leaves the sorted array
+        assert len(index) == phrases and 'تيشيرت قطن' not in index.keys
+        assert index.suggest('هودي')[0] == 'هودي Zara'
+    finally:
+        autocomplete.MAX_LOGGED_QUERIES = original
+
+def test_cached_search_does_not_log_query():
+    """Repeated searches served from the cache do not grow the query log"""
+    engine = ProductSearchEngine(create_test_catalog())
+    engine.search_by_text('تيشيرت قطن')
+    engine.search_by_text('تيشيرت قطن')
+    assert sum(engine.autocomplete.index.query_counts.values()) == 1
+
+def test_autocomplete_service_dropped_with_catalog():
+    """The shared service of a catalog goes away with the catalog, and is shared while it lives"""
+    catalog = create_test_catalog()
+    service = get_autocomplete_service(catalog)
+    assert get_autocomplete_service(catalog) is service
+    assert ProductSearchEngine(catalog).autocomplete is service
+    catalog_id = id(catalog)
+    del catalog, service
+    gc.collect()
+    assert catalog_id not in autocomplete._autocomplete_services
+
+def test_sharded_search_matches_single_engine():
+    """Keyword and BM25 results and facets of a sharded catalog equal one engine's, ties included"""
+    single = ProductSearchEngine(ProductCatalog(DATASET_PATH))
+    sharded = ShardedProductSearchEngine(3, catalog=ProductCatalog(DATASET_PATH))
+    try:
+        for query in ('موبايل سامسونج', 'سامسونح', 'سويت شيرت مستخدمة', 'ايفون 13 برو', 'شقة في القاهرة'):
+            for ranking in ('keyword', 'bm25'):
+                expected, expected_facets = single.search_with_facets(query, 10, ranking)
+                results, facets = sharded.search_with_facets(query, 10, ranking)
+                assert [(str(result['id']), result['similarity']) for result in results] == \
+                    [(str(result['id']), result['similarity']) for result in expected], (query, ranking)
+                assert facets == expected_facets, (query, ranking)
+
+        assert 1.0 in [result['id'] for result in sharded.search_by_text('سامسونح', ranking='bm25')]
+        try:
+            sharded.search_by_text('موبايل سامسونج', ranking='semantic')
+            assert False, 'semantic ranking must be rejected on shards'
+        except ValueError:
+            pass
+    finally:
+        sharded.shutdown()
+
+def main():
+    """Run all tests"""
+    print("Starting search engine tests...\n")
+    test_catalog_snapshot_reloads_when_file_changes()
+    test_inverted_index_postings()
+    test_bm25_ranks_more_matched_and_rarer_terms_higher()
+    test_filter_masks_keep_rows_without_values()
+    test_inverted_index_add_product_matches_rebuild()
+    test_tfidf_index_store_accepts_appends_only()
+    test_fuzzy_index_corrects_misspelled_terms()
+    test_autocomplete_ranks_by_ads_and_queries()
+    test_facet_counts_of_results()
+    test_semantic_search_matches_inflections()
+    test_semantic_index_builds_in_background()
+    test_category_keyword_inside_word_does_not_filter()
+    test_whole_word_category_filters()
+    test_location_inside_word_does_not_filter()
+    test_bm25_drops_weak_matches()
+    test_autocomplete_appends_after_ad_without_id()
+    test_autocomplete_logs_known_words_of_query()
+    test_autocomplete_query_log_is_capped()
+    test_cached_search_does_not_log_query()
+    test_autocomplete_service_dropped_with_catalog()
+    test_sharded_search_matches_single_engine()
+    print("Tests completed!")
+
+if __name__ == "__main__":
+    main()
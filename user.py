@@ -1,8 +1,6 @@
-from flask_sqlalchemy import SQLAlchemy
+from database import db
 from datetime import datetime
 
-db = SQLAlchemy()
-
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -1,14 +1,15 @@
 from flask import Flask, render_template, request, jsonify, session
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import os
 import uuid
 
 # Import our models and services
+from database import db, ensure_indexes
 from user import User
 from ad import Ad, AdStatus
 from ai_service import AIService
 from arabic_utils import ArabicTextProcessor
+from fts_search import ensure_fts_index
 from conversation import Conversation, ConversationState, UserType
 
 app = Flask(__name__)
@@ -19,7 +20,7 @@ app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///chatbot.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Initialize database
-db = SQLAlchemy(app)
+db.init_app(app)
 
 # Initialize services
 ai_service = AIService()
@@ -28,6 +29,9 @@ arabic_processor = ArabicTextProcessor()
 # Create tables
 with app.app_context():
     db.create_all()
+    # Indexes added after the ads table was created
+    ensure_indexes(db.engine, Ad)
+    ensure_fts_index(db.engine, Ad.__tablename__)
 
 @app.route('/')
 def index():
@@ -4,6 +4,7 @@ import hmac
 import hashlib
 from typing import Dict, Any, Optional
 from flask import request
+from http_client import get_http_session
 
 class WhatsAppBusiness:
     """WhatsApp Business API integration for the chatbot"""
@@ -142,7 +143,7 @@ class WhatsAppBusiness:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = get_http_session().post(url, json=payload, headers=headers)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
@@ -224,7 +225,7 @@ class WhatsAppBusiness:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = get_http_session().post(url, json=payload, headers=headers)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e:
@@ -249,7 +250,7 @@ class WhatsAppBusiness:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = get_http_session().post(url, json=payload, headers=headers)
             response.raise_for_status()
             return True
         except requests.exceptions.RequestException as e: